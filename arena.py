@@ -0,0 +1,252 @@
+"""
+Node arena
+
+A compact form of the AST, which can be run without the lexer and the
+parser (see artifact.py). Each node is a row in a few parallel arrays
+rather than an object: its kind, and up to three ints whose meaning
+depends on the kind. Numbers, strings and variable names are kept once in
+a constant pool. The statements of every block are stored one after the
+other in `items`.
+
+    kind     first              second            third
+    NUM      constant           -                 -
+    VAR      constant (name)    -                 -
+    BINOP    left node          right node        operator
+    ASSIGN   constant (name)    value node        -
+    IF       condition node     body block        else node or -1
+    WHILE    condition node     body block        -
+    BLOCK    start in items     statement count   -
+    NOOP     -                  -                 -
+
+    arena = NodeArena(Parser(Lexer(text)).parse())
+    ArenaInterpreter(None).run(arena)
+
+"""
+
+import array
+import operator
+
+PLUS = 'PLUS'
+MINUS = 'MINUS'
+MULTIPLY = 'MULTIPLY'
+DIVIDE = 'DIVIDE'
+MODULO = 'MODULO'
+
+EQ = '=='
+NE = '!='
+GT = '>'
+LT = '<'
+GE = '>='
+LE = '<='
+
+NUM = 0
+VAR = 1
+BINOP = 2
+ASSIGN = 3
+IF = 4
+WHILE = 5
+BLOCK = 6
+NOOP = 7
+
+KIND_NAMES = ('NUM', 'VAR', 'BINOP', 'ASSIGN', 'IF', 'WHILE', 'BLOCK', 'NOOP')
+
+# operator codes of BINOP nodes are indexes into these
+OPERATORS = (PLUS, MINUS, MULTIPLY, DIVIDE, MODULO, EQ, NE, GT, LT, GE, LE)
+OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+OPERATOR_FUNCTIONS = (
+    operator.add, operator.sub, operator.mul, operator.truediv, operator.mod,
+    operator.eq, operator.ne, operator.gt, operator.lt, operator.ge, operator.le,
+)
+
+
+class NodeArena(object):
+    def __init__(self, tree=None):
+        self.kinds = array.array('B')
+        self.first = array.array('i')
+        self.second = array.array('i')
+        self.third = array.array('i')
+        self.items = array.array('i')
+        self.constants = []
+        # (type, value) -> index in constants, only while nodes are being
+        # added; 1, 1.0 and True are equal as dict keys, so the type is
+        # part of the key
+        self._constant_index = None
+        self.root = -1
+        if tree is not None:
+            self.root = self.add(tree)
+            self._constant_index = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def constant(self, value):
+        if self._constant_index is None:
+            self._constant_index = {
+                (type(known), known): index for index, known in enumerate(self.constants)}
+        key = (type(value), value)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def node(self, kind, first=-1, second=-1, third=-1):
+        self.kinds.append(kind)
+        self.first.append(first)
+        self.second.append(second)
+        self.third.append(third)
+        return len(self.kinds) - 1
+
+    def add(self, node):
+        """Adds node and everything below it; returns the index of node."""
+        adder = getattr(self, 'add_' + type(node).__name__, None)
+        if adder is None:
+            raise TypeError('No arena node for {}'.format(type(node).__name__))
+        return adder(node)
+
+    def add_list(self, node):
+        return self.block(node)
+
+    def add_Compound(self, node):
+        return self.block(node.children)
+
+    def add_Num(self, node):
+        return self.node(NUM, self.constant(node.value))
+
+    def add_Var(self, node):
+        return self.node(VAR, self.constant(node.value))
+
+    def add_BinOP(self, node):
+        left = self.add(node.left)
+        right = self.add(node.right)
+        return self.node(BINOP, left, right, OPERATOR_CODES[node.op.type])
+
+    def add_Assign(self, node):
+        return self.node(ASSIGN, self.constant(node.left.value), self.add(node.right))
+
+    def add_If(self, node):
+        # an else if chain is walked in a loop, not one call per arm; the
+        # nodes are laid out as if it were not. Nodes are told apart by
+        # class name, as in add, so the parser need not be imported
+        arms = []
+        while type(node).__name__ == 'If':
+            arms.append((self.add(node.condition), self.block(node.body)))
+            node = node.control_body
+        control_body = self.add(node) if node is not None else -1
+        for condition, body in reversed(arms):
+            control_body = self.node(IF, condition, body, control_body)
+        return control_body
+
+    def add_While(self, node):
+        condition = self.add(node.condition)
+        return self.node(WHILE, condition, self.block(node.body))
+
+    def add_NoOp(self, node):
+        return self.node(NOOP)
+
+    def block(self, statements):
+        children = [self.add(statement) for statement in statements]
+        start = len(self.items)
+        self.items.extend(children)
+        return self.node(BLOCK, start, len(children))
+
+    def dump(self, index=None, indent=0):
+        """The subtree at index (the root by default) as indented text."""
+        if index is None:
+            index = self.root
+        kind = self.kinds[index]
+        first, second, third = self.first[index], self.second[index], self.third[index]
+        pad = '  ' * indent
+        if kind == NUM:
+            return '{}NUM {!r}'.format(pad, self.constants[first])
+        if kind == VAR:
+            return '{}VAR {}'.format(pad, self.constants[first])
+        if kind == BINOP:
+            lines = ['{}BINOP {}'.format(pad, OPERATORS[third])]
+            children = [first, second]
+        elif kind == ASSIGN:
+            lines = ['{}ASSIGN {}'.format(pad, self.constants[first])]
+            children = [second]
+        elif kind == BLOCK:
+            lines = ['{}BLOCK'.format(pad)]
+            children = self.items[first:first + second]
+        else:
+            lines = ['{}{}'.format(pad, KIND_NAMES[kind])]
+            children = [child for child in (first, second, third) if child >= 0 and kind != NOOP]
+        lines.extend(self.dump(child, indent + 1) for child in children)
+        return '\n'.join(lines)
+
+
+class ArenaInterpreter(object):
+    """Runs a NodeArena. Variables end up in self.variables, a dict of
+    each interpreter's own, so one program never sees another's. Needs
+    neither the lexer nor the parser, unless it is asked to interpret() a
+    parser."""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.variables = {}
+        self.arena = None
+        self.visitors = (
+            self.visit_num, self.visit_var, self.visit_binop, self.visit_assign,
+            self.visit_if, self.visit_while, self.visit_block, self.visit_noop,
+        )
+
+    def interpret(self):
+        return self.run(NodeArena(self.parser.parse()))
+
+    def run(self, arena):
+        self.arena = arena
+        self.kinds = arena.kinds
+        self.first = arena.first
+        self.second = arena.second
+        self.third = arena.third
+        self.items = arena.items
+        self.constants = arena.constants
+        return self.visit(arena.root)
+
+    def visit(self, index):
+        return self.visitors[self.kinds[index]](index)
+
+    def visit_num(self, index):
+        return self.constants[self.first[index]]
+
+    def visit_var(self, index):
+        var_name = self.constants[self.first[index]]
+        val = self.variables.get(var_name)
+        if val is None:
+            raise NameError(repr(var_name))
+        else:
+            return val
+
+    def visit_binop(self, index):
+        left = self.visit(self.first[index])
+        right = self.visit(self.second[index])
+        return OPERATOR_FUNCTIONS[self.third[index]](left, right)
+
+    def visit_assign(self, index):
+        self.variables[self.constants[self.first[index]]] = self.visit(self.second[index])
+
+    def visit_if(self, index):
+        kinds = self.kinds
+        while index >= 0 and kinds[index] == IF:
+            if self.visit(self.first[index]):
+                self.visit(self.second[index])
+                return
+            index = self.third[index]
+        if index >= 0:
+            self.visit(index)
+
+    def visit_while(self, index):
+        condition = self.first[index]
+        body = self.second[index]
+        while self.visit(condition):
+            self.visit(body)
+
+    def visit_block(self, index):
+        start = self.first[index]
+        for child in self.items[start:start + self.second[index]]:
+            self.visit(child)
+
+    def visit_noop(self, index):
+        pass
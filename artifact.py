@@ -0,0 +1,245 @@
+"""
+Compiled program artifacts
+
+A program can be compiled ahead of time into a binary file holding its
+NodeArena, and run later straight from that file: load() maps it with
+mmap and the node arrays are read in place, so neither the lexer nor the
+parser is imported or run.
+
+    python artifact.py compile program.rs program.rsa
+    python artifact.py run program.rsa
+
+Layout of a file, all numbers in the byte order named in the header:
+
+    header     MAGIC, VERSION, byte order, node count, item count,
+               constant count, root, offset of the constant pool
+    kinds      one byte per node, padded to a multiple of 4
+    first      one int32 per node
+    second     one int32 per node
+    third      one int32 per node
+    items      one int32 per block statement
+    constants  a tag byte and a value for each constant
+
+"""
+
+import array
+import mmap
+import struct
+import sys
+
+import arena
+
+MAGIC = b'RSTA'
+VERSION = 1
+HEADER = struct.Struct('<4sHcxIIIiI')
+
+# constant pool tags
+INT = b'i'
+BIG_INT = b'I'
+FLOAT = b'f'
+STR = b's'
+TRUE = b't'
+FALSE = b'b'
+NONE = b'n'
+
+INT64 = struct.Struct('<q')
+DOUBLE = struct.Struct('<d')
+LENGTH = struct.Struct('<I')
+
+BYTE_ORDERS = {'little': b'<', 'big': b'>'}
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def pad(data):
+    return data + bytes(-len(data) % 4)
+
+
+def encode_constant(value):
+    if value is True:
+        return TRUE
+    if value is False:
+        return FALSE
+    if value is None:
+        return NONE
+    if isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            return INT + INT64.pack(value)
+        text = str(value).encode('ascii')
+        return BIG_INT + LENGTH.pack(len(text)) + text
+    if isinstance(value, float):
+        return FLOAT + DOUBLE.pack(value)
+    if isinstance(value, str):
+        text = value.encode('utf-8', 'surrogatepass')
+        return STR + LENGTH.pack(len(text)) + text
+    raise ArtifactError('Cannot store constant {!r}'.format(value))
+
+
+def decode_constants(data, pos, count):
+    constants = []
+    for _ in range(count):
+        tag = bytes(data[pos:pos + 1])
+        pos += 1
+        if tag == INT:
+            constants.append(INT64.unpack_from(data, pos)[0])
+            pos += INT64.size
+        elif tag == FLOAT:
+            constants.append(DOUBLE.unpack_from(data, pos)[0])
+            pos += DOUBLE.size
+        elif tag in (STR, BIG_INT):
+            length = LENGTH.unpack_from(data, pos)[0]
+            pos += LENGTH.size
+            text = bytes(data[pos:pos + length])
+            pos += length
+            if tag == STR:
+                constants.append(text.decode('utf-8', 'surrogatepass'))
+            else:
+                constants.append(int(text))
+        elif tag in (TRUE, FALSE, NONE):
+            constants.append({TRUE: True, FALSE: False, NONE: None}[tag])
+        else:
+            raise ArtifactError('Bad constant tag {!r} at {}'.format(tag, pos - 1))
+    if pos > len(data):
+        raise ArtifactError('Corrupt artifact')
+    return constants
+
+
+def dumps(nodes):
+    """The artifact of a NodeArena, as bytes."""
+    body = [
+        pad(nodes.kinds.tobytes()),
+        nodes.first.tobytes(),
+        nodes.second.tobytes(),
+        nodes.third.tobytes(),
+        nodes.items.tobytes(),
+    ]
+    constants_offset = HEADER.size + sum(len(part) for part in body)
+    header = HEADER.pack(
+        MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], len(nodes), len(nodes.items),
+        len(nodes.constants), nodes.root, constants_offset)
+    return b''.join([header] + body + [encode_constant(value) for value in nodes.constants])
+
+
+def write(path, nodes):
+    with open(path, 'wb') as f:
+        f.write(dumps(nodes))
+
+
+def compile_source(text):
+    """The artifact of a program's source text, as bytes."""
+    import lexer
+    import parser
+
+    return dumps(arena.NodeArena(parser.Parser(lexer.Lexer(text)).parse()))
+
+
+class MappedArena(object):
+    """A NodeArena read from an artifact; its arrays are views of the
+    buffer, which for a file is a read-only mmap."""
+
+    def __init__(self, buffer, source=None):
+        self.buffer = buffer
+        self._source = source
+        if len(buffer) < HEADER.size:
+            raise ArtifactError('Artifact too short')
+        magic, version, byte_order, count, item_count, constant_count, root, constants_offset = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ArtifactError('Not a compiled program')
+        if version != VERSION:
+            raise ArtifactError('Artifact version {}, expected {}'.format(version, VERSION))
+        pos = HEADER.size + count + (-count % 4)
+        if constants_offset != pos + 4 * (3 * count + item_count) or constants_offset > len(buffer):
+            raise ArtifactError('Corrupt artifact')
+        try:
+            self.constants = decode_constants(buffer, constants_offset, constant_count)
+        except struct.error:
+            raise ArtifactError('Corrupt artifact')
+        self.root = root
+
+        # checked everything, so no view is left behind by an error
+        view = memoryview(buffer)
+        self.kinds = view[HEADER.size:HEADER.size + count]
+        native = byte_order == BYTE_ORDERS[sys.byteorder]
+        self.first, pos = self._ints(view, pos, count, native)
+        self.second, pos = self._ints(view, pos, count, native)
+        self.third, pos = self._ints(view, pos, count, native)
+        self.items, pos = self._ints(view, pos, item_count, native)
+        view.release()
+
+    @staticmethod
+    def _ints(view, pos, count, native):
+        end = pos + 4 * count
+        if native:
+            return view[pos:end].cast('i'), end
+        # written on a machine of the other byte order: copy and swap
+        ints = array.array('i')
+        ints.frombytes(view[pos:end])
+        ints.byteswap()
+        return ints, end
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def close(self):
+        # the views have to be released before the mmap can be closed
+        for name in ('kinds', 'first', 'second', 'third', 'items'):
+            view = getattr(self, name)
+            if isinstance(view, memoryview):
+                view.release()
+        if self._source is not None:
+            self.buffer.close()
+            self._source.close()
+            self._source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load(path):
+    """Maps the artifact at path. Close the result when done with it."""
+    f = open(path, 'rb')
+    try:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # an empty file cannot be mapped
+        f.close()
+        raise ArtifactError('Artifact too short')
+    try:
+        return MappedArena(buffer, f)
+    except Exception:
+        buffer.close()
+        f.close()
+        raise
+
+
+def run(path):
+    """Runs the artifact at path; returns the variables it leaves, in a
+    dict of its own."""
+    with load(path) as program:
+        inptr = arena.ArenaInterpreter(None)
+        inptr.run(program)
+        return inptr.variables
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == 'compile':
+        with open(sys.argv[2]) as f:
+            text = f.read()
+        with open(sys.argv[3], 'wb') as f:
+            f.write(compile_source(text))
+    elif len(sys.argv) == 3 and sys.argv[1] == 'run':
+        print(run(sys.argv[2]))
+    else:
+        print('usage: python artifact.py compile SOURCE ARTIFACT\n'
+              '       python artifact.py run ARTIFACT')
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
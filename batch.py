@@ -0,0 +1,125 @@
+"""
+Running directories of programs
+
+    python batch.py [--workers N] [--chunk N] TARGET...
+
+runs every program named by the targets: a directory stands for the .rs
+and .txt files in it, anything else is a glob pattern or a file name.
+The files are handed to a pool of worker processes, --chunk files at a
+time, and each is lexed, parsed and run there by the Interpreter. One
+line of JSON per file is written to stdout as soon as its chunk is done,
+so the lines come in the order the chunks finish:
+
+    {"path": "Rust Test Files/test1.txt", "variables": {"a": 4},
+     "error": null, "lex": 0.0001, "parse": 0.0002, "run": 0.0001}
+
+error is [type, message] of the exception the program raised, and the
+variables are those set before it; the times are in seconds, and None
+for the steps not reached.
+
+    for result in run_batch(['Rust Test Files'], workers=4):
+        print(result['path'], result['variables'])
+
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import sys
+import time
+
+import interpreter
+import lexer
+import parser
+
+EXTENSIONS = ('.rs', '.txt')
+
+
+def expand(targets):
+    """The files the targets name, each once, in the order given; the
+    files of a directory are sorted."""
+    paths = []
+    seen = set()
+    for target in targets:
+        if os.path.isdir(target):
+            names = sorted(name for name in os.listdir(target) if name.endswith(EXTENSIONS))
+            found = [os.path.join(target, name) for name in names]
+        else:
+            found = sorted(glob.glob(target, recursive=True)) or [target]
+        for path in found:
+            if path not in seen and not os.path.isdir(path):
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def run_file(path):
+    """Lexes, parses and runs the program at path; returns its result."""
+    result = {'path': path, 'variables': {}, 'error': None, 'lex': None, 'parse': None, 'run': None}
+    variables = interpreter.Interpreter.variables
+    variables.clear()
+    try:
+        with open(path) as f:
+            text = f.read()
+        start = time.perf_counter()
+        stream = lexer.TokenStream(text)
+        result['lex'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tree = parser.Parser(stream).parse()
+        result['parse'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            interpreter.Interpreter(None).visit(tree)
+        finally:
+            result['run'] = time.perf_counter() - start
+    except Exception as e:
+        result['error'] = [type(e).__name__, str(e)]
+    result['variables'] = dict(variables)
+    return result
+
+
+def run_chunk(paths):
+    return [run_file(path) for path in paths]
+
+
+def run_batch(targets, workers=None, chunk=1):
+    """Yields the result of every file the targets name, as the chunks
+    finish. workers None stands for one per CPU."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('workers must be at least 1, not {}'.format(workers))
+    if chunk < 1:
+        raise ValueError('chunk must be at least 1, not {}'.format(chunk))
+    paths = expand(targets)
+    chunks = [paths[start:start + chunk] for start in range(0, len(paths), chunk)]
+    if not chunks:
+        return
+    with concurrent.futures.ProcessPoolExecutor(min(workers, len(chunks))) as pool:
+        futures = [pool.submit(run_chunk, paths) for paths in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            yield from future.result()
+
+
+def main():
+    arguments = argparse.ArgumentParser(description='Runs programs in a pool of processes and '
+                                                    'writes one line of JSON per program.')
+    arguments.add_argument('targets', nargs='+', help='directories, glob patterns or files')
+    arguments.add_argument('--workers', type=int, default=None, help='worker processes (default: CPUs)')
+    arguments.add_argument('--chunk', type=int, default=1, help='files handed to a worker at a time')
+    options = arguments.parse_args()
+    if options.workers is not None and options.workers < 1:
+        arguments.error('--workers must be at least 1')
+    if options.chunk < 1:
+        arguments.error('--chunk must be at least 1')
+    for result in run_batch(options.targets, options.workers, options.chunk):
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
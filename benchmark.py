@@ -0,0 +1,966 @@
+"""
+Benchmarks
+
+Run all of them with `python benchmark.py`, or pick some by name:
+`python benchmark.py lexer`
+
+"""
+
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import random
+import time
+import tracemalloc
+
+import arena
+import artifact
+import batch
+import cache
+import dataflow
+import closures
+import deep
+import transpile
+import vm
+import hoist
+import incremental
+import inference
+import interpreter
+import optimizer
+import quicken
+import reference
+import resolver
+import rope
+import scheduler
+import switch
+import lexer
+import loops
+import parser
+from programs import (
+    EDIT_KINDS, LADDER_ARMS, clear_variables, corpus, generate_changing_types,
+    generate_deep_programs, generate_expression, generate_ladder, generate_loop, generate_program,
+    generate_random_program, generate_straight_line, outcome, random_edit, run_backend, tree_shape,
+)
+
+
+def generate_source(size):
+    """Returns a generated program of at least `size` characters."""
+    block = len(generate_program(1)) - len(generate_program(0))
+    return generate_program(size // block + 1)
+
+
+def generate_nested_loops(outer, inner):
+    """A program with one while loop inside another."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut i = 0;',
+        '    let mut sum = 0;',
+        '    while i < {} {{'.format(outer),
+        '        let mut j = 0;',
+        '        while j < {} {{'.format(inner),
+        '            sum = sum + i * j % 13;',
+        '            j = j + 1;',
+        '        }',
+        '        i = i + 1;',
+        '    }',
+        '}',
+    ]) + '\n'
+
+
+def generate_constant_loop(iterations):
+    """A loop full of constant expressions and conditions."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut i = 0;',
+        '    let mut total = 0;',
+        '    while i < {} {{'.format(iterations),
+        '        total = total + (6 + 7) * 3 % 5 - 10 / 4;',
+        '        if 4 > 3 {',
+        '            i = i + 1;',
+        '        }',
+        '        else {',
+        '            i = i + 2;',
+        '        }',
+        '        while 6 > 7 {',
+        '            total = 0;',
+        '        }',
+        '    }',
+        '}',
+    ]) + '\n'
+
+
+def generate_counting_loop(bound):
+    """A loop of the kind LoopInterpreter skips."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut a = (6+7)*3;',
+        '    let mut total = 0;',
+        '    let mut steps = 0;',
+        '    while a < {} {{'.format(bound),
+        '        total = total + a;',
+        '        a = a+1;',
+        '        steps = steps + 2;',
+        '    }',
+        '}',
+    ]) + '\n'
+
+
+def generate_string_program(rng, statements=8):
+    """A random program that builds, copies and compares strings, mostly by
+    appending in loops."""
+    names = ['s', 't', 'w']
+    pieces = ['"ab"', '"piece"', '"Chandradithya"', '"x"', '""']
+
+    def operand(looped):
+        # in a loop, `s = s + t` would double s every time round
+        return rng.choice(pieces if looped else names + pieces)
+
+    def statement(pad, looped):
+        roll = rng.random()
+        target = rng.choice(names)
+        if roll < 0.45:
+            return ['{}{} = {} + {};'.format(pad, target, target, operand(looped))]
+        if roll < 0.6:
+            return ['{}{} = {} + {};'.format(pad, target, operand(looped), operand(looped))]
+        if roll < 0.7:
+            return ['{}{} = {};'.format(pad, target, rng.choice(names + pieces))]
+        if roll < 0.8:
+            op = rng.choice(['==', '!=', '<', '>=', '+'])
+            return ['{}b = {} {} {};'.format(pad, rng.choice(names + pieces), op, operand(False))]
+        if roll < 0.83:
+            return ['{}{} = {} * {};'.format(pad, target, operand(looped), rng.randint(0, 2))]
+        if roll < 0.85:
+            return ['{}{} = {} + 1;'.format(pad, target, operand(looped))]
+        return ['{}if {} == {} {{'.format(pad, rng.choice(names), operand(False)),
+                '{}    {} = {} + "same";'.format(pad, target, target),
+                '{}}}'.format(pad)]
+
+    lines = ['fn main(){']
+    lines.extend('    let mut {} = "{}";'.format(name, name) for name in names)
+    for number in range(statements):
+        if rng.random() < 0.5:
+            counter = 'k{}'.format(number)
+            lines.append('    let mut {} = 0;'.format(counter))
+            lines.append('    while {} < {} {{'.format(counter, rng.randint(0, 40)))
+            for _ in range(rng.randint(1, 3)):
+                lines.extend(statement('        ', True))
+            lines.append('        {} = {} + 1;'.format(counter, counter))
+            lines.append('    }')
+        else:
+            lines.extend(statement('    ', False))
+    return '\n'.join(lines + ['}']) + '\n'
+
+
+def generate_appends(pieces):
+    """A loop that appends pieces strings to one."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut text = "";',
+        '    let mut i = 0;',
+        '    while i < {} {{'.format(pieces),
+        '        text = text + "piece";',
+        '        i = i + 1;',
+        '    }',
+        '    let mut done = text == "";',
+        '}',
+    ]) + '\n'
+
+
+def generate_invariant_loop(iterations):
+    """A loop most of whose work gives the same values every time round."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut a = 0;',
+        '    let mut n = {};'.format(iterations),
+        '    let mut k = 7;',
+        '    let mut y = 2.5;',
+        '    let mut total = 0;',
+        '    while a < n {',
+        '        x = (k*3)+y;',
+        '        total = total + x * (k % 4 + y / 2);',
+        '        if total > k * 1000 {',
+        '            total = total - k * 1000;',
+        '        }',
+        '        a = a+1;',
+        '    }',
+        '}',
+    ]) + '\n'
+
+
+def generate_redundant_loop(iterations):
+    """A loop that works out the same expressions again and stores values
+    nobody reads."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut i = 0;',
+        '    let mut x = 6;',
+        '    let mut y = 7;',
+        '    let mut total = 0;',
+        '    while i < {} {{'.format(iterations),
+        '        a = x * y + i;',
+        '        b = x * y + i * 2;',
+        '        t = x * 3;',
+        '        t = x * y - 1;',
+        '        c = x * y + i;',
+        '        total = total + a + b + t + c;',
+        '        i = i + 1;',
+        '    }',
+        '}',
+    ]) + '\n'
+
+
+def generate_switch_program(rng, arms=8):
+    """A random else if ladder on one variable, with constants of every
+    type, some of them equal, and arms on other conditions between them."""
+    constants = ['0', '1', '2', '3', '2.5', '1.0', '"a"', '"b"', '1 == 1']
+    lines = ['fn main(){']
+    lines.append('    let mut x = {};'.format(rng.choice(constants[:-1] + ['0 == 1'])))
+    lines.append('    let mut y = {};'.format(rng.randint(0, 3)))
+    lines.append('    let mut k = 0;')
+    lines.append('    while k < 6 {')
+    for arm in range(arms):
+        keyword = 'if' if arm == 0 else 'else if'
+        if arm:
+            lines.append('        }')
+        roll = rng.random()
+        if roll < 0.8:
+            condition = 'x == {}'.format(rng.choice(constants[:-1]))
+        elif roll < 0.9:
+            condition = '{} == x'.format(rng.choice(constants[:-1]))
+        else:
+            condition = 'y == {}'.format(rng.randint(0, 3))
+        lines.append('        {} {} {{'.format(keyword, condition))
+        lines.append('            y = y + {};'.format(arm))
+    lines.append('        }')
+    if rng.random() < 0.5:
+        lines.append('        else {')
+        lines.append('            x = {};'.format(rng.choice(constants)))
+        lines.append('        }')
+    lines.append('        x = {};'.format(rng.choice(constants + ['x', 'y', 'u'])))
+    lines.append('        k = k + 1;')
+    lines.append('    }')
+    return '\n'.join(lines + ['}']) + '\n'
+
+
+def best_of(func, repeat=3):
+    """Runs func() `repeat` times and returns (best time in seconds, result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def measure_memory(func):
+    """Returns (bytes still allocated by func's result, result)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def count_nodes(tree):
+    """Number of AST nodes and statement lists in tree."""
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(incremental.children(node))
+    return count
+
+
+def tokenize(lexer_class, text):
+    """Returns every (type, value) pair up to and including EOF."""
+    lex = lexer_class(text)
+    tokens = []
+    while True:
+        tok = lex.get_next_token()
+        tokens.append((tok.type, tok.value))
+        if tok.type == lexer.EOF:
+            return tokens
+
+
+class Replay(object):
+    """Hands out a list of already lexed tokens, so a benchmark times only
+    the parser."""
+
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+
+    def get_next_token(self):
+        return next(self.tokens)
+
+
+def check_backend(interpreter_class, programs=500, seed=0, generator=generate_random_program):
+    """Runs the programs under Rust Test Files, random programs and an else
+    if ladder too long to walk by recursion with interpreter_class and with
+    the Interpreter, and raises AssertionError at the first one where the
+    variables or the error differ."""
+    texts = [text for _, text in corpus()]
+    rng = random.Random(seed)
+    texts.extend(generator(rng) for _ in range(programs))
+    texts.append(generate_loop(100))
+    texts.append(generate_ladder(LADDER_ARMS, 20))
+    for text in texts:
+        expected = outcome(interpreter.Interpreter, text)
+        got = outcome(interpreter_class, text)
+        if got != expected:
+            raise AssertionError('{} differs from the Interpreter: {} against {} on\n{}'.format(
+                interpreter_class.__name__, got, expected, text))
+    return len(texts)
+
+
+def bench_lexer(size=2 * 1024 * 1024):
+    """MB/s of the original character lexer against the master pattern lexer."""
+    text = generate_source(size)
+    mb = len(text) / (1024 * 1024)
+    print('lexer: {:.2f} MB of source'.format(mb))
+
+    results = {}
+    for lexer_class in (reference.CharLexer, lexer.Lexer):
+        seconds, tokens = best_of(lambda: tokenize(lexer_class, text))
+        results[lexer_class.__name__] = tokens
+        print('  {:<10} {:8.2f} MB/s  ({} tokens)'.format(
+            lexer_class.__name__, mb / seconds, len(tokens)))
+
+    if results['CharLexer'] != results['Lexer']:
+        raise AssertionError('Lexer and CharLexer produced different tokens')
+
+
+def bench_parser(statements=20000, depth=6):
+    """Tokens/s of Parser on an expression-heavy program, lexed beforehand."""
+    rng = random.Random(0)
+    lines = ['fn main(){']
+    for _ in range(statements):
+        lines.append('    x = {};'.format(generate_expression(rng, depth)))
+    lines.append('}')
+    tokens = list(lexer.Lexer('\n'.join(lines)).tokens())
+    print('parser: {} statements, {} tokens'.format(statements, len(tokens)))
+
+    seconds, _ = best_of(lambda: parser.Parser(Replay(tokens)).parse())
+    print('  {:8.0f} k tokens/s'.format(len(tokens) / seconds / 1000))
+
+
+def bench_stream(size=8 * 1024 * 1024):
+    """MB/s of lexing a file read whole against lexing it through an mmap."""
+    text = generate_source(size)
+    mb = len(text) / (1024 * 1024)
+    print('stream: {:.2f} MB file'.format(mb))
+
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+
+        def read_whole():
+            with open(path) as f:
+                return sum(1 for _ in lexer.Lexer(f.read()).tokens())
+
+        def read_stream():
+            with lexer.StreamLexer.from_path(path) as lex:
+                return sum(1 for _ in lex.tokens())
+
+        for name, func in (('Lexer', read_whole), ('StreamLexer', read_stream)):
+            seconds, count = best_of(func)
+            print('  {:<12} {:8.2f} MB/s  ({} tokens)'.format(name, mb / seconds, count))
+    finally:
+        os.remove(path)
+
+
+def bench_tokens(size=4 * 1024 * 1024):
+    """Memory held by a list of Token objects against a TokenStream."""
+    text = generate_source(size)
+    print('tokens: {:.2f} MB of source'.format(len(text) / (1024 * 1024)))
+
+    token_list, tokens = measure_memory(lambda: list(lexer.Lexer(text).tokens()))
+    count = len(tokens)
+    del tokens
+    token_stream, stream = measure_memory(lambda: lexer.TokenStream(text))
+    print('  {:<12} {:8.1f} MB  {:6.1f} bytes/token'.format(
+        'list(Token)', token_list / 1e6, token_list / count))
+    print('  {:<12} {:8.1f} MB  {:6.1f} bytes/token'.format(
+        'TokenStream', token_stream / 1e6, token_stream / count))
+
+    seconds, _ = best_of(lambda: parser.Parser(lexer.Lexer(text)).parse(), repeat=1)
+    print('  parse from Lexer        {:6.2f} s'.format(seconds))
+    seconds, _ = best_of(lambda: parser.Parser(lexer.TokenStream(text)).parse(), repeat=1)
+    print('  parse from TokenStream  {:6.2f} s'.format(seconds))
+
+
+def bench_incremental(blocks=2000, edits=200):
+    """Time to bring the tree up to date after editing one number, against
+    parsing the whole program again, then after every kind of edit."""
+    rng = random.Random(0)
+    doc = incremental.Document(generate_program(blocks))
+    print('incremental: {} statements, {} edits'.format(len(doc.tree.children), edits))
+
+    start = time.perf_counter()
+    for _ in range(edits):
+        digits = [m.start() for m in re.finditer('[0-9]+', doc.text[:20000])]
+        offset = rng.choice(digits)
+        doc.edit(offset, 1, str(rng.randint(0, 9)))
+    incremental_time = (time.perf_counter() - start) / edits
+
+    full_time, tree = best_of(lambda: parser.Parser(lexer.Lexer(doc.text)).parse(), repeat=1)
+    expected = tree_shape(tree)
+    if expected != tree_shape(doc.tree):
+        raise AssertionError('incremental tree differs from a full parse')
+    print('  edit       {:8.2f} ms'.format(incremental_time * 1000))
+    print('  full parse {:8.2f} ms'.format(full_time * 1000))
+
+    # every kind of edit, each undone at once, which brings back the text
+    # and so the tree above; test_incremental.py compares every step
+    print('  edit and undo, by kind of edit:')
+    for kind in EDIT_KINDS:
+        start = time.perf_counter()
+        for _ in range(edits // 10):
+            offset, removed, inserted = random_edit(rng, doc.text[:20000], kind)
+            old = doc.text[offset:offset + removed]
+            for change in ((offset, removed, inserted), (offset, len(inserted), old)):
+                try:
+                    doc.edit(*change)
+                except (lexer.LexerError, parser.ParserError):
+                    pass
+        seconds = (time.perf_counter() - start) / (edits // 10 * 2)
+        if tree_shape(doc.tree) != expected:
+            raise AssertionError('incremental tree differs from a full parse after {} edits'.format(kind))
+        print('    {:<12} {:8.2f} ms'.format(kind, seconds * 1000))
+
+
+def bench_parallel(size=8 * 1024 * 1024, workers=(1, 2, 4, 8)):
+    """MB/s of lex_parallel() with different numbers of worker processes."""
+    text = generate_source(size)
+    mb = len(text) / (1024 * 1024)
+    print('parallel: {:.2f} MB of source, {} CPUs'.format(mb, os.cpu_count()))
+
+    serial = lexer.TokenStream(text)
+    for count in workers:
+        seconds, stream = best_of(lambda: lexer.lex_parallel(text, count), repeat=1)
+        if (stream.kinds, stream.starts, stream.ends) != (serial.kinds, serial.starts, serial.ends):
+            raise AssertionError('lex_parallel with {} workers differs from TokenStream'.format(count))
+        print('  {} workers {:8.2f} MB/s'.format(count, mb / seconds))
+
+
+def bench_ast(blocks=5000):
+    """Memory per node and run time of the AST against a NodeArena."""
+    text = generate_program(blocks)
+    tokens = list(lexer.Lexer(text).tokens())
+    tree_bytes, tree = measure_memory(lambda: parser.Parser(Replay(tokens)).parse())
+    nodes = count_nodes(tree)
+    arena_bytes, nodes_arena = measure_memory(lambda: arena.NodeArena(tree))
+    print('ast: {} nodes'.format(nodes))
+    print('  {:<10} {:8.1f} MB  {:6.1f} bytes/node'.format('AST', tree_bytes / 1e6, tree_bytes / nodes))
+    print('  {:<10} {:8.1f} MB  {:6.1f} bytes/node'.format(
+        'NodeArena', arena_bytes / 1e6, arena_bytes / len(nodes_arena)))
+
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+    arena_time, variables = best_of(lambda: run_backend(arena.ArenaInterpreter, nodes_arena))
+    if variables != expected:
+        raise AssertionError('NodeArena run differs from the AST')
+    print('  run AST        {:6.2f} s'.format(tree_time))
+    print('  run NodeArena  {:6.2f} s'.format(arena_time))
+
+
+def bench_cache(programs=200, requests=5000, max_entries=100):
+    """Parse time of a stream of requests, some programs asked for much more
+    often than others, with and without a ParseCache."""
+    rng = random.Random(0)
+    texts = [generate_program(1 + i % 20).replace('block', 'program {}'.format(i)) for i in range(programs)]
+    weights = [1 / (rank + 1) for rank in range(programs)]
+    stream = rng.choices(texts, weights, k=requests)
+    print('cache: {} requests for {} programs, max_entries={}'.format(requests, programs, max_entries))
+
+    plain_time, _ = best_of(lambda: [parser.Parser(lexer.Lexer(text)).parse() for text in stream], repeat=1)
+    parse_cache = cache.ParseCache(max_entries=max_entries)
+    cached_time, trees = best_of(lambda: [parse_cache.parse(text) for text in stream], repeat=1)
+    for text in texts[:10]:
+        if tree_shape(parse_cache.parse(text)) != tree_shape(parser.Parser(lexer.Lexer(text)).parse()):
+            raise AssertionError('cached tree differs from a fresh parse')
+    print('  no cache   {:8.3f} ms/request'.format(plain_time / requests * 1000))
+    print('  ParseCache {:8.3f} ms/request'.format(cached_time / requests * 1000))
+    print('  ' + ', '.join('{} {}'.format(name, value) for name, value in parse_cache.stats().items()))
+
+
+def bench_closures(iterations=100000):
+    """Run time of a loop-heavy program in the Interpreter against the
+    closure compiler."""
+    tree = parser.Parser(lexer.Lexer(generate_loop(iterations))).parse()
+    print('closures: {} loop iterations'.format(iterations))
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+    closure_time, variables = best_of(lambda: run_backend(closures.ClosureInterpreter, tree))
+    if variables != expected:
+        raise AssertionError('closure run differs from the Interpreter')
+    print('  Interpreter         {:6.2f} s'.format(tree_time))
+    print('  ClosureInterpreter  {:6.2f} s  {:4.1f}x'.format(closure_time, tree_time / closure_time))
+
+
+def bench_transpile(iterations=100000, programs=500):
+    """Checks TranspileInterpreter against the Interpreter, then compares
+    their run times on a loop-heavy program."""
+    checked = check_backend(transpile.TranspileInterpreter, programs)
+    print('transpile: same results as the Interpreter on {} programs'.format(checked))
+    tree = parser.Parser(lexer.Lexer(generate_loop(iterations))).parse()
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+    compile_time, program = best_of(lambda: transpile.compile_tree(tree))
+    run_time, variables = best_of(lambda: run_backend(transpile.TranspileInterpreter, tree))
+    if variables != expected:
+        raise AssertionError('transpiled run differs from the Interpreter')
+    print('  {} loop iterations'.format(iterations))
+    print('  Interpreter           {:6.2f} s'.format(tree_time))
+    print('  TranspileInterpreter  {:6.2f} s  {:4.1f}x  (compiling {:.1f} ms)'.format(
+        run_time, tree_time / run_time, compile_time * 1000))
+
+
+def bench_vm(runs=2000, iterations=100000):
+    """Checks VMInterpreter against the Interpreter, then compares their run
+    times on Rust Test Files and on synthetic loops."""
+    checked = check_backend(vm.VMInterpreter)
+    print('vm: same results as the Interpreter on {} programs'.format(checked))
+
+    def run_tree(tree):
+        interpreter.Interpreter.variables.clear()
+        interpreter.Interpreter(None).visit(tree)
+
+    def run_code(code):
+        interpreter.Interpreter.variables.clear()
+        vm.execute(code, interpreter.Interpreter.variables)
+
+    workloads = [(name, text, runs) for name, text in corpus()]
+    workloads.append(('loop', generate_loop(iterations), 1))
+    workloads.append(('nested loops', generate_nested_loops(300, 300), 1))
+    print('  {:<14} {:>12} {:>12}'.format('', 'Interpreter', 'VM'))
+    for name, text, count in workloads:
+        tree = parser.Parser(lexer.Lexer(text)).parse()
+        code = vm.compile_tree(tree)
+        try:
+            run_tree(tree)
+        except NameError:
+            # test5 is only comments, which the parser turns into a stray '}'
+            continue
+        tree_time, _ = best_of(lambda: [run_tree(tree) for _ in range(count)])
+        code_time, _ = best_of(lambda: [run_code(code) for _ in range(count)])
+        print('  {:<14} {:10.3f} s {:10.3f} s  {:4.1f}x'.format(
+            name, tree_time, code_time, tree_time / code_time))
+
+
+def bench_optimizer(iterations=100000):
+    """Checks the optimizer against the plain Interpreter, then compares run
+    times on a loop full of constants."""
+    checked = check_backend(optimizer.OptimizedInterpreter)
+    print('optimizer: same results as the Interpreter on {} programs'.format(checked))
+    tree = parser.Parser(lexer.Lexer(generate_constant_loop(iterations))).parse()
+    optimize = optimizer.Optimizer()
+    optimized = optimize.optimize(tree)
+    print('  ' + ', '.join('{} {}'.format(kind, count) for kind, count in optimize.counts().items()))
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+    optimized_time, variables = best_of(lambda: run_backend(interpreter.Interpreter, optimized))
+    if variables != expected:
+        raise AssertionError('optimized tree differs from the Interpreter')
+    print('  {} loop iterations'.format(iterations))
+    print('  as parsed   {:6.2f} s'.format(tree_time))
+    print('  optimized   {:6.2f} s  {:4.1f}x'.format(optimized_time, tree_time / optimized_time))
+
+
+def bench_resolver(iterations=100000):
+    """Checks ResolvedInterpreter against the Interpreter, then compares
+    their run times on a loop-heavy program."""
+    checked = check_backend(resolver.ResolvedInterpreter)
+    print('resolver: same results as the Interpreter on {} programs'.format(checked))
+    tree = parser.Parser(lexer.Lexer(generate_loop(iterations))).parse()
+    resolved, names = resolver.resolve(tree)
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+    slot_time, variables = best_of(lambda: resolver.ResolvedInterpreter(None).run(resolved, names))
+    if variables != expected:
+        raise AssertionError('resolved run differs from the Interpreter')
+    print('  {} loop iterations, {} slots'.format(iterations, len(names)))
+    print('  Interpreter          {:6.2f} s'.format(tree_time))
+    print('  ResolvedInterpreter  {:6.2f} s  {:4.1f}x'.format(slot_time, tree_time / slot_time))
+
+
+def bench_loops(bound=200000):
+    """Checks LoopInterpreter against the Interpreter, then compares their
+    run times on a counting loop."""
+    checked = check_backend(loops.LoopInterpreter)
+    print('loops: same results as the Interpreter on {} programs'.format(checked))
+    tree = parser.Parser(lexer.Lexer(generate_counting_loop(bound))).parse()
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree), repeat=1)
+    loop_time, variables = best_of(lambda: run_backend(loops.LoopInterpreter, tree))
+    if variables != expected:
+        raise AssertionError('LoopInterpreter differs from the Interpreter')
+    print('  loop up to {}'.format(bound))
+    print('  Interpreter      {:12.6f} s'.format(tree_time))
+    print('  LoopInterpreter  {:12.6f} s'.format(loop_time))
+    # the skipped loop takes as long however far it counts
+    for far in (bound * 100, bound * 100000):
+        tree = parser.Parser(lexer.Lexer(generate_counting_loop(far))).parse()
+        far_time, _ = best_of(lambda: run_backend(loops.LoopInterpreter, tree))
+        print('  LoopInterpreter  {:12.6f} s  loop up to {}'.format(far_time, far))
+    counter = loops.LoopInterpreter(None)
+    counter.run(tree)
+    print('  {} loop skipped, {} stepped'.format(counter.skipped, counter.stepped))
+
+
+def bench_rope(pieces=100000):
+    """Checks RopeInterpreter against the Interpreter, then times building a
+    string of `pieces` appends with both."""
+    checked = check_backend(rope.RopeInterpreter)
+    checked += check_backend(rope.RopeInterpreter, generator=generate_string_program)
+    print('rope: same results as the Interpreter on {} programs'.format(checked))
+    for count in (pieces // 10, pieces):
+        tree = parser.Parser(lexer.Lexer(generate_appends(count))).parse()
+        tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree), repeat=1)
+        rope_time, variables = best_of(lambda: run_backend(rope.RopeInterpreter, tree), repeat=1)
+        if variables != expected:
+            raise AssertionError('RopeInterpreter differs from the Interpreter')
+        print('  {:7} appends  Interpreter {:8.3f} s   RopeInterpreter {:8.3f} s'.format(
+            count, tree_time, rope_time))
+
+
+MIXED_TYPES_SOURCE = """fn main(){
+    let mut a = 1;
+    let mut name = "a";
+    a = a + 2.5;
+    name = 3;
+}
+"""
+
+
+def bench_types(iterations=100000):
+    """Checks TypedInterpreter against the Interpreter, then compares it
+    with the closure compiler it builds on, on arithmetic-heavy loops."""
+    checked = check_backend(inference.TypedInterpreter)
+    checked += check_backend(inference.TypedInterpreter, generator=generate_string_program)
+    print('types: same results as the Interpreter on {} programs'.format(checked))
+    inference_ = inference.TypeInference()
+    inference_.infer(parser.Parser(lexer.Lexer(MIXED_TYPES_SOURCE)).parse())
+    print('  mixed types found in a test program:')
+    for line in inference_.report().splitlines():
+        print('    ' + line)
+
+    for label, text in (('loop', generate_loop(iterations)),
+                        ('nested loops', generate_nested_loops(iterations // 1000, 1000))):
+        tree = parser.Parser(lexer.Lexer(text)).parse()
+        closure_time, expected = best_of(lambda: run_backend(closures.ClosureInterpreter, tree))
+        typed_time, variables = best_of(lambda: run_backend(inference.TypedInterpreter, tree))
+        if variables != expected:
+            raise AssertionError('TypedInterpreter differs from ClosureInterpreter')
+        counter = inference.TypedInterpreter(None)
+        counter.run(tree)
+        print('  {}, {} iterations: {} operations specialized, {} generic'.format(
+            label, iterations, counter.compiler.specialized, counter.compiler.generic))
+        print('    ClosureInterpreter  {:6.3f} s'.format(closure_time))
+        print('    TypedInterpreter    {:6.3f} s  {:4.2f}x'.format(typed_time, closure_time / typed_time))
+
+
+def bench_quicken(iterations=100000):
+    """Checks QuickeningInterpreter against the Interpreter, also on loops
+    whose types change, then compares their run times."""
+    checked = check_backend(quicken.QuickeningInterpreter)
+    checked += check_backend(quicken.QuickeningInterpreter, generator=generate_changing_types)
+    print('quicken: same results as the Interpreter on {} programs'.format(checked))
+    counter = quicken.QuickeningInterpreter(None)
+    rng = random.Random(0)
+    for _ in range(100):
+        tree = parser.Parser(lexer.Lexer(generate_changing_types(rng))).parse()
+        counter.variables.clear()
+        counter.run(tree)
+    print('  100 loops whose types change: {} nodes quickened, {} deoptimized'.format(
+        counter.counts.get(quicken.QUICKENED, 0), counter.counts.get(quicken.DEOPTIMIZED, 0)))
+
+    for label, text in (('loop', generate_loop(iterations)),
+                        ('nested loops', generate_nested_loops(iterations // 1000, 1000))):
+        tree = parser.Parser(lexer.Lexer(text)).parse()
+        tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+        quick_time, variables = best_of(lambda: run_backend(quicken.QuickeningInterpreter, tree))
+        if variables != expected:
+            raise AssertionError('QuickeningInterpreter differs from the Interpreter')
+        counter = quicken.QuickeningInterpreter(None)
+        counter.run(tree)
+        kinds = ', '.join('{} {}'.format(count, key.split()[1]) for key, count in sorted(counter.counts.items())
+                          if key.startswith(quicken.QUICKENED + ' '))
+        print('  {}, {} iterations: {} nodes quickened ({})'.format(
+            label, iterations, counter.counts.get(quicken.QUICKENED, 0), kinds))
+        print('    Interpreter            {:6.3f} s'.format(tree_time))
+        print('    QuickeningInterpreter  {:6.3f} s  {:4.2f}x'.format(quick_time, tree_time / quick_time))
+
+
+def bench_hoist(iterations=100000):
+    """Checks HoistingInterpreter against the Interpreter, then compares
+    their run times on a loop full of invariant expressions."""
+    checked = check_backend(hoist.HoistingInterpreter)
+    checked += check_backend(hoist.HoistingInterpreter, generator=generate_changing_types)
+    print('hoist: same results as the Interpreter on {} programs'.format(checked))
+    for label, text in (('invariant loop', generate_invariant_loop(iterations)),
+                        ('loop', generate_loop(iterations))):
+        tree = parser.Parser(lexer.Lexer(text)).parse()
+        tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+        hoist_time, variables = best_of(lambda: run_backend(hoist.HoistingInterpreter, tree))
+        if variables != expected:
+            raise AssertionError('HoistingInterpreter differs from the Interpreter')
+        counter = hoist.HoistingInterpreter(None)
+        counter.run(tree)
+        print('  {}, {} iterations: {} expressions hoisted'.format(label, iterations, counter.hoisted))
+        print('    Interpreter          {:6.3f} s'.format(tree_time))
+        print('    HoistingInterpreter  {:6.3f} s  {:4.2f}x'.format(hoist_time, tree_time / hoist_time))
+
+
+def bench_dataflow(iterations=100000):
+    """Checks DataflowInterpreter against the Interpreter, then compares
+    their run times on a loop full of repeated work."""
+    checked = check_backend(dataflow.DataflowInterpreter)
+    checked += check_backend(dataflow.DataflowInterpreter, generator=generate_straight_line)
+    print('dataflow: same results as the Interpreter on {} programs'.format(checked))
+    for label, text in (('redundant loop', generate_redundant_loop(iterations)),
+                        ('loop', generate_loop(iterations))):
+        tree = parser.Parser(lexer.Lexer(text)).parse()
+        tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+        flow_time, variables = best_of(lambda: run_backend(dataflow.DataflowInterpreter, tree))
+        if variables != expected:
+            raise AssertionError('DataflowInterpreter differs from the Interpreter')
+        counter = dataflow.DataflowInterpreter(None)
+        counter.run(tree)
+        done = counter.optimizer
+        print('  {}, {} iterations: {} expressions reused, {} dead stores dropped, {} kept'.format(
+            label, iterations, done.reused, done.dropped, done.kept))
+        print('    Interpreter          {:6.3f} s'.format(tree_time))
+        print('    DataflowInterpreter  {:6.3f} s  {:4.2f}x'.format(flow_time, tree_time / flow_time))
+
+
+def bench_switch(arms=(10, 100, 1000), iterations=5000, deepest=10000):
+    """Checks SwitchInterpreter against the Interpreter, then compares
+    their run times on loops around ladders of more and more arms."""
+    checked = check_backend(switch.SwitchInterpreter)
+    checked += check_backend(switch.SwitchInterpreter, generator=generate_switch_program)
+    print('switch: same results as the Interpreter on {} programs'.format(checked))
+    print('  {} loop iterations'.format(iterations))
+    for count in arms:
+        tree = parser.Parser(lexer.Lexer(generate_ladder(count, iterations))).parse()
+        tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree), repeat=1)
+        switch_time, variables = best_of(lambda: run_backend(switch.SwitchInterpreter, tree))
+        if variables != expected:
+            raise AssertionError('SwitchInterpreter differs from the Interpreter')
+        print('  {:5} arms  Interpreter {:7.3f} s   SwitchInterpreter {:7.3f} s  {:6.1f}x'.format(
+            count, tree_time, switch_time, tree_time / switch_time))
+    # parsing and running a ladder no longer takes a call per arm
+    seconds, tree = best_of(lambda: parser.Parser(lexer.Lexer(generate_ladder(deepest, 1))).parse(), repeat=1)
+    run_backend(interpreter.Interpreter, tree)
+    run_backend(switch.SwitchInterpreter, tree)
+    print('  {} arms parsed in {:.2f} s and run by both without recursion'.format(deepest, seconds))
+
+
+def bench_deep(depth=100000, size=1024 * 1024, iterations=100000):
+    """Checks StackParser and StackInterpreter against Parser and the
+    Interpreter, runs programs nested `depth` levels deep, which the
+    Parser cannot read, then compares their speed on ordinary programs."""
+    rng = random.Random(0)
+    texts = [generate_random_program(rng) for _ in range(500)]
+    texts.extend('fn main() {{\n x = {};\n}}\n'.format(generate_expression(rng, 6)) for _ in range(500))
+    for text in texts:
+        if tree_shape(parser.Parser(lexer.Lexer(text)).parse()) != tree_shape(
+                deep.StackParser(lexer.Lexer(text)).parse()):
+            raise AssertionError('StackParser differs from the Parser on\n{}'.format(text))
+    checked = check_backend(deep.StackInterpreter)
+    print('deep: same trees as the Parser on {} programs, same results as the Interpreter on {}'.format(
+        len(texts), checked))
+
+    print('  {} levels'.format(depth))
+    for name, text, expected in generate_deep_programs(depth):
+        try:
+            parser.Parser(lexer.Lexer(text)).parse()
+            recursive = 'parsed'
+        except RecursionError:
+            recursive = 'RecursionError'
+        parse_time, tree = best_of(lambda: deep.StackParser(lexer.Lexer(text)).parse(), repeat=1)
+        run_time, variables = best_of(lambda: run_backend(deep.StackInterpreter, tree), repeat=1)
+        if variables != expected:
+            raise AssertionError('StackInterpreter gives {} on {}'.format(variables, name))
+        # freeing the tree must not overflow the C stack either
+        start = time.perf_counter()
+        del tree
+        free_time = time.perf_counter() - start
+        print('    {:<15} Parser: {:<15} StackParser {:5.2f} s, run {:5.2f} s, freed {:5.2f} s'.format(
+            name, recursive, parse_time, run_time, free_time))
+
+    text = generate_source(size)
+    # [0] frees each tree before the next parser runs
+    parse_time = best_of(lambda: parser.Parser(lexer.Lexer(text)).parse())[0]
+    stack_time = best_of(lambda: deep.StackParser(lexer.Lexer(text)).parse())[0]
+    print('  {:.2f} MB parsed: Parser {:6.3f} s, StackParser {:6.3f} s'.format(
+        len(text) / (1024 * 1024), parse_time, stack_time))
+    tree = parser.Parser(lexer.Lexer(generate_loop(iterations))).parse()
+    tree_time, expected = best_of(lambda: run_backend(interpreter.Interpreter, tree))
+    stack_time, variables = best_of(lambda: run_backend(deep.StackInterpreter, tree))
+    if variables != expected:
+        raise AssertionError('StackInterpreter differs from the Interpreter')
+    print('  {} loop iterations: Interpreter {:6.3f} s, StackInterpreter {:6.3f} s'.format(
+        iterations, tree_time, stack_time))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+async def schedule(slice_steps, small, long, forever=None):
+    """Runs the long programs, then the small ones, and an endless one if
+    given, which is cancelled once the rest have ended. Returns (seconds,
+    latencies of the small programs, Scheduler)."""
+    sched = scheduler.Scheduler(slice_steps)
+    start = time.perf_counter()
+    for text in long:
+        sched.submit(text)
+    programs = [sched.submit(text) for text in small]
+    if forever is not None:
+        sched.submit(forever, 'forever')
+        others = [program.task for name, program in sched.programs.items() if name != 'forever']
+        await asyncio.wait(others)
+        sched.cancel('forever')
+    results = await sched.wait()
+    seconds = time.perf_counter() - start
+    if forever is not None and not isinstance(results['forever'], asyncio.CancelledError):
+        raise AssertionError('the endless program was not cancelled')
+    return seconds, [program.latency() for program in programs], sched
+
+
+def bench_async(programs=1000, small=100, long=(200000, 200000, 200000)):
+    """Latency of `programs` small programs run alongside a few long ones,
+    with the long ones run to the end before giving way and with every
+    program given way every scheduler.SLICE_STEPS steps."""
+    small_texts = [generate_loop(small + index % 10) for index in range(programs)]
+    long_texts = [generate_loop(iterations) for iterations in long]
+    expected = run_backend(interpreter.Interpreter, parser.Parser(lexer.Lexer(small_texts[0])).parse())
+    if asyncio.run(scheduler.run_program(small_texts[0])) != expected:
+        raise AssertionError('run_program differs from the Interpreter')
+    print('async: {} programs of {} loop iterations with {} of {}'.format(
+        programs, small, len(long), ', '.join(str(iterations) for iterations in long)))
+    for label, slice_steps in (('whole programs', sys.maxsize), ('sliced', scheduler.SLICE_STEPS)):
+        seconds, latencies, sched = asyncio.run(schedule(slice_steps, small_texts, long_texts))
+        print('  {:<15} {:6.2f} s, {:6.0f} programs/s, small programs done in {:7.3f} s median, '
+              '{:7.3f} s p99, {:7.3f} s max'.format(
+                  label, seconds, len(sched.programs) / seconds, percentile(latencies, 0.5),
+                  percentile(latencies, 0.99), max(latencies)))
+    seconds, latencies, sched = asyncio.run(
+        schedule(scheduler.SLICE_STEPS, small_texts, [], forever=generate_loop(10 ** 12)))
+    print('  an endless program among the small ones: they are done in {:.3f} s p99, '
+          'then it is cancelled'.format(percentile(latencies, 0.99)))
+
+
+def bench_batch(files=400, workers=(1, 2, 4, 8), chunks=(1, 20)):
+    """Files/s of batch.run_batch() over a directory of programs with
+    different numbers of worker processes and files per chunk."""
+    rng = random.Random(0)
+    texts = [text for _, text in corpus()]
+    while len(texts) < files:
+        texts.append(generate_random_program(rng))
+        texts.append(generate_loop(rng.randint(100, 5000)))
+    with tempfile.TemporaryDirectory() as folder:
+        for index, text in enumerate(texts[:files]):
+            with open(os.path.join(folder, 'program{:05}.rs'.format(index)), 'w') as f:
+                f.write(text)
+        expected = {}
+        for path in batch.expand([folder]):
+            result = batch.run_file(path)
+            expected[path] = (result['variables'], result['error'])
+        print('batch: {} programs, {} CPUs'.format(len(expected), os.cpu_count()))
+        for chunk in chunks:
+            for count in workers:
+                seconds, results = best_of(lambda: list(batch.run_batch([folder], count, chunk)), repeat=1)
+                got = {result['path']: (result['variables'], result['error']) for result in results}
+                if got != expected:
+                    raise AssertionError('run_batch with {} workers differs from running each file'.format(count))
+                print('  {} workers, {:3} files a chunk {:8.1f} files/s'.format(count, chunk, len(results) / seconds))
+
+
+COLD_START_SOURCE = """
+import interpreter, lexer, parser
+with open({path!r}) as f:
+    text = f.read()
+interpreter.Interpreter(parser.Parser(lexer.Lexer(text))).interpret()
+"""
+
+COLD_START_ARTIFACT = """
+import artifact
+artifact.run({path!r})
+"""
+
+
+def bench_artifact(blocks=2000, repeat=5):
+    """Cold start of a new Python process running a program from its source
+    against running it from a compiled artifact."""
+    text = generate_program(blocks)
+    here = os.path.dirname(os.path.abspath(__file__))
+    fd, source_path = tempfile.mkstemp(suffix='.rs')
+    os.close(fd)
+    artifact_path = source_path + 'a'
+    try:
+        with open(source_path, 'w') as f:
+            f.write(text)
+        with open(artifact_path, 'wb') as f:
+            f.write(artifact.compile_source(text))
+        print('artifact: {:.2f} MB of source, {:.2f} MB artifact'.format(
+            len(text) / (1024 * 1024), os.path.getsize(artifact_path) / (1024 * 1024)))
+
+        interpreter.Interpreter.variables.clear()
+        interpreter.Interpreter(parser.Parser(lexer.Lexer(text))).interpret()
+        if artifact.run(artifact_path) != interpreter.Interpreter.variables:
+            raise AssertionError('artifact run differs from the Interpreter')
+
+        for name, script in (('source', COLD_START_SOURCE), ('artifact', COLD_START_ARTIFACT)):
+            code = script.format(path=source_path if name == 'source' else artifact_path)
+            seconds, _ = best_of(lambda: subprocess.run([sys.executable, '-c', code], cwd=here, check=True),
+                                 repeat=repeat)
+            print('  from {:<9} {:8.1f} ms'.format(name, seconds * 1000))
+    finally:
+        os.remove(source_path)
+        if os.path.exists(artifact_path):
+            os.remove(artifact_path)
+
+
+BENCHMARKS = {
+    'lexer': bench_lexer,
+    'parser': bench_parser,
+    'stream': bench_stream,
+    'tokens': bench_tokens,
+    'incremental': bench_incremental,
+    'parallel': bench_parallel,
+    'ast': bench_ast,
+    'cache': bench_cache,
+    'artifact': bench_artifact,
+    'closures': bench_closures,
+    'transpile': bench_transpile,
+    'vm': bench_vm,
+    'optimizer': bench_optimizer,
+    'resolver': bench_resolver,
+    'loops': bench_loops,
+    'rope': bench_rope,
+    'types': bench_types,
+    'quicken': bench_quicken,
+    'hoist': bench_hoist,
+    'dataflow': bench_dataflow,
+    'switch': bench_switch,
+    'deep': bench_deep,
+    'async': bench_async,
+    'batch': bench_batch,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
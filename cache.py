@@ -0,0 +1,127 @@
+"""
+Parse cache
+
+Remembers the AST of every program it has parsed, keyed by a hash of the
+source text, so running the same program again skips the lexer and the
+parser. The least recently used trees are dropped once there are more
+than max_entries of them or they take more than max_bytes.
+
+    cache = ParseCache(max_entries=1000, max_bytes=64 * 1024 * 1024)
+    Interpreter(CachedParser(text, cache)).interpret()
+
+A cached tree is handed to everyone who parses the same text, so it must
+not be changed: the Interpreter only reads it, but an
+incremental.Document edits its tree in place and has to parse its own.
+
+"""
+
+import collections
+import hashlib
+import sys
+import threading
+
+import lexer
+import parser
+import tokens
+
+
+def source_key(text):
+    """The cache key of a program's source text."""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def tree_size(tree):
+    """Roughly how many bytes tree takes: its nodes, statement lists and
+    tokens, their values, and the source text the tokens point into."""
+    size = 0
+    seen = set()
+    stack = [tree]
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, list):
+            stack.extend(obj)
+        elif isinstance(obj, parser.AST):
+            stack.extend(getattr(obj, name) for name in type(obj).__slots__)
+        elif isinstance(obj, tokens.Token):
+            stack.append(obj.value)
+            stack.append(obj.positions)
+        elif isinstance(obj, tokens.LineIndex):
+            stack.append(obj.text)
+            stack.append(obj.starts)
+    return size
+
+
+class ParseCache(object):
+    def __init__(self, max_entries=1024, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (tree, size), least recently used first
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, text):
+        return source_key(text) in self.entries
+
+    def parse(self, text):
+        """The AST of text, from the cache if it is there. Raises
+        LexerError or ParserError like Parser.parse; errors are not cached."""
+        key = source_key(text)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        tree = parser.Parser(lexer.Lexer(text)).parse()
+        size = tree_size(tree)
+        with self._lock:
+            if key not in self.entries and size <= self.max_bytes:
+                self.entries[key] = (tree, size)
+                self.bytes += size
+                self._evict()
+        return tree
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class CachedParser(object):
+    """Stands in for a Parser, for the Interpreter: parse() goes through
+    the cache."""
+
+    def __init__(self, text, cache):
+        self.text = text
+        self.cache = cache
+
+    def parse(self):
+        return self.cache.parse(self.text)
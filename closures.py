@@ -0,0 +1,141 @@
+"""
+Closure compiler
+
+Turns the AST into nested Python closures, once, before the program runs.
+Every node becomes a function with its children and operator already
+bound, so running the program looks up no visit_ methods and compares no
+operator names.
+
+    run = Compiler(variables).visit(tree)
+    run()
+
+"""
+
+import operator
+
+import interpreter
+import parser
+
+OPERATOR_FUNCTIONS = {
+    parser.PLUS: operator.add,
+    parser.MINUS: operator.sub,
+    parser.MULTIPLY: operator.mul,
+    parser.DIVIDE: operator.truediv,
+    parser.MODULO: operator.mod,
+    parser.EQ: operator.eq,
+    parser.NE: operator.ne,
+    parser.GT: operator.gt,
+    parser.LT: operator.lt,
+    parser.GE: operator.ge,
+    parser.LE: operator.le,
+}
+
+
+class Compiler(interpreter.NodeVisitor):
+    """visit(node) returns a function of no arguments that does what
+    Interpreter.visit(node) would, reading and writing `variables`."""
+
+    def __init__(self, variables):
+        self.variables = variables
+
+    def visit_Num(self, node):
+        value = node.value
+
+        def num():
+            return value
+        return num
+
+    def visit_Var(self, node):
+        var_name = node.value
+        get = self.variables.get
+
+        def var():
+            val = get(var_name)
+            if val is None:
+                raise NameError(repr(var_name))
+            return val
+        return var
+
+    def visit_BinOP(self, node):
+        function = OPERATOR_FUNCTIONS[node.op.type]
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        # a constant on the right, as in `i + 1` or `i < 10`, is common
+        # enough to save a call for
+        if isinstance(node.right, parser.Num):
+            value = node.right.value
+
+            def binop_constant():
+                return function(left(), value)
+            return binop_constant
+
+        def binop():
+            return function(left(), right())
+        return binop
+
+    def visit_Assign(self, node):
+        var_name = node.left.value
+        value = self.visit(node.right)
+        variables = self.variables
+
+        def assign():
+            variables[var_name] = value()
+        return assign
+
+    def visit_If(self, node):
+        # the else if chain becomes one list of (condition, body) arms
+        arms = []
+        while isinstance(node, parser.If):
+            arms.append((self.visit(node.condition), self.visit(node.body)))
+            node = node.control_body
+        otherwise = self.visit(node)
+
+        def if_():
+            for condition, body in arms:
+                if condition():
+                    body()
+                    return
+            otherwise()
+        return if_
+
+    def visit_While(self, node):
+        condition = self.visit(node.condition)
+        body = self.visit(node.body)
+
+        def while_():
+            while condition():
+                body()
+        return while_
+
+    def visit_list(self, node):
+        statements = tuple(self.visit(child) for child in node
+                           if not isinstance(child, parser.NoOp))
+        if len(statements) == 1:
+            return statements[0]
+
+        def block():
+            for statement in statements:
+                statement()
+        return block
+
+    def visit_Compound(self, node):
+        return self.visit_list(node.children)
+
+    def visit_NoOp(self, node):
+        def noop():
+            pass
+        return noop
+
+    def visit_Compare(self, node):
+        return self.visit_NoOp(node)
+
+
+class ClosureInterpreter(interpreter.Interpreter):
+    """Interpreter that compiles the tree into closures and runs those.
+    Variables end up in self.variables, as with the Interpreter."""
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        return Compiler(self.variables).visit(tree)()
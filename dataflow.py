@@ -0,0 +1,370 @@
+"""
+Common subexpressions and dead stores
+
+Works on each straight-line list of statements: the top level of a
+program and the bodies of its ifs and whiles, each on its own.
+
+Common subexpressions: in
+
+    a = x*y + 1;
+    b = x*y + 2;
+    c = a;
+    d = x*y + 1;
+
+x*y is worked out once. The first x*y becomes a Save, which keeps its
+value in a slot, and the second a Load of that slot. d = x*y + 1 becomes
+d = a, as a still holds that value. An expression is reused only while
+none of its variables, and not the variable holding it, has been
+assigned since. An if or while in the list ends the reuse of whatever
+it assigns; a while's condition is never replaced, as the loop changes
+what it reads.
+
+Dead stores: in `x = 1; y = 2; x = 3;` the first store to x is never
+read. It is dropped when nothing from it up to the next store of x can
+raise, for otherwise the error would leave x as the first store set it.
+Whether an expression can raise is worked out from the types of the
+variables assigned earlier in the same list. A dead store whose own
+expression can raise, e.g. x = 1 / k, is kept as an expression on its
+own, so it still raises where it did.
+
+Variables and errors are those the Interpreter gives. The input tree is
+not changed.
+
+    DataflowInterpreter(Parser(Lexer(text))).interpret()
+
+"""
+
+import hoist
+import inference
+import interpreter
+import parser
+
+
+class Save(parser.AST):
+    """expr, whose value is also kept in slot for Loads."""
+    __slots__ = ('expr', 'slot')
+
+    def __init__(self, expr, slot):
+        self.expr = expr
+        self.slot = slot
+
+
+class Load(parser.AST):
+    """The value of the Save with the same slot."""
+    __slots__ = ('slot',)
+
+    def __init__(self, slot):
+        self.slot = slot
+
+
+def expression_key(node):
+    """(key equal for equal expressions, names the expression reads), or
+    None if node is not an expression."""
+    if isinstance(node, parser.Num):
+        # repr tells 0.0 from -0.0
+        return (type(node.value), repr(node.value)), frozenset()
+    if isinstance(node, parser.Var):
+        return (node.value,), frozenset((node.value,))
+    if isinstance(node, parser.BinOP):
+        left = expression_key(node.left)
+        right = expression_key(node.right)
+        if left is None or right is None:
+            return None
+        return (node.op.type, left[0], right[0]), left[1] | right[1]
+    return None
+
+
+def read_names(node, names):
+    """Adds the names of the variables read by an expression to names."""
+    if isinstance(node, parser.Var):
+        names.add(node.value)
+    elif isinstance(node, parser.BinOP):
+        read_names(node.left, names)
+        read_names(node.right, names)
+    elif isinstance(node, Save):
+        read_names(node.expr, names)
+    return names
+
+
+def contains_save(node):
+    if isinstance(node, Save):
+        return True
+    if isinstance(node, parser.BinOP):
+        return contains_save(node.left) or contains_save(node.right)
+    return False
+
+
+def nonzero_constant(node, kind):
+    return isinstance(node, parser.Num) and type(node.value) is kind and node.value != 0
+
+
+def safe_result(op, left, right, right_node):
+    """The type of `left op right` if it surely does not raise, else
+    None. int with float is left out, as a big int overflows a float."""
+    if op in (parser.EQ, parser.NE):
+        return inference.BOOL
+    numbers = (inference.INT, inference.BOOL)
+    if op in (parser.GT, parser.LT, parser.GE, parser.LE):
+        if left in inference.NUMBERS and right in inference.NUMBERS:
+            return inference.BOOL
+        if left == right == inference.STR:
+            return inference.BOOL
+        return None
+    if op in (parser.PLUS, parser.MINUS, parser.MULTIPLY):
+        if left in numbers and right in numbers:
+            return inference.INT
+        if left == right == inference.FLOAT:
+            return inference.FLOAT
+        if op == parser.PLUS and left == right == inference.STR:
+            return inference.STR
+        return None
+    if op == parser.DIVIDE:
+        if left == inference.FLOAT and nonzero_constant(right_node, float):
+            return inference.FLOAT
+        return None
+    # MODULO
+    if left == inference.INT and nonzero_constant(right_node, int):
+        return inference.INT
+    if left == inference.FLOAT and nonzero_constant(right_node, float):
+        return inference.FLOAT
+    return None
+
+
+class DataflowOptimizer(object):
+    def __init__(self):
+        # number of Save slots
+        self.slots = 0
+        # expressions replaced by a variable or a Load
+        self.reused = 0
+        # dead stores dropped, and kept as expressions for their errors
+        self.dropped = 0
+        self.kept = 0
+        # slot -> type of the saved value, if it cannot raise
+        self._slot_types = {}
+
+    def optimize(self, tree):
+        if isinstance(tree, parser.Compound):
+            return self.nested(tree, {})
+        return self.statements([tree])
+
+    def statements(self, nodes, known=None):
+        """The optimized statement list; known holds the types of the
+        variables surely set, and set without error, before it."""
+        result = self.eliminate_common(nodes)
+        return self.eliminate_dead(result, {} if known is None else known)
+
+    def nested(self, node, known):
+        """A body or an else part, optimized as a list of its own."""
+        if isinstance(node, list):
+            return self.statements(node, dict(known))
+        if isinstance(node, parser.If):
+            # an else if chain is walked in a loop, not one call per arm
+            arms = []
+            while isinstance(node, parser.If):
+                arms.append((node.condition, self.nested(node.body, known), node.token))
+                node = node.control_body
+            result = self.nested(node, known)
+            for condition, body, token in reversed(arms):
+                result = parser.If(condition, body, result, token)
+            return result
+        if isinstance(node, parser.Compound):
+            compound = parser.Compound()
+            compound.children = self.statements(node.children, dict(known))
+            return compound
+        return node
+
+    def eliminate_common(self, nodes):
+        """Copies the statements with the expressions worked out before
+        replaced. The bodies of ifs and whiles are left to eliminate_dead,
+        which knows the types of the variables where they start."""
+        # key -> (names read, Var holding the value, or
+        # [node, parent, attribute, Save or None])
+        available = {}
+        result = []
+        for node in nodes:
+            if isinstance(node, parser.Assign):
+                var_name = node.left.value
+                assign = parser.Assign(node.left, node.op, None)
+                assign.right = self.expr(node.right, available, assign, 'right')
+                self.kill(available, (var_name,))
+                key = expression_key(node.right)
+                if isinstance(node.right, parser.BinOP) and var_name not in key[1]:
+                    available[key[0]] = (key[1], node.left)
+                result.append(assign)
+            elif isinstance(node, parser.If):
+                new = parser.If(None, node.body, node.control_body, node.token)
+                new.condition = self.expr(node.condition, available, new, 'condition')
+                self.kill(available, hoist.assigned_names(node, set()))
+                result.append(new)
+            elif isinstance(node, (parser.While, list, parser.Compound)):
+                result.append(node)
+                self.kill(available, hoist.assigned_names(node, set()))
+            elif isinstance(node, parser.BinOP):
+                # a stray expression statement; its place in result is
+                # where a Save goes if it is reused
+                result.append(None)
+                result[-1] = self.expr(node, available, result, len(result) - 1)
+            else:
+                result.append(node)
+        return result
+
+    def kill(self, available, names):
+        for key, (read, holder) in list(available.items()):
+            if (any(var_name in read for var_name in names)
+                    or (isinstance(holder, parser.Var) and holder.value in names)):
+                del available[key]
+
+    def expr(self, node, available, parent, attribute):
+        """A copy of node, with expressions worked out before replaced by
+        the variable or the Load that holds them."""
+        if not isinstance(node, parser.BinOP):
+            return node
+        key, read = expression_key(node)
+        entry = available.get(key)
+        if entry is not None:
+            holder = entry[1]
+            self.reused += 1
+            if isinstance(holder, parser.Var):
+                return holder
+            if holder[3] is None:
+                # first reuse: save the value where it is worked out
+                holder[3] = Save(holder[0], self.slots)
+                self.slots += 1
+                if isinstance(holder[1], list):
+                    holder[1][holder[2]] = holder[3]
+                else:
+                    setattr(holder[1], holder[2], holder[3])
+            return Load(holder[3].slot)
+        new = parser.BinOP(None, node.op, None)
+        new.left = self.expr(node.left, available, new, 'left')
+        new.right = self.expr(node.right, available, new, 'right')
+        available[key] = (read, [new, parent, attribute, None])
+        return new
+
+    def eliminate_dead(self, nodes, known):
+        # whether each statement may raise, from the types known before
+        # it; the bodies in the list are optimized on the way
+        unsafe = []
+        for index, node in enumerate(nodes):
+            if isinstance(node, parser.Assign):
+                kind = self.safe_type(node.right, known)
+                unsafe.append(kind is None)
+                if kind is None:
+                    known.pop(node.left.value, None)
+                else:
+                    known[node.left.value] = kind
+            elif isinstance(node, (parser.If, parser.While, list, parser.Compound)):
+                unsafe.append(True)
+                assigned = hoist.assigned_names(node, set())
+                if isinstance(node, parser.If):
+                    node.body = self.nested(node.body, known)
+                    node.control_body = self.nested(node.control_body, known)
+                elif isinstance(node, parser.While):
+                    # what the body assigns may have any type when it
+                    # starts again
+                    outside = {var_name: kind for var_name, kind in known.items()
+                               if var_name not in assigned}
+                    nodes[index] = parser.While(node.condition, self.nested(node.body, outside),
+                                                node.token)
+                else:
+                    nodes[index] = self.nested(node, known)
+                for var_name in assigned:
+                    known.pop(var_name, None)
+            elif isinstance(node, parser.NoOp):
+                unsafe.append(False)
+            else:
+                unsafe.append(self.safe_type(node, known) is None)
+        # unsafe_before[k]: statements before k that may raise
+        unsafe_before = [0]
+        for flag in unsafe:
+            unsafe_before.append(unsafe_before[-1] + flag)
+
+        # going backwards: name -> index of its next store, while nothing
+        # reads it in between
+        next_store = {}
+        dead = {}
+        for index in range(len(nodes) - 1, -1, -1):
+            node = nodes[index]
+            if isinstance(node, parser.Assign):
+                var_name = node.left.value
+                later = next_store.get(var_name)
+                # nothing from this statement's end to the next store's
+                # end may raise
+                if later is not None and unsafe_before[later + 1] == unsafe_before[index + 1]:
+                    dead[index] = not unsafe[index] and not contains_save(node.right)
+                next_store[var_name] = index
+                for read in read_names(node.right, set()):
+                    next_store.pop(read, None)
+            elif isinstance(node, (parser.If, parser.While, list, parser.Compound)):
+                next_store.clear()
+            else:
+                for read in read_names(node, set()):
+                    next_store.pop(read, None)
+
+        if not dead:
+            return nodes
+        result = []
+        for index, node in enumerate(nodes):
+            if index not in dead:
+                result.append(node)
+            elif dead[index]:
+                self.dropped += 1
+            else:
+                self.kept += 1
+                result.append(node.right)
+        return result
+
+    def safe_type(self, node, known):
+        """The type of an expression if it surely does not raise, else
+        None."""
+        if isinstance(node, parser.Num):
+            return inference.type_of_value(node.value)
+        if isinstance(node, parser.Var):
+            return known.get(node.value)
+        if isinstance(node, Save):
+            kind = self._slot_types[node.slot] = self.safe_type(node.expr, known)
+            return kind
+        if isinstance(node, Load):
+            return self._slot_types.get(node.slot)
+        if isinstance(node, parser.BinOP):
+            left = self.safe_type(node.left, known)
+            if left is None:
+                return None
+            right = self.safe_type(node.right, known)
+            if right is None:
+                return None
+            return safe_result(node.op.type, left, right, node.right)
+        return None
+
+
+def optimize(tree):
+    """(the optimized tree, number of Save slots it uses)"""
+    optimizer = DataflowOptimizer()
+    return optimizer.optimize(tree), optimizer.slots
+
+
+class DataflowInterpreter(interpreter.Interpreter):
+    """Interpreter that removes common subexpressions and dead stores
+    before it runs a tree. self.optimizer holds what was done to the last
+    tree."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.saved = []
+        self.optimizer = None
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        self.optimizer = DataflowOptimizer()
+        tree = self.optimizer.optimize(tree)
+        self.saved = [None] * self.optimizer.slots
+        return self.visit(tree)
+
+    def visit_Save(self, node):
+        val = self.saved[node.slot] = self.visit(node.expr)
+        return val
+
+    def visit_Load(self, node):
+        return self.saved[node.slot]
@@ -0,0 +1,272 @@
+"""
+Deeply nested programs
+
+Parser and Interpreter call themselves once for every level of nesting:
+for every parenthesis, every block inside a block, every operand of a
+chain like 1+1+...+1. Past about a thousand levels Python raises
+RecursionError. StackParser and StackInterpreter keep the levels on
+lists of their own instead, so the depth of a program is limited only by
+memory.
+
+StackParser reads expressions with two stacks, one of operands and one
+of operators and open parentheses, and statements with a stack of the
+blocks being read. It gives exactly the tree Parser gives, and the same
+errors. StackInterpreter runs a tree from a stack of work items and a
+stack of values, with no recursive calls at all.
+
+    StackInterpreter(StackParser(Lexer(text))).interpret()
+
+"""
+
+import itertools
+import operator
+import sys
+
+import interpreter
+import parser
+from parser import (Assign, BinOP, Compound, If, Num, Var, While, ErrorCode,
+                    BINARY_OPERATORS, LITERALS, LEFT,
+                    EOF, ELSE, ELSEIF, ID, IF, LCURL, LETMUT, LPAREN, RCURL, RPAREN, WHILE)
+
+OPERATOR_FUNCTIONS = {
+    parser.PLUS: operator.add,
+    parser.MINUS: operator.sub,
+    parser.MULTIPLY: operator.mul,
+    parser.DIVIDE: operator.truediv,
+    parser.MODULO: operator.mod,
+    parser.EQ: operator.eq,
+    parser.NE: operator.ne,
+    parser.GT: operator.gt,
+    parser.LT: operator.lt,
+    parser.GE: operator.ge,
+    parser.LE: operator.le,
+}
+
+# work items of StackInterpreter
+EXECUTE = 0
+EVALUATE = 1
+APPLY = 2
+STORE = 3
+BRANCH = 4
+LOOP = 5
+DISCARD = 6
+
+
+class Block(object):
+    """An if or while whose blocks StackParser is reading."""
+
+    def __init__(self, token, condition):
+        self.token = token
+        self.condition = condition
+        self.body = None
+        # (token, condition, body) of the else ifs read so far
+        self.arms = []
+        # (token, condition) of the else if whose body is being read
+        self.arm = None
+
+
+class StackParser(parser.Parser):
+    """Parser with no recursion: the blocks and parentheses still open are
+    kept on lists."""
+
+    def statement_list(self):
+        # (statements read so far, Block they belong to, or None for the
+        # list this call returns)
+        frames = [([], None)]
+        while True:
+            statements, block = frames[-1]
+            if statements and self.current_token.type in (EOF, RCURL):
+                frames.pop()
+                if block is None:
+                    return statements
+                self.eat(RCURL)
+                node = self.close(block, statements)
+                if node is None:
+                    # an else if or else block follows
+                    frames.append(([], block))
+                else:
+                    frames[-1][0].append(node)
+                continue
+
+            token = self.current_token
+            if token.type == IF or token.type == WHILE:
+                self.eat(token.type)
+                condition = self.conditional_statement()
+                self.eat(LCURL)
+                frames.append(([], Block(token, condition)))
+                continue
+            if token.type == LETMUT or token.type == ID:
+                node = self.assignment_statement()
+            else:
+                node = self.conditional_statement()
+            if statements and self.current_token is token:
+                # nothing was eaten, the same statement would be tried forever
+                self.error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=token)
+            statements.append(node)
+
+    def close(self, block, statements):
+        """Takes the statements of a block just read, its } eaten; returns
+        the finished If or While, or None after reading up to the { of an
+        else if or else block that follows."""
+        if block.token.type == WHILE:
+            return While(condition=block.condition, body=statements, token=block.token)
+        if block.body is None:
+            block.body = statements
+        elif block.arm is not None:
+            block.arms.append(block.arm + (statements,))
+            block.arm = None
+        else:
+            return self.build(block, statements)
+
+        if self.current_token.type == ELSEIF:
+            token = self.current_token
+            self.eat(ELSEIF)
+            block.arm = (token, self.conditional_statement())
+            self.eat(LCURL)
+            return None
+        if self.current_token.type == ELSE:
+            self.eat(ELSE)
+            self.eat(LCURL)
+            return None
+        return self.build(block, self.empty())
+
+    def build(self, block, control_body):
+        for token, condition, body in reversed(block.arms):
+            control_body = If(condition=condition, body=body, control_body=control_body, token=token)
+        return If(condition=block.condition, body=block.body, control_body=control_body, token=block.token)
+
+    def expr(self, min_precedence=0):
+        """
+        expr : factor (binary_operator factor)*
+
+        Shunting-yard over BINARY_OPERATORS: an operator first builds the
+        BinOPs of the operators before it that bind at least as tightly.
+        """
+        operators = BINARY_OPERATORS
+        operands = []
+        # operator tokens, and None for every open parenthesis
+        pending = []
+        while True:
+            while self.current_token.type == LPAREN:
+                self.eat(LPAREN)
+                pending.append(None)
+            token = self.current_token
+            if token.type in LITERALS:
+                self.eat(token.type)
+                operands.append(Num(token))
+            elif token.type == ID:
+                self.eat(ID)
+                operands.append(Var(token))
+            else:
+                operands.append(self.variable())
+
+            while True:
+                operator = operators.get(self.current_token.type)
+                if operator is not None:
+                    precedence, associativity = operator
+                    while pending and pending[-1] is not None:
+                        top = operators[pending[-1].type][0]
+                        if top < precedence or (top == precedence and associativity != LEFT):
+                            break
+                        self.reduce(operands, pending)
+                    pending.append(self.current_token)
+                    self.eat(self.current_token.type)
+                    break
+                # the expression, or the part of it in parentheses, ends
+                while pending and pending[-1] is not None:
+                    self.reduce(operands, pending)
+                if not pending:
+                    return operands.pop()
+                self.eat(RPAREN)
+                pending.pop()
+
+    def reduce(self, operands, pending):
+        right = operands.pop()
+        operands[-1] = BinOP(left=operands[-1], op=pending.pop(), right=right)
+
+
+class StackInterpreter(interpreter.Interpreter):
+    """Interpreter that runs a tree with no recursive calls. Variables end
+    up in self.variables, as with the Interpreter."""
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        work, values = self.start(tree)
+        self.step(work, values, sys.maxsize)
+
+    def start(self, tree):
+        """(work stack, value stack) for running tree with step()."""
+        return [(EXECUTE, tree)], []
+
+    def step(self, work, values, steps):
+        """Carries out at most `steps` work items; returns whether any are
+        left."""
+        variables = self.variables
+        get = variables.get
+        functions = OPERATOR_FUNCTIONS
+        push = work.append
+        pop = work.pop
+        for _ in itertools.repeat(None, steps):
+            try:
+                code, node = pop()
+            except IndexError:
+                return False
+            if code == EVALUATE:
+                kind = type(node)
+                if kind is BinOP:
+                    push((APPLY, node))
+                    push((EVALUATE, node.right))
+                    push((EVALUATE, node.left))
+                elif kind is Num:
+                    values.append(node.value)
+                elif kind is Var:
+                    val = get(node.value)
+                    if val is None:
+                        raise NameError(repr(node.value))
+                    values.append(val)
+                else:
+                    self.generic_visit(node)
+            elif code == APPLY:
+                right = values.pop()
+                values[-1] = functions[node.op.type](values[-1], right)
+            elif code == EXECUTE:
+                kind = type(node)
+                if kind is Assign:
+                    push((STORE, node))
+                    push((EVALUATE, node.right))
+                elif kind is list:
+                    for child in reversed(node):
+                        push((EXECUTE, child))
+                elif kind is If:
+                    push((BRANCH, node))
+                    push((EVALUATE, node.condition))
+                elif kind is While:
+                    push((LOOP, node))
+                    push((EVALUATE, node.condition))
+                elif kind is Compound:
+                    for child in reversed(node.children):
+                        push((EXECUTE, child))
+                elif kind is parser.NoOp or kind is parser.Compare:
+                    pass
+                else:
+                    # an expression on its own, which the parser makes of a
+                    # stray token; it is evaluated for its errors
+                    push((DISCARD, None))
+                    push((EVALUATE, node))
+            elif code == STORE:
+                variables[node.left.value] = values.pop()
+            elif code == BRANCH:
+                if values.pop():
+                    push((EXECUTE, node.body))
+                else:
+                    push((EXECUTE, node.control_body))
+            elif code == LOOP:
+                if values.pop():
+                    push((LOOP, node))
+                    push((EVALUATE, node.condition))
+                    push((EXECUTE, node.body))
+            else:
+                values.pop()
+        return bool(work)
@@ -0,0 +1,224 @@
+"""
+Loop-invariant code motion
+
+In
+
+    while a < n {
+        x = (k*3)+y;
+        a = a+1;
+    }
+
+(k*3)+y gives the same value every time round, since the loop assigns
+neither k nor y. hoist(tree) finds such invariant expressions: those
+whose variables are not assigned anywhere in the body of the loop,
+including the loops inside it. Each becomes a Temporary of its loop, and
+the While a HoistedWhile that knows its temporaries.
+
+A temporary is worked out the first time it is needed after its loop
+starts, and kept until the loop ends. Working it out before the loop, as
+a compiler would, gives the wrong answer whenever the expression raises,
+e.g. 1/k with k = 0: the loop may run zero times, the expression may sit
+in an if arm that is never taken, or an earlier statement of the body
+may raise first. Taken at first use, it raises exactly where it always
+did, and a loop that does not run works out nothing.
+
+Expressions invariant in an outer loop are hoisted to that loop, the
+rest to the innermost one in which they are invariant. Equal expressions
+in one loop share a temporary. The input tree is not changed.
+
+    HoistingInterpreter(Parser(Lexer(text))).interpret()
+
+"""
+
+import interpreter
+import parser
+
+
+class Temporary(parser.AST):
+    """An invariant expression of a loop, worked out once per run of it;
+    slot is where its value is kept."""
+    __slots__ = ('expr', 'slot')
+
+    def __init__(self, expr, slot):
+        self.expr = expr
+        self.slot = slot
+
+
+class HoistedWhile(parser.While):
+    """A While with the slots of its temporaries."""
+    __slots__ = ('slots',)
+
+    def __init__(self, condition, body, token, slots):
+        super().__init__(condition, body, token)
+        self.slots = slots
+
+
+def assigned_names(node, names):
+    """Adds the names assigned anywhere in node to names."""
+    if isinstance(node, parser.Assign):
+        names.add(node.left.value)
+    elif isinstance(node, list):
+        for child in node:
+            assigned_names(child, names)
+    elif isinstance(node, parser.Compound):
+        assigned_names(node.children, names)
+    elif isinstance(node, parser.If):
+        # an else if chain is walked in a loop, not one call per arm
+        while isinstance(node, parser.If):
+            assigned_names(node.body, names)
+            node = node.control_body
+        assigned_names(node, names)
+    elif isinstance(node, parser.While):
+        assigned_names(node.body, names)
+    return names
+
+
+class Hoister(object):
+    def __init__(self):
+        # number of temporaries, and so the next slot
+        self.slots = 0
+        # expressions hoisted, counted once per loop
+        self.hoisted = 0
+
+    def hoist(self, node):
+        if isinstance(node, list):
+            return [self.hoist(child) for child in node]
+        if isinstance(node, parser.Compound):
+            compound = parser.Compound()
+            compound.children = self.hoist(node.children)
+            return compound
+        if isinstance(node, parser.If):
+            arms = []
+            while isinstance(node, parser.If):
+                arms.append((node.condition, self.hoist(node.body), node.token))
+                node = node.control_body
+            return self.else_if_chain(arms, self.hoist(node))
+        if isinstance(node, parser.While):
+            return self.loop(node)
+        return node
+
+    def loop(self, node):
+        written = assigned_names(node.body, set())
+        # structure of an expression -> its Temporary
+        temporaries = {}
+        condition = self.expr(node.condition, written, temporaries)
+        body = self.statements(node.body, written, temporaries)
+        # the loops inside have invariants of their own
+        body = self.hoist(body)
+        if not temporaries:
+            return parser.While(condition, body, node.token)
+        self.hoisted += len(temporaries)
+        slots = tuple(temporary.slot for temporary in temporaries.values())
+        return HoistedWhile(condition, body, node.token, slots)
+
+    def statements(self, node, written, temporaries):
+        """node with the invariant expressions of its statements, but not
+        of the loops in it, replaced by temporaries."""
+        if isinstance(node, list):
+            return [self.statements(child, written, temporaries) for child in node]
+        if isinstance(node, parser.Compound):
+            compound = parser.Compound()
+            compound.children = self.statements(node.children, written, temporaries)
+            return compound
+        if isinstance(node, parser.Assign):
+            return parser.Assign(node.left, node.op, self.expr(node.right, written, temporaries))
+        if isinstance(node, parser.If):
+            arms = []
+            while isinstance(node, parser.If):
+                arms.append((self.expr(node.condition, written, temporaries),
+                             self.statements(node.body, written, temporaries), node.token))
+                node = node.control_body
+            return self.else_if_chain(arms, self.statements(node, written, temporaries))
+        if isinstance(node, parser.While):
+            return parser.While(self.expr(node.condition, written, temporaries),
+                                self.statements(node.body, written, temporaries), node.token)
+        if isinstance(node, parser.BinOP):
+            # a stray expression statement
+            return self.expr(node, written, temporaries)
+        return node
+
+    def else_if_chain(self, arms, last):
+        """The If chain of arms, (condition, body, token) each, ending in
+        last. Else if chains are walked in a loop, not one call per arm, so
+        a ladder of any length needs no recursion."""
+        for condition, body, token in reversed(arms):
+            last = parser.If(condition, body, last, token)
+        return last
+
+    def expr(self, node, written, temporaries):
+        """node with its largest invariant BinOPs replaced by temporaries."""
+        if not isinstance(node, parser.BinOP):
+            return node
+        key = self.invariant_key(node, written)
+        if key is not None:
+            temporary = temporaries.get(key)
+            if temporary is None:
+                temporary = temporaries[key] = Temporary(node, self.slots)
+                self.slots += 1
+            return temporary
+        left = self.expr(node.left, written, temporaries)
+        right = self.expr(node.right, written, temporaries)
+        if left is node.left and right is node.right:
+            return node
+        return parser.BinOP(left, node.op, right)
+
+    def invariant_key(self, node, written):
+        """A tuple equal for equal expressions, or None if node reads a
+        variable in written."""
+        if isinstance(node, parser.Num):
+            # repr tells 0.0 from -0.0
+            return (type(node.value), repr(node.value))
+        if isinstance(node, parser.Var):
+            if node.value in written:
+                return None
+            return (node.value,)
+        if isinstance(node, Temporary):
+            return ('temporary', node.slot)
+        if isinstance(node, parser.BinOP):
+            left = self.invariant_key(node.left, written)
+            if left is None:
+                return None
+            right = self.invariant_key(node.right, written)
+            if right is None:
+                return None
+            return (node.op.type, left, right)
+        return None
+
+
+def hoist(tree):
+    """(the tree with its loop invariants hoisted, number of temporaries)"""
+    hoister = Hoister()
+    return hoister.hoist(tree), hoister.slots
+
+
+class HoistingInterpreter(interpreter.Interpreter):
+    """Interpreter that hoists loop invariants before it runs a tree.
+    self.hoisted counts the expressions hoisted from the last tree."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.temporaries = []
+        self.hoisted = 0
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        hoister = Hoister()
+        tree = hoister.hoist(tree)
+        self.hoisted = hoister.hoisted
+        self.temporaries = [None] * hoister.slots
+        return self.visit(tree)
+
+    def visit_HoistedWhile(self, node):
+        temporaries = self.temporaries
+        for slot in node.slots:
+            temporaries[slot] = None
+        while self.visit(node.condition):
+            self.visit(node.body)
+
+    def visit_Temporary(self, node):
+        val = self.temporaries[node.slot]
+        if val is None:
+            val = self.temporaries[node.slot] = self.visit(node.expr)
+        return val
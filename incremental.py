@@ -0,0 +1,264 @@
+"""
+Incremental parsing
+
+Keeps the AST of a program up to date as its text is edited. After an edit
+only the statements the edit touched are lexed and parsed again, or if that
+fails the innermost { } block around the edit, then the blocks around that
+one, and the whole program only as a last resort. Every statement and block
+outside the parsed region stays the same object.
+
+    doc = Document(text)
+    tree = doc.edit(offset, removed, inserted)
+
+"""
+
+import lexer
+import parser
+import tokens
+
+
+class SpanParser(parser.Parser):
+    """Parser that notes where every statement and { } block is.
+
+    spans maps id(statement) to (offset of its first token, offset of the
+    token after it). blocks maps id(statement list) to the offsets of its
+    '{' and '}'.
+    """
+
+    def __init__(self, lexer):
+        self.spans = {}
+        self.blocks = {}
+        # offset of the token eaten last
+        self.last_offset = None
+        self.depth = 0
+        super().__init__(lexer)
+
+    def eat(self, token_type):
+        self.last_offset = self.current_token.offset
+        super().eat(token_type)
+
+    def compound_statement(self):
+        open = self.last_offset
+        node = super().compound_statement()
+        self.blocks[id(node.children)] = (open, self.current_token.offset)
+        return node
+
+    def statement_list(self):
+        open = self.last_offset
+        self.depth += 1
+        nodes = super().statement_list()
+        self.depth -= 1
+        # the outermost list is either copied by compound_statement or is
+        # the region being parsed again, and is noted by the caller
+        if self.depth:
+            self.blocks[id(nodes)] = (open, self.current_token.offset)
+        return nodes
+
+    def statement(self):
+        start = self.current_token.offset
+        node = super().statement()
+        self.spans[id(node)] = (start, self.current_token.offset)
+        return node
+
+
+def children(node):
+    """The AST nodes and statement lists directly below `node`."""
+    if isinstance(node, list):
+        return node
+    if isinstance(node, parser.Compound):
+        return node.children
+    if isinstance(node, (parser.BinOP, parser.Assign, parser.Compare)):
+        return [node.left, node.right]
+    if isinstance(node, parser.If):
+        return [node.condition, node.body, node.control_body]
+    if isinstance(node, parser.While):
+        return [node.condition, node.body]
+    return []
+
+
+def arms(node):
+    """The statement lists of an If, its else ifs and its else, or a While."""
+    if isinstance(node, parser.While):
+        return [node.body]
+    result = []
+    while isinstance(node, parser.If):
+        result.append(node.body)
+        node = node.control_body
+    if isinstance(node, list):
+        result.append(node)
+    return result
+
+
+class Document(object):
+    def __init__(self, text):
+        self.text = text
+        # shared by every token in the tree, so positions before an edit
+        # stay right without touching the tokens
+        self.positions = tokens.LineIndex(text)
+        self.spans = {}
+        self.blocks = {}
+        self.tree = None
+        self.reparse()
+
+    def reparse(self):
+        """Parses the whole text from scratch."""
+        self.spans = {}
+        self.blocks = {}
+        self.tree = None
+        par = SpanParser(self._lexer(self.text, 0))
+        tree = par.parse()
+        self.spans = par.spans
+        self.blocks = par.blocks
+        self.tree = tree
+        return tree
+
+    def _lexer(self, text, offset):
+        lex = lexer.Lexer(text)
+        lex.offset = offset
+        lex.positions = self.positions
+        return lex
+
+    def edit(self, offset, removed, inserted):
+        """Replaces `removed` characters at `offset` by `inserted` and
+        brings the tree up to date. Returns the tree.
+
+        Raises LexerError or ParserError, like Parser.parse, if the new text
+        does not parse; the next edit then parses the whole text again.
+        """
+        end = offset + removed
+        text = self.text[:offset] + inserted + self.text[end:]
+        delta = len(inserted) - removed
+        self.text = text
+        self.positions.text = text
+        self.positions.starts = None
+
+        if self.tree is None:
+            return self.reparse()
+
+        for block, first, last in reversed(self._path(offset, end)):
+            if first <= last and self._statements(block, first, last, offset, delta):
+                return self.tree
+            if self._block(block, delta):
+                return self.tree
+        return self.reparse()
+
+    def _path(self, start, end):
+        # the blocks around the edit from the outermost in, each with the
+        # first and last of its statements the edit touches
+        path = []
+        block = self.tree.children
+        while True:
+            open, close = self.blocks[id(block)]
+            if not (open < start and end <= close):
+                break
+            first = self._first_ending_after(block, start)
+            last = self._last_starting_before(block, end)
+            path.append((block, first, last))
+            if first != last:
+                break
+            inner = [arm for arm in arms(block[first])
+                     if self.blocks[id(arm)][0] < start and end <= self.blocks[id(arm)][1]]
+            if not inner:
+                break
+            block = inner[0]
+        return path
+
+    def _first_ending_after(self, block, offset):
+        lo, hi = 0, len(block)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.spans[id(block[mid])][1] < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _last_starting_before(self, block, offset):
+        lo, hi = 0, len(block)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.spans[id(block[mid])][0] <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def _statements(self, block, first, last, offset, delta):
+        # parse block[first:last + 1] again on its own
+        if first > 0 and not isinstance(block[first - 1], (parser.Assign, parser.If, parser.While)):
+            # the token before the region could run on into it
+            return False
+        start = self.spans[id(block[first])][0]
+        if start > offset:
+            # the edit begins in the space before the first statement
+            return False
+        stop = self.spans[id(block[last])][1] + delta
+        par = SpanParser(self._lexer(self.text[start:stop], start))
+        try:
+            nodes = par.statement_list()
+        except (lexer.LexerError, parser.ParserError):
+            return False
+        if par.current_token.type != parser.EOF or par.last_offset is None:
+            return False
+        if self.text[par.last_offset] not in ';}':
+            return False
+        # a comment or string left open at the end would run on past the region
+        if lexer.SKIP.match(self.text, par.last_offset + 1).end() != stop:
+            return False
+        self._splice(block, first, last + 1, nodes, par, stop - delta, delta)
+        return True
+
+    def _block(self, block, delta):
+        # parse everything between the braces of block again
+        open, close = self.blocks[id(block)]
+        stop = close + delta + 1
+        par = SpanParser(self._lexer(self.text[open + 1:stop], open + 1))
+        try:
+            nodes = par.statement_list()
+            par.eat(parser.RCURL)
+        except (lexer.LexerError, parser.ParserError):
+            return False
+        if par.current_token.type != parser.EOF:
+            return False
+        self._splice(block, 0, len(block), nodes, par, close, delta)
+        return True
+
+    def _splice(self, block, first, last, nodes, par, old_stop, delta):
+        self._shift_tokens(self.tree, old_stop, delta)
+        for node in block[first:last]:
+            self._forget(node)
+        block[first:last] = nodes
+        if delta:
+            for key, (start, stop) in self.spans.items():
+                if stop >= old_stop:
+                    self.spans[key] = (start + delta if start >= old_stop else start, stop + delta)
+            for key, (open, close) in self.blocks.items():
+                if close >= old_stop:
+                    self.blocks[key] = (open + delta if open >= old_stop else open, close + delta)
+        self.spans.update(par.spans)
+        self.blocks.update(par.blocks)
+
+    def _forget(self, node):
+        self.spans.pop(id(node), None)
+        for arm in arms(node):
+            self.blocks.pop(id(arm), None)
+            for child in arm:
+                self._forget(child)
+
+    def _shift_tokens(self, node, old_stop, delta):
+        # move the tokens after the edit along by delta; statements that end
+        # before the edit are skipped whole
+        if not delta:
+            return
+        seen = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            span = self.spans.get(id(node))
+            if span is not None and span[1] < old_stop:
+                continue
+            tok = getattr(node, 'token', None)
+            if tok is not None and id(tok) not in seen and tok.offset is not None and tok.offset >= old_stop:
+                seen.add(id(tok))
+                tok.offset += delta
+            stack.extend(children(node))
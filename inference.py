@@ -0,0 +1,249 @@
+"""
+Type inference
+
+Works out, before a program runs, whether each variable and expression is
+an int, a float, a str or a bool. A variable's type is that of every value
+assigned to it anywhere in the program; a variable given values of two
+types, e.g. `let mut a = 1;` and later `a = "one";`, is a mixed one and is
+reported in self.warnings.
+
+TypedCompiler uses the types to pick, for each operation, an
+implementation written for its operand types: `i + 1` on ints runs in a
+function that only ever adds ints. CPython specializes the bytecode of
+such a function for the types it sees, which only pays when they never
+change, as they would in a function shared by all the + of a program.
+Operations on mixed or unknown types keep the generic implementation.
+
+Python gives every operation the same result whichever implementation
+runs it, so a wrong guess, e.g. a variable left over from another program,
+costs speed but never changes a result.
+
+    inference = TypeInference()
+    inference.infer(tree)
+    print(inference.types, inference.warnings)
+    TypedInterpreter(Parser(Lexer(text))).interpret()
+
+"""
+
+import closures
+import parser
+
+INT = 'int'
+FLOAT = 'float'
+STR = 'str'
+BOOL = 'bool'
+# a mix of types, or a type not known before the run
+ANY = 'any'
+
+NUMBERS = (INT, FLOAT, BOOL)
+ARITHMETIC = (parser.PLUS, parser.MINUS, parser.MULTIPLY, parser.DIVIDE, parser.MODULO)
+COMPARISONS = (parser.EQ, parser.NE, parser.GT, parser.LT, parser.GE, parser.LE)
+
+SYMBOLS = {
+    parser.PLUS: '+', parser.MINUS: '-', parser.MULTIPLY: '*', parser.DIVIDE: '/',
+    parser.MODULO: '%', parser.EQ: '==', parser.NE: '!=', parser.GT: '>',
+    parser.LT: '<', parser.GE: '>=', parser.LE: '<=',
+}
+
+
+def type_of_value(value):
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, int):
+        return INT
+    if isinstance(value, float):
+        return FLOAT
+    if isinstance(value, str):
+        return STR
+    return ANY
+
+
+def join(first, second):
+    """The type of a variable given values of both types; None stands for
+    no value yet."""
+    if first is None or first == second:
+        return second
+    if second is None:
+        return first
+    return ANY
+
+
+def result_type(op, left, right):
+    """The type of `left op right`, ANY if it depends on the values or
+    raises."""
+    if op in (parser.EQ, parser.NE):
+        return BOOL
+    if left == ANY or right == ANY:
+        return ANY
+    if op in COMPARISONS:
+        if (left in NUMBERS and right in NUMBERS) or left == right == STR:
+            return BOOL
+        return ANY
+    if left in NUMBERS and right in NUMBERS:
+        if op == parser.DIVIDE or FLOAT in (left, right):
+            return FLOAT
+        return INT
+    if op == parser.PLUS and left == right == STR:
+        return STR
+    if op == parser.MULTIPLY and STR in (left, right) and (left in (INT, BOOL) or right in (INT, BOOL)):
+        return STR
+    return ANY
+
+
+class TypeInference(object):
+    def __init__(self):
+        # variable name -> type
+        self.types = {}
+        # (line, variable name, type it had, type assigned) for every
+        # variable that is given values of two types
+        self.warnings = []
+        # id(BinOP) -> type, kept once the variable types are final
+        self._binop_types = None
+
+    def infer(self, tree):
+        self._binop_types = None
+        assigns = []
+        self.collect(tree, assigns)
+        # a variable's type may depend on others', e.g. b = a + 1, so go
+        # round until nothing changes; a type only ever moves up from None
+        # to one type to ANY, so this ends
+        changed = True
+        while changed:
+            changed = False
+            for node in assigns:
+                var_name = node.left.value
+                old = self.types.get(var_name)
+                kind = self.expr_type(node.right)
+                new = join(old, kind)
+                if new == old:
+                    continue
+                if new == ANY and ANY not in (old, kind):
+                    self.warnings.append((node.op.line, var_name, old, kind))
+                self.types[var_name] = new
+                changed = True
+        self._binop_types = {}
+        return self.types
+
+    def collect(self, node, assigns):
+        """Appends the Assigns in node to assigns, in program order."""
+        if isinstance(node, parser.Assign):
+            assigns.append(node)
+        elif isinstance(node, list):
+            for child in node:
+                self.collect(child, assigns)
+        elif isinstance(node, parser.Compound):
+            self.collect(node.children, assigns)
+        elif isinstance(node, parser.If):
+            # an else if chain is walked in a loop, not one call per arm
+            while isinstance(node, parser.If):
+                self.collect(node.body, assigns)
+                node = node.control_body
+            self.collect(node, assigns)
+        elif isinstance(node, parser.While):
+            self.collect(node.body, assigns)
+
+    def expr_type(self, node):
+        if isinstance(node, parser.Num):
+            return type_of_value(node.value)
+        if isinstance(node, parser.Var):
+            # never assigned in this program: unset, or left from another
+            return self.types.get(node.value) or ANY
+        if isinstance(node, parser.BinOP):
+            known = self._binop_types
+            if known is not None and id(node) in known:
+                return known[id(node)]
+            kind = result_type(node.op.type, self.expr_type(node.left), self.expr_type(node.right))
+            if known is not None:
+                known[id(node)] = kind
+            return kind
+        return ANY
+
+    def report(self):
+        """The warnings as text, one per line."""
+        return '\n'.join(
+            'line {}: {} was {} and is assigned {}'.format(line, var_name, old, new)
+            for line, var_name, old, new in self.warnings)
+
+
+def specialize(kind, op, variable, constant):
+    """A new factory for the closure of `left op right` on operands of type
+    kind. The left operand is read from the variables in the closure itself
+    if `variable`, and the right one is a constant if `constant`. Each
+    factory has code of its own, so CPython specializes it for kind alone."""
+    name = '{}_{}{}{}'.format(kind, closures.OPERATOR_FUNCTIONS[op].__name__,
+                              '_variable' if variable else '', '_constant' if constant else '')
+    lines = ['def make(left, right, value, get, var_name):',
+             '    def {}():'.format(name)]
+    if variable:
+        lines.extend(['        val = get(var_name)',
+                      '        if val is None:',
+                      '            raise NameError(repr(var_name))'])
+    lines.extend(['        return {} {} {}'.format(
+                      'val' if variable else 'left()', SYMBOLS[op], 'value' if constant else 'right()'),
+                  '    return {}'.format(name)])
+    namespace = {}
+    exec(compile('\n'.join(lines) + '\n', '<{}>'.format(name), 'exec'), namespace)
+    return namespace['make']
+
+
+def specializations(kind, ops):
+    return dict(
+        ((kind, op, variable, constant), specialize(kind, op, variable, constant))
+        for op in ops
+        for variable in (False, True)
+        for constant in (False, True))
+
+
+# (operand type, operator, variable left operand, constant right operand)
+# -> closure factory
+SPECIALIZED = {}
+SPECIALIZED.update(specializations(INT, ARITHMETIC + COMPARISONS))
+SPECIALIZED.update(specializations(FLOAT, ARITHMETIC + COMPARISONS))
+SPECIALIZED.update(specializations(STR, (parser.PLUS,) + COMPARISONS))
+
+
+class TypedCompiler(closures.Compiler):
+    """closures.Compiler that runs each operation on ints, floats or strs
+    with an implementation for those types. self.specialized and
+    self.generic count the operations compiled each way."""
+
+    def __init__(self, variables, inference):
+        super().__init__(variables)
+        self.inference = inference
+        self.specialized = 0
+        self.generic = 0
+
+    def visit_BinOP(self, node):
+        op = node.op.type
+        left_type = self.inference.expr_type(node.left)
+        right_type = self.inference.expr_type(node.right)
+        variable = isinstance(node.left, parser.Var)
+        constant = isinstance(node.right, parser.Num)
+        make = None
+        if left_type == right_type:
+            make = SPECIALIZED.get((left_type, op, variable, constant))
+        if make is None:
+            self.generic += 1
+            return super().visit_BinOP(node)
+        self.specialized += 1
+        return make(None if variable else self.visit(node.left),
+                    None if constant else self.visit(node.right),
+                    node.right.value if constant else None,
+                    self.variables.get,
+                    node.left.value if variable else None)
+
+
+class TypedInterpreter(closures.ClosureInterpreter):
+    """ClosureInterpreter that infers types first and compiles with
+    TypedCompiler. The inference of the last run is in self.inference."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.inference = None
+        self.compiler = None
+
+    def run(self, tree):
+        self.inference = TypeInference()
+        self.inference.infer(tree)
+        self.compiler = TypedCompiler(self.variables, self.inference)
+        return self.compiler.visit(tree)()
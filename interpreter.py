@@ -117,10 +117,13 @@ class Interpreter(NodeVisitor):
             return val
 
     def visit_If(self, node):
-        if self.visit(node.condition):
-            self.visit(node.body)
-        else:
-            self.visit(node.control_body)
+        # an else if chain is walked in a loop, not one call per arm
+        while isinstance(node, parser.If):
+            if self.visit(node.condition):
+                self.visit(node.body)
+                return
+            node = node.control_body
+        self.visit(node)
 
     def visit_While(self, node):
         while self.visit(node.condition):
@@ -144,7 +147,8 @@ class Interpreter(NodeVisitor):
 def main():
     import sys
 
-    with open('Rust Test Files/test2.rs') as f:
+    path = sys.argv[1] if len(sys.argv) > 1 else 'Rust Test Files/test2.txt'
+    with open(path) as f:
         text = f.read()
     lex = lexer.Lexer(text)
     par = parser.Parser(lex)
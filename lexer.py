@@ -9,7 +9,13 @@ CS21B016 C Dakshayani
 
 """
 
-import token
+import array
+import codecs
+import concurrent.futures
+import mmap
+import os
+import re
+import tokens
 from enum import Enum
 
 
@@ -85,18 +91,68 @@ EOF = 'EOF'
 
 # identifiers: for, if, else if, else, while
 RESERVED_KEYWORDS = {
-    'for': token.Token(FOR, 'for'),
-    'if': token.Token(IF, 'if'),
-    'else if': token.Token(ELSEIF, 'else if'),
-    'else': token.Token(ELSE, 'else'),
-    'while': token.Token(WHILE, 'while'),
-    'let mut': token.Token(LETMUT, 'let mut'),
-    'fn': token.Token(FN, 'fn'),
-    'main': token.Token(MAIN, 'main')
+    'for': tokens.Token(FOR, 'for'),
+    'if': tokens.Token(IF, 'if'),
+    'else if': tokens.Token(ELSEIF, 'else if'),
+    'else': tokens.Token(ELSE, 'else'),
+    'while': tokens.Token(WHILE, 'while'),
+    'let mut': tokens.Token(LETMUT, 'let mut'),
+    'fn': tokens.Token(FN, 'fn'),
+    'main': tokens.Token(MAIN, 'main')
 }
 
 
+# single character operators and the token type each one maps to
+SINGLE_CHAR_TOKENS = {
+    '+': PLUS,
+    '-': MINUS,
+    '*': MULTIPLY,
+    '/': DIVIDE,
+    '%': MODULO,
+    '(': LPAREN,
+    ')': RPAREN,
+    '{': LCURL,
+    '}': RCURL,
+    '=': ASSIGN,
+    '<': LT,
+    '>': GT,
+    ';': SEMI,
+    ',': COMMA,
+}
+
+# whitespace and // comments in front of a token
+SKIP_PATTERN = r'(?:\s+|//[^\n]*\n?)*'
+
+# one alternative per token kind, tried in order at the current position
+TOKEN_PATTERNS = [
+    (NUMBER, r'\d+\.\d*'),
+    (INTEGER, r'\d+'),
+    (STR, r'"[^"]*"?'),
+    ('ELSEIF', r'else if '),
+    ('LETMUT', r'let mut '),
+    (ID, r'[^\W\d_]\w*'),
+    ('OP2', r'==|!=|<=|>='),
+    ('OP1', r'[-+*/%(){}=<>;,]'),
+    (EOF, r'\x1a|\Z'),
+]
+
+SKIP = re.compile(SKIP_PATTERN)
+
+MASTER_PATTERN = re.compile(
+    SKIP_PATTERN + '(?:' + '|'.join(
+        '(?P<{}>{})'.format(name, pattern) for name, pattern in TOKEN_PATTERNS
+    ) + ')'
+)
+
+
 class Lexer(object):
+    """Single pass lexer driven by one compiled master pattern.
+
+    Every call to get_next_token() runs MASTER_PATTERN once at self.pos: the
+    pattern skips whitespace and comments and then matches exactly one token,
+    and the name of the group that matched tells which token it is.
+    """
+
     def __init__(self, text):
         # string input: "3 + 8"
         self.text = text
@@ -108,247 +164,400 @@ class Lexer(object):
         self.column = 1
         # current token
         self.current_token = None
-        self.current_char = self.text[self.pos]
+        # offset of self.text[0] in the source
+        self.offset = 0
+        # line starts of the source, only built when a position is asked for
+        self.positions = tokens.LineIndex(text)
+        self._match = MASTER_PATTERN.match
 
     def error(self):
         s = "Lexer error on '{lexeme}' line: {line} column: {column}".format(
-            lexeme=self.current_char,
+            lexeme=self.text[self.pos:self.pos + 1],
             line=self.line,
             column=self.column,
             )
         raise LexerError(message=s)
 
-    def advance(self):
-        # advance the pos variable to go to the next char
-        self.pos += 1
+    def locate(self):
+        # line and column of self.pos, only worked out when reporting an error
+        self.line, self.column = self.positions.line_column(self.offset + self.pos)
 
-        if self.pos > len(self.text) - 1:
-            self.current_char = None
+    def get_next_token(self):
+        """Lexical Analyzer"""
+        """Breaks the input into tokens"""
+        return self.make_token(self._match(self.text, self.pos))
+
+    def make_token(self, m):
+        # turns a match of MASTER_PATTERN at self.pos into a token
+        if m is None:
+            # nothing matched: point pos at the offending character
+            self.pos = SKIP.match(self.text, self.pos).end()
+            self.locate()
+            self.error()
+
+        kind = m.lastgroup
+        value = m.group(kind)
+        start = m.start(kind)
+        offset = self.offset + start
+        positions = self.positions
+        if kind == EOF:
+            # chr(26) marks the end of the input and is not consumed
+            self.pos = start
+            return tokens.Token(EOF, 'EOF' if value else None, offset, positions)
+
+        self.pos = m.end()
+        if kind == ID:
+            type = value if value in RESERVED_KEYWORDS else ID
+            return tokens.Token(type, value, offset, positions)
+        if kind == 'OP1':
+            return tokens.Token(SINGLE_CHAR_TOKENS[value], value, offset, positions)
+        if kind == 'OP2' or kind == 'ELSEIF' or kind == 'LETMUT':
+            value = value.rstrip()
+            return tokens.Token(value, value, offset, positions)
+        if kind == INTEGER:
+            return tokens.Token(INTEGER, int(value), offset, positions)
+        if kind == NUMBER:
+            return tokens.Token(NUMBER, float(value), offset, positions)
+        # STR: strip the quotes, an unterminated string runs to the end of the input
+        if value[-1:] == '"' and len(value) > 1:
+            return tokens.Token(STR, value[1:-1], offset, positions)
+        return tokens.Token(STR, value[1:], offset, positions)
+
+    def tokens(self):
+        """Yields the tokens one at a time, up to and including EOF."""
+        while True:
+            tok = self.get_next_token()
+            yield tok
+            if tok.type == EOF:
+                return
+
+
+# every token type, the index of each is its code in a TokenStream
+TOKEN_TYPES = (
+    EOF, INTEGER, NUMBER, STR, ID,
+    PLUS, MINUS, MULTIPLY, DIVIDE, MODULO,
+    EQ, NE, GT, LT, GE, LE,
+    LPAREN, RPAREN, LCURL, RCURL, ASSIGN, SEMI, COMMA,
+    FOR, IF, ELSEIF, ELSE, LETMUT, WHILE, FN, MAIN,
+)
+
+KIND_CODES = {type: code for code, type in enumerate(TOKEN_TYPES)}
+
+EOF_CODE = KIND_CODES[EOF]
+INTEGER_CODE = KIND_CODES[INTEGER]
+NUMBER_CODE = KIND_CODES[NUMBER]
+STR_CODE = KIND_CODES[STR]
+ID_CODE = KIND_CODES[ID]
+
+# code of every operator and keyword, looked up by its text
+LEXEME_CODES = {char: KIND_CODES[type] for char, type in SINGLE_CHAR_TOKENS.items()}
+LEXEME_CODES.update({op: KIND_CODES[op] for op in (EQ, NE, LE, GE)})
+LEXEME_CODES.update({word: KIND_CODES[tok.type] for word, tok in RESERVED_KEYWORDS.items()})
+
+# tokens whose match takes in a space after the lexeme
+SPACE_AFTER_CODES = (KIND_CODES[ELSEIF], KIND_CODES[LETMUT])
+
+# value of every operator and keyword token by code, None for the others
+FIXED_VALUES = [None] * len(TOKEN_TYPES)
+for lexeme, code in LEXEME_CODES.items():
+    FIXED_VALUES[code] = lexeme
+
+def new_arrays(text):
+    """Empty kinds, starts and ends arrays for the tokens of `text`."""
+    offset_type = 'I' if len(text) < 2 ** 32 else 'Q'
+    return array.array('B'), array.array(offset_type), array.array(offset_type)
+
+
+def scan(text, pos, stop, trusted, kinds, starts, ends, offset=0):
+    """Lexes `text` from `pos`, appending the code, start and end of every
+    token to the kinds, starts and ends arrays, with `offset` added to the
+    starts and ends.
+
+    Stops before a match that starts at or after `stop`, that ends at or
+    after `trusted` (the text may be cut short there), or when nothing
+    matches. Returns the position reached and whether EOF was read.
+    """
+    match = MASTER_PATTERN.match
+    kinds = kinds.append
+    starts = starts.append
+    ends = ends.append
+    codes = LEXEME_CODES
+    while pos < stop:
+        m = match(text, pos)
+        if m is None or m.end() >= trusted:
+            return pos, False
+        kind = m.lastgroup
+        start, end = m.span(kind)
+        if kind == ID or kind == 'OP1' or kind == 'OP2':
+            kinds(codes.get(m.group(kind), ID_CODE))
+        elif kind == 'ELSEIF' or kind == 'LETMUT':
+            # leave out the trailing space
+            kinds(codes[text[start:end - 1]])
+            end -= 1
+        elif kind == EOF:
+            kinds(EOF_CODE)
+            starts(start + offset)
+            ends(end + offset)
+            return start, True
         else:
-            self.current_char = self.text[self.pos]
-            self.column += 1
+            kinds(KIND_CODES[kind])
+        starts(start + offset)
+        ends(end + offset)
+        pos = m.end()
+    return pos, False
 
-    def peek(self, n):
-        peek_pos = self.pos + n
-        if peek_pos > len(self.text) - 1:
-            return None
-        else:
-            return self.text[peek_pos]
-
-    def skip_white_space(self):
-        # skip white spaces
-        while self.current_char is not None and self.current_char.isspace():
-            if self.current_char == '\n':
-                self.line += 1
-            self.advance()
-
-    def skip_comments(self):
-        if self.current_char == '/' and self.peek(1) == '/':
-            self.advance()
-            self.advance()
-            while self.current_char != '\n':
-                self.advance()
-            self.advance()
-
-        # skip multi-line comments
-        # Ha! Rust doesn't have a different symbol for multi-line comments
-
-    def number(self):
-        # return an integer or a float read in from the input
-        result = ''
-        while self.current_char is not None and self.current_char.isdigit():
-            result += self.current_char
-            self.advance()
-
-        if self.current_char == '.':
-            result += self.current_char
-            self.advance()
-
-            while self.current_char is not None and self.current_char.isdigit():
-                result += self.current_char
-                self.advance()
-
-            tok = token.Token('NUMBER', float(result))
 
-        else:
-            tok = token.Token('INTEGER', int(result))
-
-        return tok
-
-    def string(self):
-        # returns a string read in from the input
-        result = ''
-        self.advance()
-        while self.current_char is not None and self.current_char != '"':
-            result += self.current_char
-            self.advance()
-        self.advance()
-
-        tok = token.Token('STR', result)
-        return tok
-
-    def _id(self):
-        # handles identifiers and reserved keywords
-        result = ''
-        while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
-            result += self.current_char
-            self.advance()
-
-        if self.current_char == ' ' and self.peek(1) == 'i' and self.peek(2) == 'f' and self.peek(3) == ' ':
-            self.advance()
-            self.advance()
-            self.advance()
-            self.advance()
-            return token.Token(ELSEIF, 'else if')
-
-        if self.current_char == ' ' and self.peek(1) == 'm' and self.peek(2) == 'u' and self.peek(3) == 't' and self.peek(4) == ' ':
-            self.advance()
-            self.advance()
-            self.advance()
-            self.advance()
-            self.advance()
-            return token.Token(LETMUT, 'let mut')
-
-        tok = RESERVED_KEYWORDS.get(result, token.Token(ID, result))
-        return tok
+class TokenStream(object):
+    """All the tokens of a text, stored as three parallel arrays.
 
-    def get_next_token(self):
-        """Lexical Analyzer"""
-        """Breaks the input into tokens"""
+    kinds holds the code of each token type (an index into TOKEN_TYPES),
+    starts and ends the offsets of its lexeme in the text. Values are only
+    made when asked for, by slicing the text. This takes a few bytes per
+    token instead of a Token object each.
 
-        while self.current_char is not None:
+    A TokenStream can be handed to Parser in place of a Lexer: its
+    get_next_token() makes the Token objects one at a time, so only the
+    ones kept by the AST stay alive.
+    """
 
-            if self.current_char == '/' and self.peek(1) == '/':
-                self.skip_comments()
-                continue
+    def __init__(self, text, kinds=None, starts=None, ends=None):
+        self.text = text
+        if kinds is None:
+            kinds, starts, ends = new_arrays(text)
+            pos, eof = scan(text, 0, len(text) + 1, len(text) + 1, kinds, starts, ends)
+            if not eof:
+                # raise the LexerError for what is at pos
+                lex = Lexer(text)
+                lex.pos = pos
+                lex.get_next_token()
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+        # index of the next token handed out by get_next_token()
+        self.index = 0
+        self.positions = tokens.LineIndex(text)
+        self._last = len(self.kinds) - 1
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type(self, i):
+        return TOKEN_TYPES[self.kinds[i]]
+
+    def value(self, i):
+        """Makes the value of token i out of its lexeme."""
+        kind = self.kinds[i]
+        lexeme = self.text[self.starts[i]:self.ends[i]]
+        if kind == INTEGER_CODE:
+            return int(lexeme)
+        if kind == NUMBER_CODE:
+            return float(lexeme)
+        if kind == STR_CODE:
+            if lexeme[-1:] == '"' and len(lexeme) > 1:
+                return lexeme[1:-1]
+            return lexeme[1:]
+        if kind == EOF_CODE:
+            return 'EOF' if lexeme else None
+        return lexeme
+
+    def token(self, i):
+        return tokens.Token(TOKEN_TYPES[self.kinds[i]], self.value(i), self.starts[i], self.positions)
 
-            if self.current_char.isspace():
-                self.skip_white_space()
-                continue
-
-            if self.current_char.isdigit():
-                return self.number()
-
-            if self.current_char == '"':
-                return self.string()
-
-            if self.current_char.isalpha():
-                return self._id()
-
-            if self.current_char == '+':
-                self.advance()
-                return token.Token(PLUS, '+')
-
-            if self.current_char == '-':
-                self.advance()
-                return token.Token(MINUS, '-')
-
-            if self.current_char == '*':
-                self.advance()
-                return token.Token(MULTIPLY, '*')
-
-            if self.current_char == '/' and self.peek(1) != '/':
-                self.advance()
-                return token.Token(DIVIDE, '/')
-
-            if self.current_char == '%':
-                self.advance()
-                return token.Token(MODULO, '%')
-
-            if self.current_char == '(':
-                self.advance()
-                return token.Token(LPAREN, '(')
-
-            if self.current_char == ')':
-                self.advance()
-                return token.Token(RPAREN, ')')
-
-            if self.current_char == '{':
-                self.advance()
-                return token.Token(LCURL, '{')
-
-            if self.current_char == '}':
-                self.advance()
-                return token.Token(RCURL, '}')
-
-            if self.current_char == '=' and self.peek(1) != '=':
-                self.advance()
-                return token.Token(ASSIGN, '=')
-
-            if self.current_char == '=' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return token.Token(EQ, '==')
-
-            if self.current_char == '!' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return token.Token(NE, '!=')
-
-            if self.current_char == '<' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return token.Token(LE, '<=')
-
-            if self.current_char == '>' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return token.Token(GE, '>=')
-
-            if self.current_char == '>' and self.peek(1) != '=':
-                self.advance()
-                return token.Token(GT, '>')
-
-            if self.current_char == '<' and self.peek(1) != '=':
-                self.advance()
-                return token.Token(LT, '<')
-
-            if self.current_char == ';':
-                self.advance()
-                return token.Token(SEMI, ';')
-
-            if self.current_char == ',':
-                self.advance()
-                return token.Token(COMMA, ',')
-
-            if self.current_char == 'i' and self.peek(1) == 'f' and self.peek(2) == ' ':
-                self.advance()
-                self.advance()
-                self.advance()
-                return token.Token(IF, 'if')
-
-            if self.current_char == 'e' and self.peek(1) == 'l' and self.peek(2) == 's' and self.peek(3) == 'e' and self.peek(4) == ' ' and self.peek(5) == 'i' and self.peek(6) == 'f' and self.peek(7) == ' ':
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                return token.Token(ELSEIF, 'else if')
-
-            if self.current_char == 'e' and self.peek(1) == 'l' and self.peek(2) == 's' and self.peek(3) == 'e' and self.peek(5) != 'i':
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                return token.Token(ELSE, 'else')
-
-            if self.current_char == 'w' and self.peek(1) == 'h' and self.peek(2) == 'i' and self.peek(3) == 'l' and self.peek(4) == 'e' and self.peek(5) == ' ':
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                self.advance()
-                return token.Token(WHILE, 'while')
-
-            if self.current_char == chr(26):
-                return token.Token(EOF, 'EOF')
-
-            self.error(
-                message="Invalid char {} at line {}".format(self.current_char, self.line)
-            )
+    def get_next_token(self):
+        i = self.index
+        if i < self._last:
+            self.index = i + 1
+        kind = self.kinds[i]
+        value = FIXED_VALUES[kind]
+        if value is None:
+            value = self.value(i)
+        return tokens.Token(TOKEN_TYPES[kind], value, self.starts[i], self.positions)
+
+
+# characters of input a token match needs after its end before it can be
+# trusted: 'else' needs ' if ' and 'let' needs ' mut ' to be seen
+LOOKAHEAD = 5
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class StreamLexer(Lexer):
+    """Lexer over a file object or mmap, read in fixed-size chunks.
+
+    Only the unconsumed part of the input is held in self.text. Whenever a
+    match runs into the last LOOKAHEAD characters of the buffer the next chunk
+    is read and the match is retried, so tokens, string literals and comments
+    that straddle two chunks are read in whole. Binary sources (an mmap or a
+    file opened with 'rb') are decoded as UTF-8.
+
+    Usage:
+        with StreamLexer.from_path('program.txt') as lex:
+            tree = parser.Parser(lex).parse()
+    """
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__('')
+        self.source = source
+        self.chunk_size = chunk_size
+        self._decoder = None
+        self._eof = False
+        self._file = None
+
+    @classmethod
+    def from_path(cls, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Memory-maps the file at `path` and lexes it in chunks."""
+        f = open(path, 'rb')
+        try:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            source = f
+        lex = cls(source, chunk_size)
+        lex._file = f
+        return lex
+
+    def close(self):
+        """Closes the mmap and the file opened by from_path()."""
+        if self._file is not None:
+            if self.source is not self._file:
+                self.source.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fill(self):
+        # drop the consumed part of the buffer and read the next chunk
+        self.offset += self.pos
+
+        chunk = self.source.read(self.chunk_size)
+        self._eof = not chunk
+        if isinstance(chunk, bytes):
+            # a multi-byte character split across chunks is held back
+            # by the decoder until the rest of it has been read
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = self._decoder.decode(chunk, final=self._eof)
+        rest = self.text[self.pos:]
+        # the whole source is never held, so its line starts are noted as it is read
+        self.positions.feed(chunk, self.offset + len(rest))
+        self.text = rest + chunk
+        self.pos = 0
 
-        return token.Token(EOF, None)
+    def get_next_token(self):
+        """Lexical Analyzer"""
+        """Breaks the input into tokens"""
+        while True:
+            m = self._match(self.text, self.pos)
+            if self._eof or (m is not None and m.end() + LOOKAHEAD < len(self.text)):
+                return self.make_token(m)
+            self.fill()
+
+
+def lex_chunk(piece, start, length, last):
+    """Lexes the first `length` characters of `piece`, which begins at
+    `start` in the source, in a worker process of lex_parallel().
+
+    Unless it is the last piece, `piece` runs LOOKAHEAD characters on past
+    `length` so that tokens ending right at the cut can be trusted. Whether
+    `start` really is the start of a token is checked by the caller.
+    """
+    kinds, starts, ends = new_arrays(piece)
+    if last:
+        limit = trusted = len(piece) + 1
+    else:
+        limit = length
+        trusted = len(piece) - LOOKAHEAD
+    pos, eof = scan(piece, 0, limit, trusted, kinds, starts, ends, start)
+    return kinds, starts, ends, start + pos, eof
+
+
+def split_points(text, pieces):
+    """Offsets just after a ';' or '}' that cut text into about `pieces`
+    equal parts."""
+    points = [0]
+    for i in range(1, pieces):
+        target = max(len(text) * i // pieces, points[-1] + 1)
+        ends = [n for n in (text.find(';', target), text.find('}', target)) if n >= 0]
+        if not ends:
+            break
+        point = min(ends) + 1
+        if point > points[-1] and point < len(text):
+            points.append(point)
+    return points
+
+
+def lex_parallel(text, workers=None, executor=None):
+    """Lexes text in a pool of worker processes into a TokenStream that is
+    the same as TokenStream(text).
+
+    The text is cut after a ';' or '}' into one piece per worker. A cut may
+    land inside a string or a comment, so each piece is lexed on the guess
+    that it starts a token; when the pieces are joined, the tokens of the
+    previous piece are lexed on (here, one at a time) until they reach a
+    position where a token of the next piece begins. From there on both
+    agree, because the lexer carries no state from one token to the next.
+    """
+    workers = workers or os.cpu_count() or 1
+    points = split_points(text, workers)
+    if len(points) == 1:
+        return TokenStream(text)
+
+    bounds = list(zip(points, points[1:] + [len(text)]))
+    pieces = [text[start:stop + LOOKAHEAD + 1] for start, stop in bounds]
+    pieces[-1] = text[bounds[-1][0]:]
+    lengths = [stop - start for start, stop in bounds]
+    last = [False] * (len(bounds) - 1) + [True]
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(lex_chunk, pieces, points, lengths, last))
+    else:
+        results = list(executor.map(lex_chunk, pieces, points, lengths, last))
+
+    kinds, starts, ends = new_arrays(text)
+    end = len(text) + 1
+    pos = 0
+    eof = False
+    for (chunk_start, _), (chunk_kinds, chunk_starts, chunk_ends, chunk_stop, chunk_eof) in zip(bounds, results):
+        # lex on from pos, and walk the positions where the tokens of this
+        # piece begin, until pos is one of them
+        boundary = chunk_start
+        k = 0
+        while pos != boundary:
+            if pos < boundary:
+                pos, eof = next_token(text, pos, kinds, starts, ends)
+                if eof:
+                    return TokenStream(text, kinds, starts, ends)
+            elif k < len(chunk_kinds) and chunk_kinds[k] != EOF_CODE:
+                boundary = chunk_ends[k] + (chunk_kinds[k] in SPACE_AFTER_CODES)
+                k += 1
+            else:
+                break
+        if pos != boundary:
+            # the piece was lexed from inside a string or a comment
+            continue
+        kinds.extend(chunk_kinds[k:])
+        starts.extend(chunk_starts[k:])
+        ends.extend(chunk_ends[k:])
+        pos = chunk_stop
+        if chunk_eof:
+            return TokenStream(text, kinds, starts, ends)
+
+    while True:
+        pos, eof = next_token(text, pos, kinds, starts, ends)
+        if eof:
+            return TokenStream(text, kinds, starts, ends)
+
+
+def next_token(text, pos, kinds, starts, ends):
+    # lexes the one token at pos, raising LexerError if there is none
+    new_pos, eof = scan(text, pos, pos + 1, len(text) + 1, kinds, starts, ends)
+    if new_pos == pos and not eof:
+        lex = Lexer(text)
+        lex.pos = pos
+        lex.get_next_token()
+    return new_pos, eof
@@ -0,0 +1,244 @@
+"""
+Counting loops
+
+Finds while loops that only count, such as
+
+    while a < 45 {
+        a = a + 1;
+        total = total + a;
+    }
+
+and runs them in one step instead of one iteration at a time. Such a loop
+has one induction variable, changed by a constant step, a bound that does
+not change in the loop, and otherwise only accumulators: variables to
+which the loop adds (or from which it subtracts) a constant, a variable
+the loop does not change, or the induction variable.
+
+Whether the loop can be skipped is decided each time it is reached: the
+values involved must all be ints and the loop must end. Otherwise it runs
+as usual, so the result is always what the Interpreter would give.
+
+    Interpreter = LoopInterpreter
+    LoopInterpreter(Parser(Lexer(text))).interpret()
+
+"""
+
+import interpreter
+import parser
+
+FLIPPED = {parser.LT: parser.GT, parser.GT: parser.LT, parser.LE: parser.GE,
+           parser.GE: parser.LE, parser.EQ: parser.EQ, parser.NE: parser.NE}
+
+# where an accumulator's increment comes from
+CONSTANT = 'constant'
+VARIABLE = 'variable'
+# the induction variable before its update in this iteration, or after
+INDUCTION_BEFORE = 'induction before'
+INDUCTION_AFTER = 'induction after'
+
+
+class CountingLoop(object):
+    """What is known about a counting loop before it runs."""
+
+    def __init__(self, var_name, step, op, bound, accumulators):
+        self.var_name = var_name
+        self.step = step
+        # var_name op bound is the condition
+        self.op = op
+        # (CONSTANT, value) or (VARIABLE, name)
+        self.bound = bound
+        # (name, sign, source, value or name), in the order of the body
+        self.accumulators = accumulators
+
+    def trip_count(self, start, bound):
+        """How often the body runs, or None if the loop does not end."""
+        step = self.step
+        op = self.op
+        if op == parser.LT:
+            if start >= bound:
+                return 0
+            return -((start - bound) // step) if step > 0 else None
+        if op == parser.LE:
+            if start > bound:
+                return 0
+            return (bound - start) // step + 1 if step > 0 else None
+        if op == parser.GT:
+            if start <= bound:
+                return 0
+            return -((start - bound) // step) if step < 0 else None
+        if op == parser.GE:
+            if start < bound:
+                return 0
+            return (bound - start) // step + 1 if step < 0 else None
+        if op == parser.EQ:
+            return 1 if start == bound else 0
+        # NE
+        if start == bound:
+            return 0
+        if (bound - start) % step or (bound - start) // step < 0:
+            return None
+        return (bound - start) // step
+
+    def run(self, variables):
+        """Sets the variables as running the loop would; returns False,
+        having changed nothing, when the loop has to run as usual."""
+        start = variables.get(self.var_name)
+        kind, bound = self.bound
+        if kind == VARIABLE:
+            bound = variables.get(bound)
+        # exactly int: bools, floats and strings are left to the loop
+        if type(start) is not int or type(bound) is not int:
+            return False
+        count = self.trip_count(start, bound)
+        if count is None:
+            return False
+        if count == 0:
+            return True
+
+        step = self.step
+        updates = []
+        for name, sign, source, value in self.accumulators:
+            current = variables.get(name)
+            if source == VARIABLE:
+                value = variables.get(value)
+            if type(current) is not int or (source == VARIABLE and type(value) is not int):
+                return False
+            if source == INDUCTION_BEFORE:
+                # start, start + step, ..., start + (count - 1) * step
+                total = count * start + step * count * (count - 1) // 2
+            elif source == INDUCTION_AFTER:
+                total = count * start + step * count * (count + 1) // 2
+            else:
+                total = count * value
+            updates.append((name, current + sign * total))
+
+        variables[self.var_name] = start + count * step
+        for name, value in updates:
+            variables[name] = value
+        return True
+
+
+def step_of(node, var_name):
+    """The constant step of `var_name = var_name +/- c`, or None."""
+    right = node.right
+    if not isinstance(right, parser.BinOP) or right.op.type not in (parser.PLUS, parser.MINUS):
+        return None
+    left, other = right.left, right.right
+    if right.op.type == parser.PLUS and isinstance(other, parser.Var) and other.value == var_name:
+        left, other = other, left
+    if not (isinstance(left, parser.Var) and left.value == var_name):
+        return None
+    if not isinstance(other, parser.Num) or type(other.value) is not int or other.value == 0:
+        return None
+    return other.value if right.op.type == parser.PLUS else -other.value
+
+
+def analyze(node):
+    """The CountingLoop of a While node, or None if it is not one."""
+    condition = node.condition
+    if not isinstance(condition, parser.BinOP) or condition.op.type not in FLIPPED:
+        return None
+    body = node.body
+    if not isinstance(body, list) or not all(isinstance(statement, parser.Assign) for statement in body):
+        return None
+    assigned = [statement.left.value for statement in body]
+    if len(set(assigned)) != len(assigned):
+        return None
+
+    left, op, right = condition.left, condition.op.type, condition.right
+    if not (isinstance(left, parser.Var) and left.value in assigned):
+        left, op, right = right, FLIPPED[op], left
+    if not (isinstance(left, parser.Var) and left.value in assigned):
+        return None
+    var_name = left.value
+    if isinstance(right, parser.Num):
+        bound = (CONSTANT, right.value)
+    elif isinstance(right, parser.Var) and right.value not in assigned:
+        bound = (VARIABLE, right.value)
+    else:
+        return None
+
+    step = None
+    accumulators = []
+    for statement in body:
+        name = statement.left.value
+        if name == var_name:
+            step = step_of(statement, var_name)
+            if step is None:
+                return None
+            continue
+        accumulator = accumulator_of(statement, name, var_name, assigned, step is not None)
+        if accumulator is None:
+            return None
+        accumulators.append(accumulator)
+    return CountingLoop(var_name, step, op, bound, accumulators)
+
+
+def accumulator_of(node, name, var_name, assigned, after):
+    """(name, sign, source, value) for `name = name +/- increment`."""
+    right = node.right
+    if not isinstance(right, parser.BinOP) or right.op.type not in (parser.PLUS, parser.MINUS):
+        return None
+    left, other = right.left, right.right
+    if right.op.type == parser.PLUS and isinstance(other, parser.Var) and other.value == name:
+        left, other = other, left
+    if not (isinstance(left, parser.Var) and left.value == name):
+        return None
+    sign = 1 if right.op.type == parser.PLUS else -1
+    if isinstance(other, parser.Num):
+        if type(other.value) is not int:
+            return None
+        return (name, sign, CONSTANT, other.value)
+    if isinstance(other, parser.Var):
+        if other.value == var_name:
+            return (name, sign, INDUCTION_AFTER if after else INDUCTION_BEFORE, None)
+        if other.value not in assigned:
+            return (name, sign, VARIABLE, other.value)
+    return None
+
+
+def find_counting_loops(tree):
+    """{id(While node): CountingLoop} for the counting loops in tree."""
+    loops = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, parser.Compound):
+            stack.extend(node.children)
+        elif isinstance(node, parser.If):
+            stack.extend([node.body, node.control_body])
+        elif isinstance(node, parser.While):
+            loop = analyze(node)
+            if loop is not None:
+                loops[id(node)] = loop
+            else:
+                stack.append(node.body)
+    return loops
+
+
+class LoopInterpreter(interpreter.Interpreter):
+    """Interpreter that skips counting loops when it safely can.
+    self.skipped and self.stepped count the loops run each way."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.loops = {}
+        self.skipped = 0
+        self.stepped = 0
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        self.loops = find_counting_loops(tree)
+        return self.visit(tree)
+
+    def visit_While(self, node):
+        loop = self.loops.get(id(node))
+        if loop is not None and loop.run(self.variables):
+            self.skipped += 1
+            return
+        self.stepped += 1
+        super().visit_While(node)
@@ -0,0 +1,238 @@
+"""
+Optimizer
+
+An optional pass between Parser.parse and running a program. It
+
+- folds BinOPs whose operands are constants, e.g. (6+7)*3 into 39, by
+  running the very Python operator the Interpreter would, so / and %
+  give exactly what they give at run time;
+- drops If arms whose condition is a false constant, and replaces an If
+  whose condition is a true constant by its body;
+- drops While loops whose condition is a false constant;
+- splices nested Compounds and statement lists into the list around them.
+
+An operation that would raise (1 / 0, "a" - 1) is left for the run, so
+the error still happens when and where it did. The input tree is not
+changed; the result shares the subtrees that did not change.
+
+    par = OptimizingParser(Parser(Lexer(text)))
+    Interpreter(par).interpret()
+    print(par.optimizer.report())
+
+"""
+
+import operator
+
+import interpreter
+import parser
+import tokens
+
+OPERATOR_FUNCTIONS = {
+    parser.PLUS: operator.add,
+    parser.MINUS: operator.sub,
+    parser.MULTIPLY: operator.mul,
+    parser.DIVIDE: operator.truediv,
+    parser.MODULO: operator.mod,
+    parser.EQ: operator.eq,
+    parser.NE: operator.ne,
+    parser.GT: operator.gt,
+    parser.LT: operator.lt,
+    parser.GE: operator.ge,
+    parser.LE: operator.le,
+}
+
+# folded values bigger than these stay as expressions: "ab" * 9 is fine
+# to fold, a string of a million characters is not
+MAX_STR_LENGTH = 1024
+MAX_INT_BITS = 1024
+
+FOLD = 'fold'
+IF_TRUE = 'if true'
+IF_FALSE = 'if false'
+WHILE_FALSE = 'while false'
+FLATTEN = 'flatten'
+
+
+def constant_token(value, like):
+    """A token for a folded value, at the position of the token `like`."""
+    if isinstance(value, bool):
+        kind = parser.TRUE if value else parser.FALSE
+    elif isinstance(value, int):
+        kind = parser.INTEGER
+    elif isinstance(value, float):
+        kind = parser.NUMBER
+    else:
+        kind = parser.STR
+    return tokens.Token(kind, value, like.offset, like.positions)
+
+
+class Optimizer(object):
+    def __init__(self):
+        # (kind, line, what was done) for every change, in tree order
+        self.changes = []
+
+    def note(self, kind, token, text):
+        line = token.line if token is not None else None
+        self.changes.append((kind, line, text))
+
+    def counts(self):
+        result = {}
+        for kind, _, _ in self.changes:
+            result[kind] = result.get(kind, 0) + 1
+        return result
+
+    def report(self):
+        """The changes as text, one per line."""
+        return '\n'.join(
+            'line {}: {}'.format(line, text) if line is not None else text
+            for _, line, text in self.changes)
+
+    def optimize(self, tree):
+        if isinstance(tree, parser.Compound):
+            children = self.statements(tree.children)
+            if children is tree.children:
+                return tree
+            node = parser.Compound()
+            node.children = children
+            return node
+        return self.statements([tree])
+
+    def statements(self, nodes):
+        """The optimized statement list; the same list if nothing changed."""
+        result = []
+        changed = False
+        for node in nodes:
+            new = self.statement(node)
+            if new is node:
+                result.append(node)
+                continue
+            changed = True
+            if isinstance(new, list):
+                result.extend(new)
+            elif new is not None and not isinstance(new, parser.NoOp):
+                result.append(new)
+        return result if changed else nodes
+
+    def statement(self, node):
+        """The optimized node: the same node, a new one, a list of
+        statements to splice in, or None to drop it."""
+        if isinstance(node, parser.Assign):
+            right = self.expr(node.right)
+            if right is node.right:
+                return node
+            return parser.Assign(node.left, node.op, right)
+        if isinstance(node, parser.If):
+            return self.if_statement(node)
+        if isinstance(node, parser.While):
+            condition = self.expr(node.condition)
+            if isinstance(condition, parser.Num) and not condition.value:
+                self.note(WHILE_FALSE, node.token, 'removed while loop whose condition is always false')
+                return None
+            body = self.statements(node.body)
+            if condition is node.condition and body is node.body:
+                return node
+            return parser.While(condition, body, node.token)
+        if isinstance(node, list):
+            self.note(FLATTEN, None, 'spliced a nested block into its parent')
+            return self.statements(node)
+        if isinstance(node, parser.Compound):
+            self.note(FLATTEN, None, 'spliced a nested block into its parent')
+            return self.statements(node.children)
+        if isinstance(node, parser.Num):
+            # a constant on its own does nothing
+            return None
+        if isinstance(node, (parser.Var, parser.BinOP)):
+            # a stray expression statement, kept for its errors
+            expr = self.expr(node)
+            return None if isinstance(expr, parser.Num) else expr
+        return node
+
+    def if_statement(self, node):
+        """The optimized If and its else if chain, which is walked in a loop
+        so a ladder of any length needs no recursion."""
+        # (original If, condition, body) of the arms kept
+        arms = []
+        while isinstance(node, parser.If):
+            condition = self.expr(node.condition)
+            if isinstance(condition, parser.Num):
+                if condition.value:
+                    self.note(IF_TRUE, node.token, 'kept only the arm whose condition is always true')
+                    node = node.body
+                    break
+                self.note(IF_FALSE, node.token, 'removed arm whose condition is always false')
+            else:
+                arms.append((node, condition, self.statements(node.body)))
+            node = node.control_body
+        # what runs when no arm kept does: a list or a NoOp
+        result = self.statements(node) if isinstance(node, list) else node
+        for original, condition, body in reversed(arms):
+            if (condition is original.condition and body is original.body
+                    and result is original.control_body):
+                result = original
+            else:
+                result = parser.If(condition, body, result, original.token)
+        return result
+
+    def expr(self, node):
+        if not isinstance(node, parser.BinOP):
+            return node
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        if (isinstance(left, parser.Num) and isinstance(right, parser.Num)
+                and self.small(node.op.type, left.value, right.value)):
+            try:
+                value = OPERATOR_FUNCTIONS[node.op.type](left.value, right.value)
+            except (ArithmeticError, TypeError, ValueError):
+                # raise it at run time, like the Interpreter
+                value = None
+            if value is not None:
+                self.note(FOLD, node.op, 'folded {!r} {} {!r} into {!r}'.format(
+                    left.value, node.op.value, right.value, value))
+                return parser.Num(constant_token(value, node.op))
+        if left is node.left and right is node.right:
+            return node
+        return parser.BinOP(left, node.op, right)
+
+    def small(self, op, left, right):
+        """Whether `left op right` surely gives a value small enough to
+        fold. Worked out from the operands, so "x" * 1000000000 is never
+        built."""
+        if op == parser.MULTIPLY:
+            if isinstance(left, int) and isinstance(right, str):
+                left, right = right, left
+            if isinstance(left, str) and isinstance(right, int):
+                return len(left) * max(right, 0) <= MAX_STR_LENGTH
+            if isinstance(left, int) and isinstance(right, int):
+                return left.bit_length() + right.bit_length() <= MAX_INT_BITS
+            return True
+        if op in (parser.PLUS, parser.MINUS):
+            if isinstance(left, str) and isinstance(right, str):
+                return len(left) + len(right) <= MAX_STR_LENGTH
+            if isinstance(left, int) and isinstance(right, int):
+                return max(left.bit_length(), right.bit_length()) + 1 <= MAX_INT_BITS
+        return True
+
+
+def optimize(tree):
+    return Optimizer().optimize(tree)
+
+
+class OptimizingParser(object):
+    """Stands in for a Parser: parse() returns the optimized tree. The
+    optimizer, with its report, is kept in self.optimizer."""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.optimizer = None
+
+    def parse(self):
+        tree = self.parser.parse()
+        self.optimizer = Optimizer()
+        return self.optimizer.optimize(tree)
+
+
+class OptimizedInterpreter(interpreter.Interpreter):
+    """The Interpreter, running the optimized tree."""
+
+    def __init__(self, par):
+        super().__init__(OptimizingParser(par))
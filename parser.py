@@ -83,18 +83,48 @@ MAIN = 'main'
 EOF = 'EOF'
 
 
+LITERALS = frozenset((INTEGER, NUMBER, STR))
+
+LEFT = 'left'
+RIGHT = 'right'
+
+# precedence (higher binds tighter) and associativity of every binary operator
+BINARY_OPERATORS = {
+    EQ: (1, LEFT),
+    NE: (1, LEFT),
+    LT: (1, LEFT),
+    GT: (1, LEFT),
+    LE: (1, LEFT),
+    GE: (1, LEFT),
+    PLUS: (2, LEFT),
+    MINUS: (2, LEFT),
+    MULTIPLY: (3, LEFT),
+    DIVIDE: (3, LEFT),
+    MODULO: (3, LEFT),
+}
+
+
 class AST(object):
-    pass
+    # nodes have no __dict__; big programs make millions of them
+    __slots__ = ()
 
 
 class BinOP(AST):
+    __slots__ = ('left', 'token', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.token = op
         self.right = right
 
+    @property
+    def op(self):
+        return self.token
+
 
 class Num(AST):
+    __slots__ = ('token', 'value')
+
     def __init__(self, token):
         self.token = token
         self.value = token.value
@@ -102,47 +132,70 @@ class Num(AST):
 
 class Compound(AST):
     """ Represents a BEGIN ... END block """
+    __slots__ = ('children',)
+
     def __init__(self):
         self.children = []
 
 
 class Assign(AST):
+    __slots__ = ('left', 'token', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.token = op
         self.right = right
 
+    @property
+    def op(self):
+        return self.token
+
 
 class If(AST):
-    def __init__(self, condition, body, control_body):
+    __slots__ = ('condition', 'body', 'control_body', 'token')
+
+    def __init__(self, condition, body, control_body, token=None):
         self.condition = condition
         self.body = body
         self.control_body = control_body
         # control-flow statements
+        # the if or else if token, for its position in the source
+        self.token = token
 
 
 class While(AST):
-    def __init__(self, condition, body):
+    __slots__ = ('condition', 'body', 'token')
+
+    def __init__(self, condition, body, token=None):
         self.condition = condition
         self.body = body
+        self.token = token
 
 
 class Compare(AST):
+    __slots__ = ('left', 'token', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.token = op
         self.right = right
 
+    @property
+    def op(self):
+        return self.token
+
 
 class Var(AST):
     """The Var node is constructed out of the ID token"""
+    __slots__ = ('token', 'value')
+
     def __init__(self, token):
         self.token = token
         self.value = token.value
 
 
 class NoOp(AST):
-    pass
+    __slots__ = ()
 
 
 class Parser(object):
@@ -196,7 +249,11 @@ class Parser(object):
         results = [node]
 
         while self.current_token.type != EOF and self.current_token.type != RCURL:
+            token = self.current_token
             results.append(self.statement())
+            if self.current_token is token:
+                # nothing was eaten, the same statement would be tried forever
+                self.error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=token)
 
         return results
 
@@ -238,6 +295,7 @@ class Parser(object):
         """
         if_statement:       expr comparison_operator expr { statement_list } (else if* | else | empty)
         """
+        token = self.current_token
         self.eat(IF)
         condition = self.conditional_statement()
         self.eat(LCURL)
@@ -257,37 +315,47 @@ class Parser(object):
             control_body = self.statement_list()
             self.eat(RCURL)
 
-        node = If(condition=condition, body=body, control_body=control_body)
+        node = If(condition=condition, body=body, control_body=control_body, token=token)
         return node
 
     def elseif_statement(self):
-        self.eat(ELSEIF)
-        elseif_condition = self.conditional_statement()
-        self.eat(LCURL)
-        elseif_body = self.statement_list()
-        self.eat(RCURL)
-        control_body = self.empty()
+        """
+        elseif_statement:   (else if expr comparison_operator expr { statement_list })+ (else | empty)
 
+        The arms are read in a loop and chained from the last one back, so
+        a ladder of any length parses without recursion.
+        """
+        arms = []
         while self.current_token.type == ELSEIF:
-            control_body = self.elseif_statement()
+            token = self.current_token
+            self.eat(ELSEIF)
+            elseif_condition = self.conditional_statement()
+            self.eat(LCURL)
+            elseif_body = self.statement_list()
+            self.eat(RCURL)
+            arms.append((elseif_condition, elseif_body, token))
+
+        control_body = self.empty()
         if self.current_token.type == ELSE:
             self.eat(ELSE)
             self.eat(LCURL)
             control_body = self.statement_list()
             self.eat(RCURL)
 
-        node = If(condition=elseif_condition, body=elseif_body, control_body=control_body)
-        return node
+        for elseif_condition, elseif_body, token in reversed(arms):
+            control_body = If(condition=elseif_condition, body=elseif_body, control_body=control_body, token=token)
+        return control_body
 
     ################
 
     def while_statement(self):
+        token = self.current_token
         self.eat(WHILE)
         condition = self.conditional_statement()
         self.eat(LCURL)
         body = self.statement_list()
         self.eat(RCURL)
-        node = While(condition=condition, body=body)
+        node = While(condition=condition, body=body, token=token)
         return node
 
     ################
@@ -306,77 +374,52 @@ class Parser(object):
         return NoOp()
 
     def conditional_statement(self):
-        """"conditional_statement: expr comparison_operator expr"""
-        node = self.expr()
-
-        while self.current_token.type in (EQ, NE, GT, LT, GE, LE):
-            token = self.current_token
-            self.eat(token.type)
-            node = Compare(left=node, op=token, right=self.expr())
-        return node
+        """"conditional_statement: expr, whose outermost operator is usually a comparison"""
+        return self.expr()
 
-    def expr(self):
+    def expr(self, min_precedence=0):
         """
-        expr   : term ((PLUS | MINUS) term)*
-        term   : factor ((MUL | DIV) factor)*
-        factor : INTEGER 
+        expr   : factor (binary_operator factor)*
+        factor : INTEGER
                  | NUMBER
                  | LPAREN expr RPAREN
-        """
-        node = self.term()
-
-        while self.current_token.type in (PLUS, MINUS):
-            token = self.current_token
-            if token.type == PLUS:
-                self.eat(PLUS)
-            elif token.type == MINUS:
-                self.eat(MINUS)
-
-            node = BinOP(left=node, op=token, right=self.term())
 
-        return node
-
-    def term(self):
-        node = self.factor()
-        while self.current_token.type in (MULTIPLY, DIVIDE, MODULO, EQ, NE, LT, GT, LE, GE):
+        Precedence climbing over BINARY_OPERATORS: one loop reads operators
+        as long as they bind at least as tightly as min_precedence. It only
+        calls itself for a right operand that is followed by an operator
+        binding more tightly than the one before it.
+        """
+        return self.climb(self.factor(), min_precedence)[0]
+
+    def climb(self, left, min_precedence):
+        """(the expression, BINARY_OPERATORS entry of the token after it)"""
+        operators = BINARY_OPERATORS
+        next_token = self.lexer.get_next_token
+        factor = self.factor
+        operator = operators.get(self.current_token.type)
+        while operator is not None and operator[0] >= min_precedence:
             token = self.current_token
-            if token.type == MULTIPLY:
-                self.eat(MULTIPLY)
-            elif token.type == DIVIDE:
-                self.eat(DIVIDE)
-            elif token.type == MODULO:
-                self.eat(MODULO)
-            elif token.type == EQ:
-                self.eat(EQ)
-            elif token.type == NE:
-                self.eat(NE)
-            elif token.type == LT:
-                self.eat(LT)
-            elif token.type == GT:
-                self.eat(GT)
-            elif token.type == LE:
-                self.eat(LE)
-            elif token.type == GE:
-                self.eat(GE)
-            node = BinOP(left=node, op=token, right=self.factor())
-
-        return node
+            precedence = operator[0]
+            # the operator was just looked up, so eat() need not check it
+            self.current_token = next_token()
+            right = factor()
+            operator = operators.get(self.current_token.type)
+            while operator is not None and (
+                    operator[0] > precedence or (operator[0] == precedence and operator[1] == RIGHT)):
+                right, operator = self.climb(right, operator[0])
+            left = BinOP(left, token, right)
+        return left, operator
 
     def factor(self):
         token = self.current_token
-        if token.type == INTEGER:
-            self.eat(INTEGER)
-            return Num(token)
-        elif token.type == NUMBER:
-            self.eat(NUMBER)
-            return Num(token)
-        elif token.type == STR:
-            self.eat(STR)
-            return Num(token)
-        elif token.type == ID:
-            self.eat(ID)
+        kind = token.type
+        if kind == ID:
+            self.current_token = self.lexer.get_next_token()
             return Var(token)
-        elif token.type == LPAREN:
+        elif kind in LITERALS:
+            self.current_token = self.lexer.get_next_token()
+            return Num(token)
+        elif kind == LPAREN:
             self.eat(LPAREN)
             node = self.expr()
             self.eat(RPAREN)
@@ -409,17 +452,22 @@ class Parser(object):
 
         variable                :      ID
 
-        expr                    :      term { (PLUS | MINUS) term }
-        
-        term                    :      factor { (MUL | DIV) factor }
+        expr                    :      factor { binary_operator factor }
+
+        binary_operator         :      == | != | < | > | <= | >=     (lowest)
+                                    |  PLUS | MINUS
+                                    |  MUL | DIV | MOD                  (highest)
         
         factor                  :      INTEGER 
                                     |  NUMBER
                                     |  LPAREN expr RPAREN
         """
         node = self.program()
-        while self.current_token.type != EOF:
-            self.error()
+        if self.current_token.type != EOF:
+            self.error(
+                error_code=ErrorCode.UNEXPECTED_TOKEN,
+                token=self.current_token,
+            )
         return node
 
 
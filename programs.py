@@ -0,0 +1,362 @@
+"""
+Programs and helpers shared by the tests and the benchmarks
+
+The programs under Rust Test Files, programs that raise, generators of
+programs of every shape the grammar allows, random edits of them, and
+ways to run a program with any backend and compare the results.
+
+    for name, text in corpus():
+        print(name, outcome(Interpreter, text))
+
+"""
+
+import os
+import re
+
+import interpreter
+import lexer
+import parser
+
+
+def corpus():
+    """(name, text) of every program under Rust Test Files."""
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Rust Test Files')
+    texts = []
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name)) as f:
+            texts.append((name, f.read()))
+    return texts
+
+
+# programs that raise, and the error they raise
+ERRORS = {
+    'unset variable': ('fn main() {\n let mut a = 1;\n b = a + c;\n a = 2;\n}\n', 'NameError'),
+    'division by zero': ('fn main() {\n let mut a = 1;\n let mut b = a / 0;\n a = 2;\n}\n',
+                         'ZeroDivisionError'),
+    'modulo by zero': ('fn main() {\n let mut a = 0;\n a = 7 % a;\n}\n', 'ZeroDivisionError'),
+    'string plus number': ('fn main() {\n let mut s = "a";\n s = s + 1;\n}\n', 'TypeError'),
+    'in a loop': ('fn main() {\n let mut i = 3;\n let mut t = 0;\n'
+                  ' while i >= 0 {\n  t = t + 6 / i;\n  i = i - 1;\n }\n}\n', 'ZeroDivisionError'),
+    'in an else if': ('fn main() {\n let mut x = 2;\n if x == 1 {\n  x = 0;\n }\n'
+                      ' else if x == 2 {\n  x = y;\n }\n}\n', 'NameError'),
+}
+
+
+def generate_program(blocks):
+    """Builds a valid program out of `blocks` copies of a block that uses
+    every token kind the lexer knows about."""
+    lines = ['fn main(){', '    // generated program']
+    for i in range(blocks):
+        lines.extend([
+            '    // block {}'.format(i),
+            '    let mut a{i} = (6+{i})*3 - {i} % 7;'.format(i=i),
+            '    let mut f{i} = 2.5 / 4.0;'.format(i=i),
+            '    let mut s{i} = "block {i}";'.format(i=i),
+            '    s{i} = s{i} + " done";'.format(i=i),
+            '    if a{i} >= 10 {{'.format(i=i),
+            '        a{i} = a{i} - 1;'.format(i=i),
+            '    }',
+            '    else if a{i} != 3 {{'.format(i=i),
+            '        a{i} = a{i} + 1;'.format(i=i),
+            '    }',
+            '    else {',
+            '        a{i} = 0;'.format(i=i),
+            '    }',
+            '    while a{i} <= 45 {{'.format(i=i),
+            '        a{i} = a{i}+1;'.format(i=i),
+            '    }',
+        ])
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_loop(iterations):
+    """A program that spends its time in one while loop."""
+    return '\n'.join([
+        'fn main(){',
+        '    let mut i = 0;',
+        '    let mut total = 0;',
+        '    let mut odd = 0;',
+        '    while i < {} {{'.format(iterations),
+        '        total = total + i % 7 * 3;',
+        '        if total > 1000 {',
+        '            total = total - 1000;',
+        '        }',
+        '        else if i % 2 == 1 {',
+        '            odd = odd + 1;',
+        '        }',
+        '        i = i + 1;',
+        '    }',
+        '}',
+    ]) + '\n'
+
+
+# arms of the else if ladder every backend is checked on; far more than
+# the recursion limit, so a pass that recurses once per arm fails
+LADDER_ARMS = 3000
+
+
+def generate_ladder(arms, iterations):
+    """A loop around an else if ladder of `arms` arms on one variable."""
+    lines = [
+        'fn main(){',
+        '    let mut i = 0;',
+        '    let mut hits = 0;',
+        '    while i < {} {{'.format(iterations),
+        '        x = i * 7 % {};'.format(arms + 1),
+        '        if x == 0 {',
+        '            hits = hits + 1;',
+    ]
+    for arm in range(1, arms):
+        lines.append('        }')
+        lines.append('        else if x == {} {{'.format(arm))
+        lines.append('            hits = hits + {};'.format(arm % 5 + 1))
+    lines.extend([
+        '        }',
+        '        else {',
+        '            hits = hits - 1;',
+        '        }',
+        '        i = i + 1;',
+        '    }',
+        '}',
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def generate_expression(rng, depth):
+    """Builds a random expression with every binary operator in it."""
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(['a', 'b', 'c', str(rng.randint(0, 99)), '2.5'])
+    if rng.random() < 0.15:
+        return '(' + generate_expression(rng, depth - 1) + ')'
+    return '{} {} {}'.format(
+        generate_expression(rng, depth - 1),
+        rng.choice(['+', '-', '*', '/', '%', '<', '>', '==', '!=', '<=', '>=']),
+        generate_expression(rng, depth - 1))
+
+
+def generate_random_program(rng, statements=8, depth=2):
+    """A random program for checking one backend against another. Its loops
+    always end, but it may read unset variables, divide by zero or add a
+    string to a number."""
+    names = ['a', 'b', 'c', 'd', 'e']
+    counters = iter(range(1000))
+
+    def expression(level):
+        roll = rng.random()
+        if level == 0 or roll < 0.3:
+            if roll < 0.003:
+                return '"s"'
+            if roll < 0.006:
+                # set only by some assignments
+                return 'u'
+            return rng.choice(names + [str(rng.randint(0, 9)), str(rng.randint(1, 9)), '2.5'])
+        if roll < 0.4:
+            return '(' + expression(level - 1) + ')'
+        op = rng.choice(['+', '-', '+', '-', '*', '/', '%', '<', '>', '==', '!=', '<=', '>='])
+        if op == '*':
+            # keep numbers from growing too fast in loops
+            return '{} * {}'.format(expression(level - 1), rng.randint(0, 3))
+        if op in ('/', '%') and rng.random() < 0.7:
+            return '{} {} {}'.format(expression(level - 1), op, rng.randint(1, 9))
+        return '{} {} {}'.format(expression(level - 1), op, expression(level - 1))
+
+    def block(count, level, indent):
+        lines = []
+        pad = '    ' * indent
+        for _ in range(count):
+            roll = rng.random()
+            if level and roll < 0.15:
+                lines.append('{}if {} {{'.format(pad, expression(2)))
+                lines.extend(block(rng.randint(1, 3), level - 1, indent + 1))
+                for _ in range(rng.randint(0, 2)):
+                    lines.append('{}}}'.format(pad))
+                    lines.append('{}else if {} {{'.format(pad, expression(2)))
+                    lines.extend(block(rng.randint(1, 3), level - 1, indent + 1))
+                if rng.random() < 0.5:
+                    lines.append('{}}}'.format(pad))
+                    lines.append('{}else {{'.format(pad))
+                    lines.extend(block(rng.randint(1, 3), level - 1, indent + 1))
+                lines.append('{}}}'.format(pad))
+            elif level and roll < 0.3:
+                counter = 'k{}'.format(next(counters))
+                lines.append('{}let mut {} = 0;'.format(pad, counter))
+                lines.append('{}while {} < {} {{'.format(pad, counter, rng.randint(0, 4)))
+                lines.extend(block(rng.randint(1, 3), level - 1, indent + 1))
+                lines.append('{}    {} = {} + 1;'.format(pad, counter, counter))
+                lines.append('{}}}'.format(pad))
+            else:
+                let = 'let mut ' if rng.random() < 0.3 else ''
+                lines.append('{}{}{} = {};'.format(pad, let, rng.choice(names + ['u']), expression(3)))
+        return lines
+
+    start = ['    let mut {} = {};'.format(name, rng.randint(0, 9)) for name in names]
+    return '\n'.join(['fn main(){'] + start + block(statements, depth, 1) + ['}']) + '\n'
+
+
+def generate_changing_types(rng, statements=6):
+    """A random loop whose variables change type now and then, from int to
+    float or bool and back."""
+    names = ['x', 'y', 'z']
+    values = ['0', '1', '7', '0.5', '2.5', '1 == 1', '1 == 2']
+    lines = ['fn main(){', '    let mut i = 0;']
+    lines.extend('    let mut {} = {};'.format(name, rng.randint(0, 3)) for name in names)
+    lines.append('    while i < {} {{'.format(rng.randint(20, 60)))
+    for _ in range(statements):
+        roll = rng.random()
+        target = rng.choice(names)
+        if roll < 0.35:
+            lines.append('        {} = {} {} {};'.format(target, target, rng.choice('+-'), rng.randint(1, 3)))
+        elif roll < 0.55:
+            lines.append('        {} = {} + {};'.format(target, rng.choice(names), rng.choice(names + ['i'])))
+        elif roll < 0.75:
+            lines.append('        if {} {} {} {{'.format(
+                rng.choice(names), rng.choice(['<', '>', '==', '>=']), rng.choice(['10', '3', '2.5'])))
+            lines.append('            {} = {} + 1;'.format(target, target))
+            lines.append('        }')
+        else:
+            lines.append('        if i == {} {{'.format(rng.randint(5, 40)))
+            lines.append('            {} = {};'.format(target, rng.choice(values)))
+            lines.append('        }')
+    lines.append('        i = i + 1;')
+    lines.append('    }')
+    return '\n'.join(lines + ['}']) + '\n'
+
+
+def generate_straight_line(rng, statements=12):
+    """A random program of mostly plain assignments that repeat each
+    other's expressions and overwrite each other's variables."""
+    names = ['a', 'b', 'c', 'x', 'y']
+    expressions = ['x * y', 'x * y + 1', 'a + b', 'a * 2', 'x / 2', '1 / a', 'x % 3',
+                   'y - 1', 'x < y', 'b', '7', '2.5', 'u', 'a + "s"']
+    lines = ['fn main(){']
+    lines.extend('    let mut {} = {};'.format(name, rng.choice(['0', '1', '3', '2.5']))
+                 for name in names if rng.random() < 0.8)
+    for number in range(statements):
+        roll = rng.random()
+        if roll < 0.1:
+            counter = 'k{}'.format(number)
+            lines.append('    let mut {} = 0;'.format(counter))
+            lines.append('    while {} < {} {{'.format(counter, rng.randint(0, 3)))
+            for _ in range(rng.randint(1, 4)):
+                lines.append('        {} = {};'.format(rng.choice(names), rng.choice(expressions)))
+            lines.append('        {} = {} + 1;'.format(counter, counter))
+            lines.append('    }')
+        elif roll < 0.2:
+            lines.append('    if {} {{'.format(rng.choice(expressions)))
+            lines.append('        {} = {};'.format(rng.choice(names), rng.choice(expressions)))
+            lines.append('    }')
+        else:
+            lines.append('    {} = {};'.format(rng.choice(names), rng.choice(expressions)))
+    return '\n'.join(lines + ['}']) + '\n'
+
+
+def generate_deep_programs(depth):
+    """(name, text, variables it leaves) of programs nested depth levels
+    deep in every way the grammar allows."""
+    nested_if = ['let mut d = 0;'] + ['if d < 1 {'] * depth + ['d = 1;'] + ['}'] * depth
+    nested_while = ['let mut d = 0;'] + ['while d < 1 {'] * depth + ['d = d + 1;'] + ['}'] * depth
+    mixed = ['let mut d = 0;'] + ['if d < 1 {', 'while d < 1 {'] * (depth // 2) + ['d = 1;'] + ['}'] * depth
+    programs = [
+        ('parentheses', ['x = ' + '(' * depth + '1' + ')' * depth + ';'], {'x': 1}),
+        ('left operands', ['x = ' + ' + '.join(['1'] * depth) + ';'], {'x': depth}),
+        ('right operands', ['x = ' + '1 - (' * depth + '1' + ')' * depth + ';'], {'x': (depth + 1) % 2}),
+        ('nested ifs', nested_if, {'d': 1}),
+        ('nested whiles', nested_while, {'d': 1}),
+        ('ifs and whiles', mixed, {'d': 1}),
+    ]
+    return [(name, 'fn main() {\n' + '\n'.join(lines) + '\n}\n', variables)
+            for name, lines, variables in programs]
+
+
+# what random_edit() may do to a program
+EDIT_KINDS = ('digit', 'brace', 'split', 'join', 'string', 'comment', 'comment end', 'statement',
+              'delete')
+
+
+def random_edit(rng, text, kind=None):
+    """(offset, removed, inserted) of an edit of text of one of EDIT_KINDS,
+    chosen at random unless given. Many leave a program that does not
+    parse."""
+    kind = kind or rng.choice(EDIT_KINDS)
+
+    def somewhere(pattern):
+        found = [m.start() for m in re.finditer(pattern, text)]
+        return rng.choice(found) if found else rng.randrange(len(text))
+
+    if kind == 'digit':
+        return somewhere('[0-9]'), 1, str(rng.randint(0, 9))
+    if kind == 'brace':
+        if rng.random() < 0.5:
+            return somewhere('[{}]'), 1, ''
+        return somewhere(';') + 1, 0, rng.choice(['{', '}', ' }', '\n    }'])
+    if kind == 'split':
+        # a = b + c;  ->  a = 1; q = b + c;
+        return somewhere(' = ') + 3, 0, '1;\n    q = '
+    if kind == 'join':
+        return somewhere(';'), 1, ''
+    if kind == 'string':
+        return somewhere('"[^"\n]') + 1, 0, rng.choice(['x', '}', '{', ';', '"', '//', ' else '])
+    if kind == 'comment':
+        return somewhere('//') + 2, 0, rng.choice([' x', ' }', '\n', '"', ' let mut c = 1;', '\nx = 1;'])
+    if kind == 'comment end':
+        start = somewhere('//[^\n]*\n')
+        return text.index('\n', start), 1, ''
+    if kind == 'statement':
+        return somewhere(';') + 1, 0, rng.choice([
+            '\n    let mut z = 5;',
+            '\n    if z > 1 {\n        z = 0;\n    }',
+            '\n    while 1 > 2 {\n    }',
+            '\n    // new comment\n',
+        ])
+    start = rng.randrange(len(text))
+    return start, min(rng.randint(1, 40), len(text) - start), ''
+
+
+def tree_shape(node):
+    """Nested tuples with every node type, token and value of a tree, for
+    checking that two trees are the same."""
+    if isinstance(node, list):
+        return tuple(tree_shape(child) for child in node)
+    if not isinstance(node, parser.AST):
+        return node
+    fields = []
+    for name in sorted(type(node).__slots__):
+        value = getattr(node, name)
+        if name == 'token':
+            value = None if value is None else (value.type, value.value, value.offset)
+        else:
+            value = tree_shape(value)
+        fields.append((name, value))
+    return (type(node).__name__, tuple(fields))
+
+
+def clear_variables(interpreter_class):
+    """Empties the variables interpreter_class shares between instances, if
+    it has any."""
+    shared = getattr(interpreter_class, 'variables', None)
+    if shared is not None:
+        shared.clear()
+
+
+def run_backend(interpreter_class, tree):
+    """Runs tree with interpreter_class from fresh variables; returns them."""
+    clear_variables(interpreter_class)
+    inptr = interpreter_class(None)
+    if interpreter_class is interpreter.Interpreter:
+        inptr.visit(tree)
+    else:
+        inptr.run(tree)
+    return dict(inptr.variables)
+
+
+def outcome(interpreter_class, text):
+    """(variables, error) after running text with interpreter_class."""
+    clear_variables(interpreter_class)
+    inptr = interpreter_class(parser.Parser(lexer.Lexer(text)))
+    error = None
+    try:
+        inptr.interpret()
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    return dict(inptr.variables), error
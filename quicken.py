@@ -0,0 +1,207 @@
+"""
+Quickening
+
+QuickeningInterpreter specializes the tree while it runs it, as CPython's
+adaptive interpreter specializes bytecode. It watches the types of the
+values each BinOP and Assign sees; once a node has run WARMUP times with
+the same types, it is turned into a specialized node:
+
+    IntAdd         a + b on two ints
+    CompareConst   i < 10, a variable compared with an int or float
+                   constant of the type the variable holds
+    Increment      x = x + 1 or x = x - 1, on an int x and an int constant
+
+While conditions are BinOPs, so `while i < 10` becomes a CompareConst.
+
+A specialized node checks the types it was made for each time it runs.
+When they do not hold, it goes back to being run as the node it is, and
+starts warming up again; a node that keeps failing its checks
+(MAX_QUICKENINGS times) stays unspecialized.
+
+The tree itself is never changed, so one parsed tree can be run by any
+number of interpreters at once, in other threads too. Each interpreter
+keeps its own table from the id of a specialized node to the method that
+runs it, and empties it when the run ends.
+
+    inptr = QuickeningInterpreter(Parser(Lexer(text)))
+    inptr.interpret()
+    print(inptr.counts)
+
+"""
+
+import operator
+
+import interpreter
+import parser
+
+OPERATOR_FUNCTIONS = {
+    parser.PLUS: operator.add,
+    parser.MINUS: operator.sub,
+    parser.MULTIPLY: operator.mul,
+    parser.DIVIDE: operator.truediv,
+    parser.MODULO: operator.mod,
+    parser.EQ: operator.eq,
+    parser.NE: operator.ne,
+    parser.GT: operator.gt,
+    parser.LT: operator.lt,
+    parser.GE: operator.ge,
+    parser.LE: operator.le,
+}
+
+COMPARISONS = (parser.EQ, parser.NE, parser.GT, parser.LT, parser.GE, parser.LE)
+
+# runs with the same types before a node is specialized
+WARMUP = 8
+# specializations of one node, after which it stays as it is
+MAX_QUICKENINGS = 4
+
+QUICKENED = 'quickened'
+DEOPTIMIZED = 'deoptimized'
+
+
+# the specializations, named as in self.counts
+INT_ADD = 'IntAdd'
+COMPARE_CONST = 'CompareConst'
+INCREMENT = 'Increment'
+
+
+def candidate(node):
+    """The specialization node may get, or None."""
+    if type(node) is parser.BinOP:
+        op = node.op.type
+        if (op in COMPARISONS and isinstance(node.left, parser.Var)
+                and isinstance(node.right, parser.Num)
+                and type(node.right.value) in (int, float)):
+            return COMPARE_CONST
+        if op == parser.PLUS:
+            return INT_ADD
+        return None
+    if type(node) is parser.Assign:
+        right = node.right
+        if (isinstance(right, parser.BinOP) and right.op.type in (parser.PLUS, parser.MINUS)
+                and isinstance(right.left, parser.Var) and right.left.value == node.left.value
+                and isinstance(right.right, parser.Num) and type(right.right.value) is int):
+            return INCREMENT
+    return None
+
+
+class QuickeningInterpreter(interpreter.Interpreter):
+    """Interpreter that specializes the nodes it runs often.
+
+    self.counts holds how many nodes were specialized ('quickened'), and
+    how often a specialized node failed its checks ('deoptimized'), in
+    total and by kind of node, e.g. counts['quickened IntAdd']."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        # id(node) -> [specialization it may get, runs with the same types,
+        # the types, times it was specialized]
+        self.warmup = {}
+        # id(node) -> (method that runs it, its specialization) for every
+        # specialized node
+        self.specialized = {}
+        self.handlers = {
+            INT_ADD: self.int_add,
+            COMPARE_CONST: self.compare_const,
+            INCREMENT: self.increment,
+        }
+        self.counts = {}
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        try:
+            return self.visit(tree)
+        finally:
+            self.specialized.clear()
+            self.warmup.clear()
+
+    def count(self, what, kind):
+        counts = self.counts
+        key = '{} {}'.format(what, kind)
+        counts[what] = counts.get(what, 0) + 1
+        counts[key] = counts.get(key, 0) + 1
+
+    def observe(self, node, types):
+        """Notes that node ran with values of `types`, and specializes it
+        after WARMUP runs with the same ones."""
+        state = self.warmup.get(id(node))
+        if state is None:
+            state = self.warmup[id(node)] = [candidate(node), 0, None, 0]
+        kind = state[0]
+        if kind is None or state[3] >= MAX_QUICKENINGS:
+            return
+        if types != state[2]:
+            state[1] = 0
+            state[2] = types
+        state[1] += 1
+        if state[1] < WARMUP or not self.fits(kind, node, types):
+            return
+        state[1] = 0
+        state[3] += 1
+        self.specialized[id(node)] = (self.handlers[kind], kind)
+        self.count(QUICKENED, kind)
+
+    def fits(self, kind, node, types):
+        if kind == INT_ADD:
+            return types == (int, int)
+        if kind == COMPARE_CONST:
+            return types[0] is type(node.right.value)
+        # INCREMENT
+        return types == (int,)
+
+    def deoptimize(self, node):
+        _, kind = self.specialized.pop(id(node))
+        self.count(DEOPTIMIZED, kind)
+
+    def visit_BinOP(self, node):
+        specialized = self.specialized.get(id(node))
+        if specialized is not None:
+            return specialized[0](node)
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        self.observe(node, (type(left), type(right)))
+        return OPERATOR_FUNCTIONS[node.op.type](left, right)
+
+    def visit_Assign(self, node):
+        specialized = self.specialized.get(id(node))
+        if specialized is not None:
+            return specialized[0](node)
+        self.assign(node)
+
+    def assign(self, node):
+        value = self.visit(node.right)
+        self.variables[node.left.value] = value
+        self.observe(node, (type(value),))
+
+    def int_add(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if type(left) is int and type(right) is int:
+            return left + right
+        self.deoptimize(node)
+        return left + right
+
+    def compare_const(self, node):
+        var_name = node.left.value
+        val = self.variables.get(var_name)
+        if val is None:
+            raise NameError(repr(var_name))
+        constant = node.right.value
+        if type(val) is not type(constant):
+            self.deoptimize(node)
+        return OPERATOR_FUNCTIONS[node.op.type](val, constant)
+
+    def increment(self, node):
+        var_name = node.left.value
+        val = self.variables.get(var_name)
+        if type(val) is not int:
+            # also when unset: the BinOP raises the NameError
+            self.deoptimize(node)
+            return self.assign(node)
+        right = node.right
+        if right.op.type == parser.PLUS:
+            self.variables[var_name] = val + right.right.value
+        else:
+            self.variables[var_name] = val - right.right.value
@@ -0,0 +1,118 @@
+"""
+Resolver
+
+Gives every variable of a program a number, its slot, before the program
+runs. The resolved tree reads and writes variables by slot in a list, the
+frame, instead of by name in a dict. Each run gets a new frame, so unlike
+Interpreter.variables, which all Interpreters share, nothing is carried
+over from one run or one interpreter to the next.
+
+    tree, names = resolve(Parser(Lexer(text)).parse())
+    variables = ResolvedInterpreter(None).run(tree, names)
+
+"""
+
+import interpreter
+import parser
+
+
+class LocalVar(parser.Var):
+    """A Var read from frame[slot]."""
+    __slots__ = ('slot',)
+
+    def __init__(self, token, slot):
+        super().__init__(token)
+        self.slot = slot
+
+
+class LocalAssign(parser.Assign):
+    """An Assign to frame[slot]."""
+    __slots__ = ('slot',)
+
+    def __init__(self, left, op, right, slot):
+        super().__init__(left, op, right)
+        self.slot = slot
+
+
+class Resolver(object):
+    """Copies a tree with LocalVar and LocalAssign in place of Var and
+    Assign. The input tree is not changed."""
+
+    def __init__(self):
+        # name of the variable in every slot
+        self.names = []
+        self._slots = {}
+
+    def slot(self, var_name):
+        index = self._slots.get(var_name)
+        if index is None:
+            index = self._slots[var_name] = len(self.names)
+            self.names.append(var_name)
+        return index
+
+    def resolve(self, node):
+        if isinstance(node, list):
+            return [self.resolve(child) for child in node]
+        if isinstance(node, parser.Compound):
+            compound = parser.Compound()
+            compound.children = self.resolve(node.children)
+            return compound
+        if isinstance(node, parser.Var):
+            return LocalVar(node.token, self.slot(node.value))
+        if isinstance(node, parser.Assign):
+            return LocalAssign(node.left, node.op, self.resolve(node.right), self.slot(node.left.value))
+        if isinstance(node, parser.BinOP):
+            return parser.BinOP(self.resolve(node.left), node.op, self.resolve(node.right))
+        if isinstance(node, parser.If):
+            # an else if chain is walked in a loop, not one call per arm
+            arms = []
+            while isinstance(node, parser.If):
+                arms.append((self.resolve(node.condition), self.resolve(node.body), node.token))
+                node = node.control_body
+            result = self.resolve(node)
+            for condition, body, token in reversed(arms):
+                result = parser.If(condition, body, result, token)
+            return result
+        if isinstance(node, parser.While):
+            return parser.While(self.resolve(node.condition), self.resolve(node.body), node.token)
+        return node
+
+
+def resolve(tree):
+    """(the resolved tree, the name of every slot)"""
+    resolver = Resolver()
+    return resolver.resolve(tree), resolver.names
+
+
+class ResolvedInterpreter(interpreter.Interpreter):
+    """Interpreter with a frame of its own for every run. self.variables
+    is this instance's, and holds the variables of the last run."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.variables = {}
+        self.frame = []
+
+    def interpret(self):
+        tree, names = resolve(self.parser.parse())
+        return self.run(tree, names)
+
+    def run(self, tree, names):
+        """Runs a resolved tree; returns the variables it set, by name."""
+        self.frame = [None] * len(names)
+        try:
+            self.visit(tree)
+        finally:
+            # what was set so far, also when the program raised
+            self.variables = {name: value for name, value in zip(names, self.frame) if value is not None}
+        return self.variables
+
+    def visit_LocalVar(self, node):
+        val = self.frame[node.slot]
+        if val is None:
+            raise NameError(repr(node.value))
+        else:
+            return val
+
+    def visit_LocalAssign(self, node):
+        self.frame[node.slot] = self.visit(node.right)
@@ -0,0 +1,137 @@
+"""
+Ropes
+
+In the Interpreter, `s = s + "piece"` copies all of s to make the new
+string, so building a string in a loop is quadratic. RopeInterpreter keeps
+such strings as a Rope: a list of parts that is joined only when the
+string is needed as a whole, which makes each append amortized O(1).
+
+A Rope is flattened, joined into a str, when it is compared, used with any
+operator but +, or left in the variables when the program ends, so the
+results are exactly those of the Interpreter.
+
+    inptr = RopeInterpreter(Parser(Lexer(text)))
+    inptr.interpret()
+    print(inptr.variables)
+
+"""
+
+import operator
+
+import interpreter
+
+PLUS = 'PLUS'
+MINUS = 'MINUS'
+MULTIPLY = 'MULTIPLY'
+DIVIDE = 'DIVIDE'
+MODULO = 'MODULO'
+
+EQ = '=='
+NE = '!='
+GT = '>'
+LT = '<'
+GE = '>='
+LE = '<='
+
+OPERATOR_FUNCTIONS = {
+    MINUS: operator.sub,
+    MULTIPLY: operator.mul,
+    DIVIDE: operator.truediv,
+    MODULO: operator.mod,
+    EQ: operator.eq,
+    NE: operator.ne,
+    GT: operator.gt,
+    LT: operator.lt,
+    GE: operator.ge,
+    LE: operator.le,
+}
+
+# strings shorter than this are cheaper to copy than to keep in parts
+MIN_ROPE_LENGTH = 64
+
+
+class Rope(object):
+    """A string made of parts[:count]. Ropes are never changed: append
+    returns a new Rope, which shares the parts list with this one when
+    nothing was appended to it yet, and copies the parts otherwise."""
+    __slots__ = ('parts', 'count', 'length', '_text')
+
+    def __init__(self, parts, count, length):
+        self.parts = parts
+        self.count = count
+        self.length = length
+        # the joined string, once it was needed
+        self._text = None
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return 'Rope({!r})'.format(self.text())
+
+    def append(self, text):
+        if self._text is not None:
+            parts = [self._text]
+        elif len(self.parts) == self.count:
+            parts = self.parts
+        else:
+            # the list goes on with another Rope's parts
+            parts = self.parts[:self.count]
+        parts.append(text)
+        return Rope(parts, len(parts), self.length + len(text))
+
+    def text(self):
+        """The string, joined on the first call."""
+        if self._text is None:
+            if len(self.parts) == self.count:
+                self._text = ''.join(self.parts)
+            else:
+                self._text = ''.join(self.parts[:self.count])
+        return self._text
+
+
+def flatten(value):
+    """value, with a Rope turned into its str."""
+    if type(value) is Rope:
+        return value.text()
+    return value
+
+
+def concat(left, right):
+    """left + right, as a Rope when it is a long string."""
+    if type(right) is Rope:
+        right = right.text()
+    if type(left) is Rope:
+        if type(right) is str:
+            return left.append(right)
+        # raises the TypeError str + right would
+        return left.text() + right
+    if type(left) is str and type(right) is str and len(left) + len(right) >= MIN_ROPE_LENGTH:
+        return Rope([left, right], 2, len(left) + len(right))
+    return left + right
+
+
+class RopeInterpreter(interpreter.Interpreter):
+    """Interpreter that builds strings with + as Ropes. Every Rope left in
+    self.variables is flattened when the program ends, also when it
+    raised."""
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        try:
+            return self.visit(tree)
+        finally:
+            variables = self.variables
+            for var_name, value in variables.items():
+                if type(value) is Rope:
+                    variables[var_name] = value.text()
+
+    def visit_BinOP(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        op = node.op.type
+        if op == PLUS:
+            return concat(left, right)
+        return OPERATOR_FUNCTIONS[op](flatten(left), flatten(right))
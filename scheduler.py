@@ -0,0 +1,114 @@
+"""
+Running many programs at once
+
+The Interpreter runs a program to the end before it returns, so in a
+process serving many programs one long while loop holds up all the
+others. run_program(source) is a coroutine that runs a program a slice
+at a time: after every slice_steps steps of a StackInterpreter (one step
+is about one node) it gives the event loop a turn.
+
+asyncio runs the tasks that are ready in the order they became ready, so
+programs run this way take turns round-robin, each a slice at a time. A
+Scheduler keeps them by name, cancels one, and collects what each left.
+Cancelling the task of a program, like cancelling any task, stops it
+before its next slice.
+
+Each program has variables of its own rather than the Interpreter's
+shared ones. Parsing is not sliced; a program is parsed in one go when
+its turn first comes.
+
+    async def main():
+        sched = Scheduler(slice_steps=1000)
+        sched.submit('fn main() { let mut x = 1; }', 'one')
+        print(await sched.wait())
+
+    asyncio.run(main())
+
+"""
+
+import asyncio
+import time
+
+import deep
+import lexer
+
+# steps a program runs before it gives way
+SLICE_STEPS = 1000
+
+
+class SlicedInterpreter(deep.StackInterpreter):
+    """StackInterpreter with variables of its own, for running with other
+    programs. self.slices counts the slices it has run."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.variables = {}
+        self.slices = 0
+
+    async def run_sliced(self, tree, slice_steps=SLICE_STEPS):
+        work, values = self.start(tree)
+        while True:
+            self.slices += 1
+            if not self.step(work, values, slice_steps):
+                return self.variables
+            await asyncio.sleep(0)
+
+
+async def run_program(source, slice_steps=SLICE_STEPS):
+    """Runs source, giving the event loop a turn every slice_steps steps;
+    returns its variables. Errors are raised as the Interpreter raises
+    them."""
+    inptr = SlicedInterpreter(deep.StackParser(lexer.Lexer(source)))
+    return await inptr.run_sliced(inptr.parser.parse(), slice_steps)
+
+
+class Program(object):
+    """A program submitted to a Scheduler."""
+
+    def __init__(self, name, task):
+        self.name = name
+        self.task = task
+        self.submitted = time.perf_counter()
+        # set when it ends, however it ends
+        self.finished = None
+
+    def latency(self):
+        """Seconds from submitting to the end, or None if still running."""
+        if self.finished is None:
+            return None
+        return self.finished - self.submitted
+
+
+class Scheduler(object):
+    """Runs programs side by side in the running event loop, each a slice
+    of slice_steps steps at a time."""
+
+    def __init__(self, slice_steps=SLICE_STEPS):
+        self.slice_steps = slice_steps
+        # name -> Program
+        self.programs = {}
+
+    def submit(self, source, name=None):
+        """Starts running source; returns its Program. Must be called with
+        the event loop running."""
+        if name is None:
+            name = len(self.programs)
+        if name in self.programs:
+            raise ValueError('a program named {!r} was already submitted'.format(name))
+        program = Program(name, asyncio.ensure_future(run_program(source, self.slice_steps)))
+        program.task.add_done_callback(lambda _: setattr(program, 'finished', time.perf_counter()))
+        self.programs[name] = program
+        return program
+
+    def cancel(self, name):
+        """Stops the program before its next slice; returns False if it had
+        already ended."""
+        return self.programs[name].task.cancel()
+
+    async def wait(self):
+        """Waits for every program submitted; returns name -> its
+        variables, or the exception it ended with (CancelledError if it was
+        cancelled)."""
+        programs = list(self.programs.values())
+        results = await asyncio.gather(*(program.task for program in programs), return_exceptions=True)
+        return {program.name: result for program, result in zip(programs, results)}
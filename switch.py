@@ -0,0 +1,178 @@
+"""
+Jump tables
+
+The parser makes an else if ladder a chain of Ifs, each the control_body
+of the one before, which the Interpreter tries one condition at a time.
+flatten(tree) turns every chain of two or more arms into a Ladder, one
+node with a flat list of (condition, body) arms. Where at least
+MIN_CASES arms in a row compare the same variable with constants,
+
+    if x == 1 { .. }
+    else if x == 2 { .. }
+    else if x == "two" { .. }
+    ...
+
+those arms become a Switch: a dict from each constant to its body, so the
+variable is read once and the arm found in one lookup, however many arms
+there are. The arms after them, and the else, become what the Switch runs
+when no constant matches.
+
+A dict finds a key by ==, as the conditions compare, so 1, 1.0 and true
+find the same arm. When two arms compare with equal constants only the
+first can ever run, and only it is kept. The input tree is not changed.
+
+    SwitchInterpreter(Parser(Lexer(text))).interpret()
+
+"""
+
+import interpreter
+import parser
+
+# arms in a row, comparing one variable with constants, for a Switch
+MIN_CASES = 4
+
+
+class Ladder(parser.AST):
+    """An else if chain: the body of the first arm whose condition holds
+    runs, otherwise `otherwise`."""
+    __slots__ = ('arms', 'otherwise', 'token')
+
+    def __init__(self, arms, otherwise, token=None):
+        # ((condition, body), ...)
+        self.arms = arms
+        self.otherwise = otherwise
+        self.token = token
+
+
+class Switch(parser.AST):
+    """Arms `var_name == constant`: cases maps each constant to its body;
+    otherwise runs when none matches."""
+    __slots__ = ('var', 'cases', 'otherwise', 'token')
+
+    def __init__(self, var, cases, otherwise, token=None):
+        self.var = var
+        self.cases = cases
+        self.otherwise = otherwise
+        self.token = token
+
+
+def case_of(condition):
+    """(Var, constant) of `var == constant` or `constant == var`, else
+    None."""
+    if not isinstance(condition, parser.BinOP) or condition.op.type != parser.EQ:
+        return None
+    left, right = condition.left, condition.right
+    if isinstance(left, parser.Num) and isinstance(right, parser.Var):
+        left, right = right, left
+    if isinstance(left, parser.Var) and isinstance(right, parser.Num):
+        return left, right.value
+    return None
+
+
+class Flattener(object):
+    def __init__(self):
+        self.ladders = 0
+        self.switches = 0
+        # arms turned into dict entries
+        self.cases = 0
+
+    def flatten(self, node):
+        if isinstance(node, list):
+            return [self.flatten(child) for child in node]
+        if isinstance(node, parser.Compound):
+            compound = parser.Compound()
+            compound.children = self.flatten(node.children)
+            return compound
+        if isinstance(node, parser.If):
+            return self.chain(node)
+        if isinstance(node, parser.While):
+            return parser.While(node.condition, self.flatten(node.body), node.token)
+        return node
+
+    def chain(self, node):
+        arms = []
+        tokens = []
+        while isinstance(node, parser.If):
+            arms.append((node.condition, self.flatten(node.body)))
+            tokens.append(node.token)
+            node = node.control_body
+        otherwise = self.flatten(node)
+        if len(arms) == 1:
+            return parser.If(arms[0][0], arms[0][1], otherwise, tokens[0])
+
+        # split the arms into runs for a Switch and the arms between them,
+        # then build from the last part back to the first
+        parts = []
+        start = 0
+        while start < len(arms):
+            end = start
+            case = case_of(arms[start][0])
+            while end < len(arms):
+                other = case_of(arms[end][0])
+                if case is None or other is None or other[0].value != case[0].value:
+                    break
+                end += 1
+            if end - start >= MIN_CASES:
+                parts.append((True, start, end))
+                start = end
+            elif parts and not parts[-1][0]:
+                parts[-1] = (False, parts[-1][1], start + 1)
+                start += 1
+            else:
+                parts.append((False, start, start + 1))
+                start += 1
+
+        for is_switch, start, end in reversed(parts):
+            if is_switch:
+                otherwise = self.switch(arms[start:end], otherwise, tokens[start])
+            else:
+                self.ladders += 1
+                otherwise = Ladder(tuple(arms[start:end]), otherwise, tokens[start])
+        return otherwise
+
+    def switch(self, arms, otherwise, token):
+        var = case_of(arms[0][0])[0]
+        cases = {}
+        for condition, body in arms:
+            constant = case_of(condition)[1]
+            # an equal constant before it always wins
+            if constant not in cases:
+                cases[constant] = body
+        self.switches += 1
+        self.cases += len(arms)
+        return Switch(var, cases, otherwise, token)
+
+
+def flatten(tree):
+    return Flattener().flatten(tree)
+
+
+class SwitchInterpreter(interpreter.Interpreter):
+    """Interpreter that runs else if ladders as Ladders and Switches. The
+    Flattener of the last tree is in self.flattener."""
+
+    def __init__(self, parser):
+        super().__init__(parser)
+        self.flattener = None
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        self.flattener = Flattener()
+        return self.visit(self.flattener.flatten(tree))
+
+    def visit_Ladder(self, node):
+        for condition, body in node.arms:
+            if self.visit(condition):
+                self.visit(body)
+                return
+        self.visit(node.otherwise)
+
+    def visit_Switch(self, node):
+        val = self.visit(node.var)
+        body = node.cases.get(val)
+        if body is None:
+            self.visit(node.otherwise)
+        else:
+            self.visit(body)
@@ -0,0 +1,127 @@
+"""
+Tests of compiled program artifacts: round trips through bytes and
+files, the other byte order, and files that are not artifacts
+
+    python -m pytest test_artifact.py
+
+"""
+
+import array
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import arena
+import artifact
+import interpreter
+import lexer
+import parser
+import programs
+
+CONSTANTS = ('fn main() {\n let mut a = 99999999999999999999 * 3;\n let mut b = 2.5;\n'
+             ' let mut s = "naïve ☃";\n let mut c = 1 == 1;\n}\n')
+
+
+def node_arena(text):
+    return arena.NodeArena(parser.Parser(lexer.Lexer(text)).parse())
+
+
+def arrays(nodes):
+    return [list(getattr(nodes, name)) for name in ('kinds', 'first', 'second', 'third', 'items')]
+
+
+def swapped(data):
+    """data, an artifact, as a machine of the other byte order writes it."""
+    fields = list(artifact.HEADER.unpack_from(data, 0))
+    fields[2] = b'>' if fields[2] == b'<' else b'<'
+    count, constants_offset = fields[3], fields[7]
+    start = artifact.HEADER.size + count + (-count % 4)
+    ints = array.array('i')
+    ints.frombytes(data[start:constants_offset])
+    ints.byteswap()
+    return (artifact.HEADER.pack(*fields) + data[artifact.HEADER.size:start] + ints.tobytes()
+            + data[constants_offset:])
+
+
+class ArtifactTest(unittest.TestCase):
+    def assertSameArena(self, mapped, nodes):
+        self.assertEqual(arrays(mapped), arrays(nodes))
+        self.assertEqual(mapped.constants, nodes.constants)
+        self.assertEqual([type(value) for value in mapped.constants],
+                         [type(value) for value in nodes.constants])
+        self.assertEqual((mapped.root, len(mapped)), (nodes.root, len(nodes)))
+
+    def test_round_trip(self):
+        for name, text in programs.corpus() + [('constants', CONSTANTS)]:
+            with self.subTest(name):
+                nodes = node_arena(text)
+                with artifact.MappedArena(artifact.dumps(nodes)) as mapped:
+                    self.assertSameArena(mapped, nodes)
+
+    def test_other_byte_order(self):
+        nodes = node_arena(CONSTANTS)
+        with artifact.MappedArena(swapped(artifact.dumps(nodes))) as mapped:
+            self.assertSameArena(mapped, nodes)
+            self.assertIsInstance(mapped.first, array.array)
+
+    def test_run_from_a_file(self):
+        text = programs.generate_loop(20)
+        fd, path = tempfile.mkstemp(suffix='.rsa')
+        os.close(fd)
+        try:
+            with open(path, 'wb') as f:
+                f.write(artifact.compile_source(text))
+            expected = programs.outcome(interpreter.Interpreter, text)[0]
+            self.assertEqual(artifact.run(path), expected)
+            # and again, from the same file
+            self.assertEqual(artifact.run(path), expected)
+        finally:
+            os.remove(path)
+
+    def test_not_an_artifact(self):
+        data = artifact.dumps(node_arena(CONSTANTS))
+        bad_version = bytearray(data)
+        bad_version[4] += 1
+        constants_offset = artifact.HEADER.unpack_from(data, 0)[7]
+        bad_tag = bytearray(data)
+        bad_tag[constants_offset] = ord('?')
+        for name, buffer, message in (
+                ('empty', b'', 'Artifact too short'),
+                ('source text', CONSTANTS.encode('utf-8'), 'Not a compiled program'),
+                ('version', bytes(bad_version), 'Artifact version 2, expected 1'),
+                ('cut short', data[:-3], 'Corrupt artifact'),
+                ('cut in the arrays', data[:artifact.HEADER.size + 8], 'Corrupt artifact'),
+                ('constant tag', bytes(bad_tag), "Bad constant tag b'?' at {}".format(constants_offset))):
+            with self.subTest(name):
+                with self.assertRaises(artifact.ArtifactError) as raised:
+                    artifact.MappedArena(buffer)
+                self.assertEqual(str(raised.exception), message)
+
+    def test_empty_file(self):
+        fd, path = tempfile.mkstemp(suffix='.rsa')
+        os.close(fd)
+        try:
+            with self.assertRaises(artifact.ArtifactError):
+                artifact.load(path)
+        finally:
+            os.remove(path)
+
+    def test_run_without_the_parser(self):
+        fd, path = tempfile.mkstemp(suffix='.rsa')
+        os.close(fd)
+        try:
+            with open(path, 'wb') as f:
+                f.write(artifact.compile_source(programs.generate_loop(5)))
+            script = ('import sys, artifact; artifact.run(sys.argv[1]); '
+                      'print(sorted({"lexer", "parser"} & set(sys.modules)))')
+            ran = subprocess.run([sys.executable, '-c', script, path], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(artifact.__file__)))
+            self.assertEqual((ran.returncode, ran.stdout), (0, '[]\n'))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests of every backend against the Interpreter on the shared programs:
+the test files, programs that raise, random programs and an else if
+ladder too long to walk by recursion
+
+    python -m pytest test_backends.py
+
+"""
+
+import random
+import unittest
+
+import arena
+import closures
+import dataflow
+import deep
+import hoist
+import inference
+import interpreter
+import lexer
+import loops
+import optimizer
+import parser
+import programs
+import quicken
+import resolver
+import rope
+import switch
+import transpile
+import vm
+
+BACKENDS = (
+    optimizer.OptimizedInterpreter, arena.ArenaInterpreter, closures.ClosureInterpreter,
+    dataflow.DataflowInterpreter, deep.StackInterpreter, hoist.HoistingInterpreter,
+    inference.TypedInterpreter, loops.LoopInterpreter, quicken.QuickeningInterpreter,
+    resolver.ResolvedInterpreter, rope.RopeInterpreter, switch.SwitchInterpreter,
+    transpile.TranspileInterpreter, vm.VMInterpreter,
+)
+
+
+class BackendTest(unittest.TestCase):
+    def assertSameAsInterpreter(self, text):
+        expected = programs.outcome(interpreter.Interpreter, text)
+        for backend in BACKENDS:
+            with self.subTest(backend.__name__):
+                self.assertEqual(programs.outcome(backend, text), expected)
+        return expected
+
+    def test_corpus(self):
+        for name, text in programs.corpus():
+            with self.subTest(name):
+                self.assertSameAsInterpreter(text)
+
+    def test_errors(self):
+        for name, (text, error) in programs.ERRORS.items():
+            with self.subTest(name):
+                self.assertEqual(self.assertSameAsInterpreter(text)[1][0], error)
+
+    def test_random_programs(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            self.assertSameAsInterpreter(programs.generate_random_program(rng))
+
+    def test_else_if_ladder(self):
+        variables, error = self.assertSameAsInterpreter(programs.generate_ladder(programs.LADDER_ARMS, 20))
+        self.assertIsNone(error)
+        self.assertEqual(variables['i'], 20)
+
+
+class LadderPassTest(unittest.TestCase):
+    def test_passes(self):
+        # each of these used to recurse once per arm
+        tree = parser.Parser(lexer.Lexer(programs.generate_ladder(programs.LADDER_ARMS, 1))).parse()
+        for name, run in (('resolve', resolver.resolve), ('hoist', hoist.hoist),
+                          ('dataflow', dataflow.optimize),
+                          ('infer', lambda tree: inference.TypeInference().infer(tree)),
+                          ('arena', arena.NodeArena), ('transpile', transpile.compile_tree)):
+            with self.subTest(name):
+                run(tree)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests of batch runs: the files targets name, the result of each file,
+and the JSON lines written by python batch.py
+
+    python -m pytest test_batch.py
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import batch
+import interpreter
+import programs
+
+HERE = os.path.dirname(os.path.abspath(batch.__file__))
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.files = {
+            'loop.rs': programs.generate_loop(10),
+            'error.txt': programs.ERRORS['in a loop'][0],
+            'syntax.rs': 'fn main() {\n x = (1;\n}\n',
+            'notes.md': 'not a program',
+        }
+        for name, text in self.files.items():
+            with open(self.path(name), 'w') as f:
+                f.write(text)
+        os.mkdir(self.path('sub.rs'))
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_expand(self):
+        directory = self.directory.name
+        self.assertEqual(batch.expand([directory]),
+                         [self.path('error.txt'), self.path('loop.rs'), self.path('syntax.rs')])
+        # each file once, in the order the targets name them; a name that
+        # matches nothing is kept, to be reported as missing
+        self.assertEqual(batch.expand([self.path('s*.rs'), directory, self.path('missing.rs')]),
+                         [self.path('syntax.rs'), self.path('error.txt'), self.path('loop.rs'),
+                          self.path('missing.rs')])
+
+    def test_run_file(self):
+        result = batch.run_file(self.path('loop.rs'))
+        self.assertEqual(result['variables'], programs.outcome(interpreter.Interpreter,
+                                                               self.files['loop.rs'])[0])
+        self.assertIsNone(result['error'])
+        self.assertTrue(all(result[step] >= 0 for step in ('lex', 'parse', 'run')))
+
+    def test_steps_not_reached(self):
+        result = batch.run_file(self.path('error.txt'))
+        self.assertEqual((result['error'][0], result['variables']),
+                         ('ZeroDivisionError', {'i': 0, 't': 2 + 3 + 6}))
+        self.assertIsNotNone(result['run'])
+        result = batch.run_file(self.path('syntax.rs'))
+        self.assertEqual((result['error'][0], result['variables'], result['run']), ('ParserError', {}, None))
+        result = batch.run_file(self.path('missing.rs'))
+        self.assertEqual((result['error'][0], result['lex']), ('FileNotFoundError', None))
+
+    def test_run_batch(self):
+        for chunk in (1, 2, 5):
+            with self.subTest(chunk=chunk):
+                results = list(batch.run_batch([self.directory.name, self.path('missing.rs')],
+                                               workers=2, chunk=chunk))
+                self.assertEqual(sorted(result['path'] for result in results),
+                                 sorted(batch.expand([self.directory.name, self.path('missing.rs')])))
+                for result in results:
+                    expected = batch.run_file(result['path'])
+                    self.assertEqual((result['variables'], result['error']),
+                                     (expected['variables'], expected['error']))
+        # an empty directory
+        self.assertEqual(list(batch.run_batch([self.path('sub.rs')])), [])
+
+    def test_bad_workers_and_chunk(self):
+        for workers, chunk in ((0, 1), (-1, 1), (1, 0)):
+            with self.assertRaises(ValueError):
+                next(batch.run_batch([self.directory.name], workers, chunk))
+
+    def run_main(self, *arguments):
+        return subprocess.run([sys.executable, 'batch.py'] + list(arguments),
+                              capture_output=True, text=True, cwd=HERE)
+
+    def test_json_lines(self):
+        ran = self.run_main('--workers', '2', '--chunk', '2', self.directory.name)
+        self.assertEqual(ran.returncode, 0, ran.stderr)
+        lines = [json.loads(line) for line in ran.stdout.splitlines()]
+        self.assertEqual(sorted(line['path'] for line in lines), batch.expand([self.directory.name]))
+        for line in lines:
+            self.assertEqual(sorted(line), ['error', 'lex', 'parse', 'path', 'run', 'variables'])
+        errors = {os.path.basename(line['path']): line['error'] for line in lines}
+        self.assertEqual(errors['loop.rs'], None)
+        self.assertEqual(errors['error.txt'], ['ZeroDivisionError', 'division by zero'])
+
+    def test_bad_arguments(self):
+        for option, value in (('--workers', '0'), ('--workers', '-2'), ('--chunk', '0')):
+            with self.subTest(option=option, value=value):
+                ran = self.run_main(option, value, self.directory.name)
+                self.assertEqual(ran.returncode, 2)
+                self.assertEqual(ran.stdout, '')
+                self.assertIn('{} must be at least 1'.format(option), ran.stderr)
+                self.assertNotIn('Traceback', ran.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Tests of the parse cache: hits, misses, what is dropped and when
+
+    python -m pytest test_cache.py
+
+"""
+
+import threading
+import unittest
+
+import cache
+import interpreter
+import lexer
+import parser
+import programs
+
+
+class ParseCacheTest(unittest.TestCase):
+    def test_hit(self):
+        parse_cache = cache.ParseCache()
+        text = programs.generate_loop(10)
+        tree = parse_cache.parse(text)
+        self.assertIs(parse_cache.parse(text), tree)
+        self.assertIn(text, parse_cache)
+        self.assertEqual(programs.tree_shape(tree),
+                         programs.tree_shape(parser.Parser(lexer.Lexer(text)).parse()))
+        self.assertEqual(parse_cache.stats(), {'entries': 1, 'bytes': cache.tree_size(tree),
+                                               'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_least_recently_used_is_dropped(self):
+        parse_cache = cache.ParseCache(max_entries=2)
+        first, second, third = (programs.generate_loop(n) for n in (1, 2, 3))
+        kept = parse_cache.parse(first)
+        parse_cache.parse(second)
+        parse_cache.parse(first)
+        parse_cache.parse(third)
+        self.assertEqual(len(parse_cache), 2)
+        self.assertNotIn(second, parse_cache)
+        self.assertIs(parse_cache.parse(first), kept)
+        self.assertEqual(parse_cache.evictions, 1)
+
+    def test_dropped_for_bytes(self):
+        small, large = programs.generate_loop(1), programs.generate_program(20)
+        small_size = cache.tree_size(parser.Parser(lexer.Lexer(small)).parse())
+        large_size = cache.tree_size(parser.Parser(lexer.Lexer(large)).parse())
+        self.assertGreater(large_size, small_size)
+        parse_cache = cache.ParseCache(max_bytes=large_size)
+        parse_cache.parse(small)
+        parse_cache.parse(large)
+        # both do not fit, so the older one goes
+        self.assertEqual((small in parse_cache, large in parse_cache), (False, True))
+        self.assertEqual(parse_cache.bytes, large_size)
+        # a tree larger than the whole cache is not kept at all
+        parse_cache = cache.ParseCache(max_bytes=small_size)
+        parse_cache.parse(small)
+        parse_cache.parse(large)
+        self.assertEqual((small in parse_cache, large in parse_cache), (True, False))
+        self.assertEqual(parse_cache.evictions, 0)
+
+    def test_errors_are_not_cached(self):
+        parse_cache = cache.ParseCache()
+        text = 'fn main() {\n x = (1;\n}\n'
+        for _ in range(2):
+            with self.assertRaises(parser.ParserError):
+                parse_cache.parse(text)
+        self.assertEqual((len(parse_cache), parse_cache.misses), (0, 2))
+
+    def test_key(self):
+        self.assertEqual(cache.source_key('fn main() {}'), cache.source_key('fn main() {}'))
+        self.assertNotEqual(cache.source_key('fn main() {}'), cache.source_key('fn main() { }'))
+        # a lone surrogate cannot be encoded strictly, but is still a key
+        self.assertEqual(len(cache.source_key('\ud800')), 16)
+
+    def test_clear(self):
+        parse_cache = cache.ParseCache()
+        parse_cache.parse(programs.generate_loop(1))
+        parse_cache.clear()
+        self.assertEqual((len(parse_cache), parse_cache.bytes), (0, 0))
+
+    def test_threads_share_the_cache(self):
+        parse_cache = cache.ParseCache()
+        texts = [programs.generate_loop(n) for n in range(8)]
+
+        def parse_all():
+            for text in texts:
+                parse_cache.parse(text)
+        threads = [threading.Thread(target=parse_all) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # a text two threads missed at once is kept once
+        self.assertEqual(len(parse_cache), len(texts))
+        self.assertEqual(parse_cache.hits + parse_cache.misses, 4 * len(texts))
+        self.assertEqual(parse_cache.bytes, sum(size for tree, size in parse_cache.entries.values()))
+
+    def test_cached_parser(self):
+        parse_cache = cache.ParseCache()
+        text = programs.generate_loop(10)
+        expected = programs.outcome(interpreter.Interpreter, text)
+        for _ in range(2):
+            programs.clear_variables(interpreter.Interpreter)
+            inptr = interpreter.Interpreter(cache.CachedParser(text, parse_cache))
+            inptr.interpret()
+            self.assertEqual((dict(inptr.variables), None), expected)
+        self.assertEqual((parse_cache.hits, parse_cache.misses), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests of the closure compiler: the closures it builds, and when they
+read and write the variables
+
+    python -m pytest test_closures.py
+
+"""
+
+import unittest
+
+import closures
+import interpreter
+import lexer
+import parser
+import programs
+
+
+def compile_text(text, variables):
+    return closures.Compiler(variables).visit(parser.Parser(lexer.Lexer(text)).parse())
+
+
+class CompilerTest(unittest.TestCase):
+    def test_compiled_once_run_often(self):
+        variables = {}
+        run = compile_text('fn main() {\n let mut a = 0;\n while a < 5 {\n  a = a + 1;\n }\n'
+                           ' b = a * 2;\n}\n', variables)
+        # nothing runs until the closure is called
+        self.assertEqual(variables, {})
+        run()
+        self.assertEqual(variables, {'a': 5, 'b': 10})
+        variables['a'] = 3
+        run()
+        self.assertEqual(variables, {'a': 5, 'b': 10})
+
+    def test_constant_on_the_right(self):
+        compiler = closures.Compiler({'i': 4})
+        tree = parser.Parser(lexer.Lexer('fn main() {\n x = i + 1;\n y = 1 + i;\n}\n')).parse()
+        constant, other = (compiler.visit(statement.right) for statement in tree.children)
+        self.assertEqual((constant.__name__, constant()), ('binop_constant', 5))
+        self.assertEqual((other.__name__, other()), ('binop', 5))
+
+    def test_blocks(self):
+        compiler = closures.Compiler({})
+        tree = parser.Parser(lexer.Lexer('fn main() {\n x = 1;\n if x > 0 {\n  y = 2;\n }\n}\n')).parse()
+        # a block of one statement is that statement's closure
+        self.assertEqual(compiler.visit(tree.children[-1].body).__name__, 'assign')
+        self.assertEqual(compiler.visit(tree).__name__, 'block')
+
+    def test_else_if_chain(self):
+        # compiled in a loop, and run as one closure going through the arms
+        text = programs.generate_ladder(programs.LADDER_ARMS, 40)
+        variables = {}
+        compile_text(text, variables)()
+        self.assertEqual(variables, programs.outcome(interpreter.Interpreter, text)[0])
+
+    def test_unset_variable(self):
+        run = compile_text('fn main() {\n x = y;\n}\n', {})
+        with self.assertRaises(NameError) as raised:
+            run()
+        self.assertEqual(str(raised.exception), "'y'")
+
+
+class ClosureInterpreterTest(unittest.TestCase):
+    def test_variables_are_the_interpreters(self):
+        programs.clear_variables(closures.ClosureInterpreter)
+        inptr = closures.ClosureInterpreter(parser.Parser(lexer.Lexer(programs.ERRORS['in a loop'][0])))
+        with self.assertRaises(ZeroDivisionError):
+            inptr.interpret()
+        # what was set before the error is left, in the variables all
+        # Interpreters share
+        self.assertIs(inptr.variables, interpreter.Interpreter.variables)
+        self.assertEqual(inptr.variables, {'i': 0, 't': 2 + 3 + 6})
+
+
+if __name__ == '__main__':
+    unittest.main()
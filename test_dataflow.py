@@ -0,0 +1,113 @@
+"""
+Tests of common subexpression and dead store elimination
+
+    python -m pytest test_dataflow.py
+
+"""
+
+import random
+import unittest
+
+import dataflow
+import interpreter
+import lexer
+import parser
+import programs
+
+
+def program(body):
+    return 'fn main() {\n' + body + '\n}\n'
+
+
+def optimize(body):
+    """(the DataflowOptimizer, the statements of the optimized program)"""
+    optimizer = dataflow.DataflowOptimizer()
+    tree = optimizer.optimize(parser.Parser(lexer.Lexer(program(body))).parse())
+    return optimizer, tree.children
+
+
+def contains(node, kind):
+    if isinstance(node, kind):
+        return True
+    if isinstance(node, parser.BinOP):
+        return contains(node.left, kind) or contains(node.right, kind)
+    if isinstance(node, dataflow.Save):
+        return contains(node.expr, kind)
+    return False
+
+
+class DataflowTest(unittest.TestCase):
+    def assertSameAsInterpreter(self, body):
+        text = program(body)
+        expected = programs.outcome(interpreter.Interpreter, text)
+        self.assertEqual(programs.outcome(dataflow.DataflowInterpreter, text), expected)
+        return expected
+
+    def test_reused_through_its_variable(self):
+        optimizer, statements = optimize('let mut x = 3;\n a = x * 2;\n b = x * 2;')
+        self.assertIsInstance(statements[-1].right, parser.Var)
+        self.assertEqual(statements[-1].right.value, 'a')
+        self.assertEqual(optimizer.reused, 1)
+
+    def test_holder_overwritten(self):
+        # a no longer holds x*y + 1, but x*y itself is still known
+        body = 'let mut x = 3;\n let mut y = 4;\n a = x*y + 1;\n a = 5;\n d = x*y + 1;'
+        optimizer, statements = optimize(body)
+        d = statements[-1]
+        self.assertIsInstance(d.right, parser.BinOP)
+        self.assertTrue(contains(d.right, dataflow.Load))
+        self.assertEqual(self.assertSameAsInterpreter(body)[0], {'x': 3, 'y': 4, 'a': 5, 'd': 13})
+
+    def test_variable_assigned_inside_if(self):
+        body = 'let mut x = 3;\n let mut y = 4;\n let mut c = 1;\n a = x*y;\n if c > 0 {\n  {} = 10;\n }\n b = x*y;'
+        optimizer, statements = optimize(body.replace('{}', 'x'))
+        self.assertIsInstance(statements[-1].right, parser.BinOP)
+        self.assertFalse(contains(statements[-1].right, dataflow.Load))
+        self.assertEqual(self.assertSameAsInterpreter(body.replace('{}', 'x'))[0]['b'], 40)
+        # an if that leaves x alone does not end the reuse
+        optimizer, statements = optimize(body.replace('{}', 'z'))
+        self.assertIsInstance(statements[-1].right, parser.Var)
+
+    def test_dead_store_that_can_raise_is_kept(self):
+        for k, expected in (('0', ({'k': 0}, ('ZeroDivisionError', 'division by zero'))),
+                            ('2', ({'k': 2, 'x': 2}, None))):
+            with self.subTest(k=k):
+                body = 'let mut k = {};\n x = 1 / k;\n x = 2;'.format(k)
+                optimizer, statements = optimize(body)
+                # the store is gone, its expression is not
+                self.assertEqual((optimizer.dropped, optimizer.kept), (0, 1))
+                self.assertIsInstance(statements[1], parser.BinOP)
+                self.assertEqual(self.assertSameAsInterpreter(body), expected)
+
+    def test_store_before_a_statement_that_can_raise(self):
+        body = 'let mut k = 0;\n x = 1;\n y = 5 / k;\n x = 2;'
+        optimizer, statements = optimize(body)
+        self.assertEqual((optimizer.dropped, optimizer.kept), (0, 0))
+        self.assertEqual(len(statements), 4)
+        # the error leaves x as the first store set it
+        self.assertEqual(self.assertSameAsInterpreter(body),
+                         ({'k': 0, 'x': 1}, ('ZeroDivisionError', 'division by zero')))
+        # with nothing in between that can raise, the store is dropped
+        optimizer, statements = optimize('let mut k = 0;\n x = 1;\n y = 5;\n x = 2;')
+        self.assertEqual(optimizer.dropped, 1)
+        self.assertEqual(len(statements), 3)
+
+    def test_types_decide_what_can_raise(self):
+        # a string plus an int raises, two ints do not
+        for value, dropped in (('"s"', 0), ('7', 1)):
+            with self.subTest(value):
+                body = 'let mut s = {};\n x = 1;\n y = s + 1;\n x = 2;'.format(value)
+                optimizer, statements = optimize(body)
+                self.assertEqual(optimizer.dropped, dropped)
+                self.assertSameAsInterpreter(body)
+
+    def test_straight_line_programs(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            text = programs.generate_straight_line(rng)
+            self.assertEqual(programs.outcome(dataflow.DataflowInterpreter, text),
+                             programs.outcome(interpreter.Interpreter, text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests of StackParser and StackInterpreter: the Parser's trees and
+errors, and programs nested too deep for the Parser and the Interpreter
+
+    python -m pytest test_deep.py
+
+"""
+
+import random
+import unittest
+
+import deep
+import interpreter
+import lexer
+import parser
+import programs
+
+# far deeper than the recursion limit, and quick enough for a test;
+# python benchmark.py deep runs 100000
+DEPTH = 20000
+
+
+def parse(parser_class, text):
+    """tree_shape of the parsed text, or the error it raises and its
+    message."""
+    try:
+        return programs.tree_shape(parser_class(lexer.Lexer(text)).parse())
+    except (lexer.LexerError, parser.ParserError) as e:
+        return type(e).__name__, str(e)
+
+
+def run(text):
+    """(variables, error) of StackParser and StackInterpreter on text."""
+    inptr = deep.StackInterpreter(None)
+    inptr.variables = {}
+    error = None
+    try:
+        inptr.run(deep.StackParser(lexer.Lexer(text)).parse())
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    return inptr.variables, error
+
+
+class StackParserTest(unittest.TestCase):
+    def assertSameAsParser(self, text):
+        self.assertEqual(parse(deep.StackParser, text), parse(parser.Parser, text))
+
+    def test_corpus(self):
+        for name, text in programs.corpus():
+            with self.subTest(name):
+                self.assertSameAsParser(text)
+
+    def test_precedence(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            self.assertSameAsParser('fn main() {{\n x = {};\n}}\n'.format(
+                programs.generate_expression(rng, 6)))
+
+    def test_blocks(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            self.assertSameAsParser(programs.generate_random_program(rng))
+        # tree_shape recurses, so it is given a ladder it can walk
+        self.assertSameAsParser(programs.generate_ladder(200, 1))
+
+    def test_errors(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            text = programs.generate_random_program(rng)
+            offset, removed, inserted = programs.random_edit(rng, text)
+            self.assertSameAsParser(text[:offset] + inserted + text[offset + removed:])
+
+    def test_parser_cannot_read_deep_programs(self):
+        name, text, expected = programs.generate_deep_programs(DEPTH)[3]
+        with self.assertRaises(RecursionError):
+            parser.Parser(lexer.Lexer(text)).parse()
+
+
+class DeepProgramTest(unittest.TestCase):
+    def test_deep_programs(self):
+        for name, text, expected in programs.generate_deep_programs(DEPTH):
+            with self.subTest(name):
+                tree = deep.StackParser(lexer.Lexer(text)).parse()
+                self.assertEqual(programs.run_backend(deep.StackInterpreter, tree), expected)
+                # freeing the tree must not overflow the C stack either
+                del tree
+
+    def test_error_deep_inside(self):
+        text = ('fn main() {\n let mut d = 0;\n' + ' while d < 1 {\n' * DEPTH
+                + ' d = 1;\n x = 1 / (d - 1);\n' + ' }\n' * DEPTH + '}\n')
+        self.assertEqual(run(text), ({'d': 1}, ('ZeroDivisionError', 'division by zero')))
+
+    def test_steps(self):
+        # a run may be split into any number of steps
+        text = programs.generate_loop(50)
+        expected = programs.outcome(interpreter.Interpreter, text)[0]
+        tree = deep.StackParser(lexer.Lexer(text)).parse()
+        for steps in (1, 7, 1000):
+            with self.subTest(steps):
+                inptr = deep.StackInterpreter(None)
+                inptr.variables = {}
+                work, values = inptr.start(tree)
+                calls = 1
+                while inptr.step(work, values, steps):
+                    calls += 1
+                self.assertEqual(inptr.variables, expected)
+                self.assertEqual(values, [])
+                if steps == 1:
+                    self.assertGreater(calls, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
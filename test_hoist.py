@@ -0,0 +1,115 @@
+"""
+Tests of loop-invariant code motion
+
+    python -m pytest test_hoist.py
+
+"""
+
+import unittest
+
+import hoist
+import interpreter
+import lexer
+import parser
+import programs
+
+
+def program(body):
+    return 'fn main() {\n let mut i = 0;\n let mut k = 0;\n let mut x = 0;\n' + body + '\n}\n'
+
+
+NESTED = program('''
+ let mut a = 0;
+ let mut y = 1;
+ while a < 3 {
+  let mut b = 0;
+  while b < 3 {
+   x = x + (k * 3 + y) + a * 2 + (k * 3 + y);
+   b = b + 1;
+  }
+  a = a + 1;
+ }''')
+
+
+def loops(node):
+    """The While nodes in node, outermost first."""
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, parser.Compound):
+            stack.extend(reversed(node.children))
+        elif isinstance(node, parser.While):
+            found.append(node)
+            stack.extend(reversed(node.body))
+    return found
+
+
+class HoistTest(unittest.TestCase):
+    def assertSameAsInterpreter(self, text):
+        """(expressions hoisted, (variables, error)) of running text, which
+        must be the Interpreter's."""
+        expected = programs.outcome(interpreter.Interpreter, text)
+        programs.clear_variables(hoist.HoistingInterpreter)
+        inptr = hoist.HoistingInterpreter(parser.Parser(lexer.Lexer(text)))
+        error = None
+        try:
+            inptr.interpret()
+        except Exception as e:
+            error = (type(e).__name__, str(e))
+        self.assertEqual((dict(inptr.variables), error), expected)
+        return inptr.hoisted, expected
+
+    def test_loop_that_does_not_run(self):
+        hoisted, (variables, error) = self.assertSameAsInterpreter(program(
+            ' while i < 0 {\n  x = 10 / k;\n  i = i + 1;\n }'))
+        self.assertEqual(hoisted, 1)
+        self.assertIsNone(error)
+
+    def test_arm_never_taken(self):
+        hoisted, (variables, error) = self.assertSameAsInterpreter(program(
+            ' while i < 5 {\n  if i > 100 {\n   x = 10 / k;\n  }\n  i = i + 1;\n }'))
+        self.assertEqual(hoisted, 1)
+        self.assertIsNone(error)
+
+    def test_raises_where_it_did(self):
+        # the arm is first taken when i is 2
+        hoisted, (variables, error) = self.assertSameAsInterpreter(program(
+            ' while i < 5 {\n  if i > 1 {\n   x = 10 / k;\n  }\n  i = i + 1;\n }'))
+        self.assertEqual(error[0], 'ZeroDivisionError')
+        self.assertEqual(variables['i'], 2)
+
+    def test_earlier_error_comes_first(self):
+        hoisted, (variables, error) = self.assertSameAsInterpreter(program(
+            ' while i < 5 {\n  x = u;\n  x = 10 / k;\n  i = i + 1;\n }'))
+        self.assertEqual(error, ('NameError', "'u'"))
+
+    def test_nested_loops(self):
+        tree, slots = hoist.hoist(parser.Parser(lexer.Lexer(NESTED)).parse())
+        outer, inner = loops(tree)
+        # k*3 + y, twice, is invariant in both loops and goes to the outer
+        # one; a*2 only in the inner one
+        self.assertEqual(slots, 2)
+        self.assertIsInstance(outer, hoist.HoistedWhile)
+        self.assertIsInstance(inner, hoist.HoistedWhile)
+        self.assertEqual(len(outer.slots), 1)
+        self.assertEqual(len(inner.slots), 1)
+        # a*2 is worked out again each time the inner loop starts
+        hoisted, (variables, error) = self.assertSameAsInterpreter(NESTED)
+        self.assertEqual(variables['x'], 9 * (1 + 1) + 3 * (0 + 2 + 4))
+
+    def test_assigned_in_a_nested_loop(self):
+        # k is assigned by the inner loop, so k*3 is not invariant in the
+        # outer one
+        text = program(
+            ' while i < 3 {\n  x = x + k * 3;\n  let mut j = 0;\n'
+            '  while j < 2 {\n   k = k + 1;\n   j = j + 1;\n  }\n  i = i + 1;\n }')
+        hoisted, (variables, error) = self.assertSameAsInterpreter(text)
+        self.assertEqual(hoisted, 0)
+        self.assertEqual(variables['x'], 0 + 6 + 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
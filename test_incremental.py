@@ -0,0 +1,85 @@
+"""
+Tests of incremental parsing against parsing the whole text again
+
+    python -m pytest test_incremental.py
+
+"""
+
+import random
+import unittest
+
+import incremental
+import lexer
+import parser
+import programs
+
+
+def full_parse(text):
+    """tree_shape of the parsed text, or the name of the error it raises."""
+    try:
+        return programs.tree_shape(parser.Parser(lexer.Lexer(text)).parse())
+    except (lexer.LexerError, parser.ParserError) as e:
+        return type(e).__name__
+
+
+def edit(doc, offset, removed, inserted):
+    try:
+        return programs.tree_shape(doc.edit(offset, removed, inserted))
+    except (lexer.LexerError, parser.ParserError) as e:
+        return type(e).__name__
+
+
+class DocumentTest(unittest.TestCase):
+    def assertEdit(self, doc, offset, removed, inserted):
+        """Makes the edit, checks the tree against a full parse, then undoes
+        it and checks again."""
+        old = doc.text[offset:offset + removed]
+        self.assertEqual(edit(doc, offset, removed, inserted), full_parse(doc.text),
+                         'after replacing {!r} at {} by {!r}'.format(old, offset, inserted))
+        self.assertEqual(edit(doc, offset, len(inserted), old), full_parse(doc.text),
+                         'after putting {!r} back at {}'.format(old, offset))
+
+    def test_every_kind_of_edit(self):
+        rng = random.Random(0)
+        for kind in programs.EDIT_KINDS:
+            with self.subTest(kind):
+                doc = incremental.Document(programs.generate_program(8))
+                for _ in range(40):
+                    self.assertEdit(doc, *programs.random_edit(rng, doc.text, kind))
+
+    def test_edits_in_a_row(self):
+        # edits that are not undone, so broken programs are edited further
+        rng = random.Random(1)
+        doc = incremental.Document(programs.generate_program(8))
+        for _ in range(200):
+            self.assertEqual(edit(doc, *programs.random_edit(rng, doc.text)), full_parse(doc.text))
+
+    def test_brace_removed_and_put_back(self):
+        doc = incremental.Document(programs.generate_program(5))
+        offset = doc.text.index('}')
+        self.assertEqual(edit(doc, offset, 1, ''), 'ParserError')
+        self.assertEqual(edit(doc, offset, 0, '}'), full_parse(doc.text))
+
+    def test_comment_running_into_code(self):
+        doc = incremental.Document(programs.generate_program(5))
+        # the statement after "// block 2" becomes part of the comment
+        self.assertEdit(doc, doc.text.index('\n', doc.text.index('// block 2')), 1, ' ')
+
+    def test_statement_split(self):
+        doc = incremental.Document(programs.generate_program(5))
+        offset = doc.text.index('let mut a3 = ') + len('let mut a3 = ')
+        self.assertEdit(doc, offset, 0, '1;\n    q = ')
+
+    def test_untouched_statements_are_reused(self):
+        doc = incremental.Document(programs.generate_program(10))
+        before = list(doc.tree.children)
+        offset = doc.text.index('(6+5)')
+        edit(doc, offset + 1, 1, '7')
+        self.assertEqual(programs.tree_shape(doc.tree), full_parse(doc.text))
+        after = doc.tree.children
+        changed = [index for index, node in enumerate(after) if node is not before[index]]
+        self.assertEqual(len(changed), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests of type inference: the types it works out, its warnings, and
+TypedInterpreter against the Interpreter
+
+    python -m pytest test_inference.py
+
+"""
+
+import random
+import unittest
+
+import inference
+import interpreter
+import lexer
+import parser
+import programs
+
+
+def infer(body):
+    """The TypeInference of `fn main() { body }`."""
+    types = inference.TypeInference()
+    types.infer(parser.Parser(lexer.Lexer('fn main() {\n' + body + '\n}\n')).parse())
+    return types
+
+
+class TypeInferenceTest(unittest.TestCase):
+    def test_types(self):
+        types = infer(' let mut a = 1;\n let mut b = a + 1.5;\n let mut c = a / 2;\n'
+                      ' let mut d = a > b;\n let mut e = "s" * a;\n let mut f = e + "t";\n'
+                      ' let mut g = e == a;\n let mut h = a % 3 - 1;')
+        self.assertEqual(types.types, {'a': 'int', 'b': 'float', 'c': 'float', 'd': 'bool',
+                                       'e': 'str', 'f': 'str', 'g': 'bool', 'h': 'int'})
+        self.assertEqual(types.warnings, [])
+
+    def test_depends_on_the_values(self):
+        # a str and a number raise when added or compared
+        types = infer(' let mut s = "s";\n let mut a = s + 1;\n let mut b = s < 1;\n'
+                      ' let mut c = u + 1;\n let mut d = s - s;')
+        self.assertEqual(types.types, {'s': 'str', 'a': 'any', 'b': 'any', 'c': 'any', 'd': 'any'})
+        self.assertEqual(types.warnings, [])
+
+    def test_types_from_later_assignments(self):
+        # b is an int when first assigned, and mixed once a is; going
+        # round again finds it
+        types = infer(' let mut a = 1;\n let mut b = 0;\n let mut i = 0;\n while i < 3 {\n'
+                      '  b = a * 2;\n  a = 0.5;\n  i = i + 1;\n }')
+        self.assertEqual((types.types['a'], types.types['b'], types.types['i']), ('any', 'any', 'int'))
+        self.assertEqual(types.warnings, [(7, 'a', 'int', 'float')])
+
+    def test_warnings(self):
+        types = infer(' let mut a = 1;\n if a > 0 {\n  a = "one";\n }\n let mut b = a + 1;\n b = 2;')
+        self.assertEqual(types.types, {'a': 'any', 'b': 'any'})
+        # b is mixed only because a is, which is not warned about again
+        self.assertEqual(types.warnings, [(4, 'a', 'int', 'str')])
+        self.assertEqual(types.report(), 'line 4: a was int and is assigned str')
+        self.assertEqual(infer(' let mut a = 1;\n a = 2;').report(), '')
+
+    def test_long_else_if_chain(self):
+        types = inference.TypeInference()
+        types.infer(parser.Parser(lexer.Lexer(programs.generate_ladder(programs.LADDER_ARMS, 1))).parse())
+        self.assertEqual(types.types, {'i': 'int', 'hits': 'int', 'x': 'int'})
+
+
+class TypedInterpreterTest(unittest.TestCase):
+    def run_typed(self, text):
+        """The TypedInterpreter that ran text, whose variables must be the
+        Interpreter's."""
+        expected = programs.outcome(interpreter.Interpreter, text)
+        programs.clear_variables(inference.TypedInterpreter)
+        inptr = inference.TypedInterpreter(parser.Parser(lexer.Lexer(text)))
+        error = None
+        try:
+            inptr.interpret()
+        except Exception as e:
+            error = (type(e).__name__, str(e))
+        self.assertEqual((dict(inptr.variables), error), expected)
+        return inptr
+
+    def test_specialized(self):
+        inptr = self.run_typed(programs.generate_loop(20))
+        self.assertGreater(inptr.compiler.specialized, 0)
+        self.assertEqual(inptr.compiler.generic, 0)
+
+    def test_mixed_types_are_generic(self):
+        inptr = self.run_typed('fn main() {\n let mut a = 1;\n let mut b = a + 1;\n a = 0.5;\n'
+                               ' let mut s = "s" + "t";\n}\n')
+        # a + 1 on a mixed a; "s" + "t" on strs
+        self.assertEqual((inptr.compiler.specialized, inptr.compiler.generic), (1, 1))
+        self.assertEqual(inptr.inference.warnings, [(4, 'a', 'int', 'float')])
+
+    def test_unset_variable(self):
+        inptr = self.run_typed('fn main() {\n let mut a = 1;\n let mut b = a + c;\n}\n')
+        self.assertEqual(inptr.variables, {'a': 1})
+
+    def test_changing_types(self):
+        rng = random.Random(0)
+        for _ in range(30):
+            self.run_typed(programs.generate_changing_types(rng))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+"""
+Tests of the lexer's other ways in: StreamLexer, reading its input a
+chunk at a time, TokenStream, holding the tokens in arrays, and
+lex_parallel, lexing pieces of the text side by side
+
+    python -m pytest test_lexer.py
+
+"""
+
+import concurrent.futures
+import io
+import os
+import tempfile
+import unittest
+
+import lexer
+import parser
+import programs
+
+# strings, comments and two-word keywords to straddle chunk boundaries
+STRADDLING = ('fn main() {\n // a comment; with "quotes" and } braces\n'
+              ' let mut s = "a string // not a comment; }";\n let mut n = 12345.678;\n'
+              ' if n >= 10 {\n  s = s + "naïve ☃ “quoted”";\n }\n else if n != 3 {\n  s = "";\n }\n'
+              ' else {\n  n = n % 7;\n }\n}\n// the last line')
+
+
+def lexed(lex):
+    """(type, value, offset) of every token up to EOF, and then the
+    message of the LexerError raised, if any."""
+    found = []
+    try:
+        for tok in lex.tokens():
+            found.append((tok.type, tok.value, tok.offset))
+    except lexer.LexerError as e:
+        found.append(e.message)
+    return found
+
+
+def streamed(text):
+    """lexed() of a TokenStream of text, read with get_next_token()."""
+    try:
+        stream = lexer.TokenStream(text)
+    except lexer.LexerError as e:
+        return [e.message]
+    found = []
+    while not found or found[-1][0] != lexer.EOF:
+        tok = stream.get_next_token()
+        found.append((tok.type, tok.value, tok.offset))
+    return found
+
+
+class StreamLexerTest(unittest.TestCase):
+    def assertSameAsLexer(self, text, chunk_sizes=range(1, 8)):
+        expected = lexed(lexer.Lexer(text))
+        for chunk_size in chunk_sizes:
+            for source in (io.StringIO(text), io.BytesIO(text.encode('utf-8'))):
+                with self.subTest(chunk_size=chunk_size, source=type(source).__name__):
+                    self.assertEqual(lexed(lexer.StreamLexer(source, chunk_size)), expected)
+        return expected
+
+    def test_straddling_chunks(self):
+        expected = self.assertSameAsLexer(STRADDLING)
+        self.assertIn((lexer.STR, 'a string // not a comment; }', STRADDLING.index('"a string')), expected)
+        self.assertEqual(expected[-1][0], lexer.EOF)
+
+    def test_two_word_keywords(self):
+        # 'let mut ' and 'else if ' need the input after them, and an
+        # identifier followed by ' mut ' or ' if ' is still an identifier
+        expected = self.assertSameAsLexer('let mut a = 1; else if b; lettuce mut c; elsewhere if d;')
+        self.assertEqual([tok[0] for tok in expected[:8]],
+                         [lexer.LETMUT, lexer.ID, lexer.ASSIGN, lexer.INTEGER, lexer.SEMI,
+                          lexer.ELSEIF, lexer.ID, lexer.SEMI])
+        self.assertEqual([tok[1] for tok in expected[8:11]], ['lettuce', 'mut', 'c'])
+
+    def test_unterminated(self):
+        self.assertSameAsLexer('fn main() {\n s = "runs to the end\n}\n')
+        self.assertSameAsLexer('fn main() {\n x = 1;\n}\n// no newline at the end')
+
+    def test_error_position(self):
+        expected = self.assertSameAsLexer('fn main() {\n let mut a = 1;\n "☃☃";\n a = a @ 2;\n}\n')
+        self.assertEqual(expected[-1], "LexerError: Lexer error on '@' line: 4 column: 8")
+
+    def test_corpus(self):
+        for name, text in programs.corpus():
+            with self.subTest(name):
+                self.assertSameAsLexer(text, (1, 5, 4096))
+
+    def test_from_path(self):
+        fd, path = tempfile.mkstemp(suffix='.rs')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(STRADDLING)
+            with lexer.StreamLexer.from_path(path, chunk_size=3) as lex:
+                self.assertEqual(lexed(lex), lexed(lexer.Lexer(STRADDLING)))
+            # an empty file cannot be mapped, and is read as it is
+            open(path, 'w').close()
+            with lexer.StreamLexer.from_path(path) as lex:
+                self.assertEqual(lexed(lex), [(lexer.EOF, None, 0)])
+        finally:
+            os.remove(path)
+
+    def test_holds_only_the_unread_part(self):
+        text = programs.generate_program(50)
+        lex = lexer.StreamLexer(io.StringIO(text), chunk_size=64)
+        longest = 0
+        for tok in lex.tokens():
+            longest = max(longest, len(lex.text))
+        self.assertLess(longest, 200)
+        self.assertGreater(len(text), 20 * longest)
+
+
+class TokenStreamTest(unittest.TestCase):
+    def test_same_tokens_as_lexer(self):
+        for name, text in programs.corpus() + [('straddling', STRADDLING), ('end of file', 'x = 1;\x1a y')]:
+            with self.subTest(name):
+                self.assertEqual(streamed(text), lexed(lexer.Lexer(text)))
+
+    def test_errors(self):
+        for text in ('fn main() {\n a = a @ 2;\n}\n', '#', 'x = 1;\n  $'):
+            with self.subTest(text):
+                expected = lexed(lexer.Lexer(text))
+                self.assertIsInstance(expected[-1], str)
+                self.assertEqual(streamed(text), expected[-1:])
+
+    def test_arrays(self):
+        text = 'let mut s = "ab";\n x = 2.5 + 10;'
+        stream = lexer.TokenStream(text)
+        self.assertEqual(len(stream), 12)
+        self.assertEqual([stream.type(i) for i in range(len(stream))],
+                         [lexer.LETMUT, lexer.ID, lexer.ASSIGN, lexer.STR, lexer.SEMI, lexer.ID,
+                          lexer.ASSIGN, lexer.NUMBER, lexer.PLUS, lexer.INTEGER, lexer.SEMI, lexer.EOF])
+        # the lexeme of let mut leaves out the space the pattern takes in
+        self.assertEqual([text[stream.starts[i]:stream.ends[i]] for i in (0, 3, 7)], ['let mut', '"ab"', '2.5'])
+        self.assertEqual([stream.value(i) for i in (3, 7, 9, 11)], ['ab', 2.5, 10, None])
+        tok = stream.token(5)
+        self.assertEqual((tok.type, tok.value, tok.line, tok.column), (lexer.ID, 'x', 2, 2))
+        self.assertEqual((stream.kinds.itemsize, stream.starts.itemsize, stream.ends.itemsize), (1, 4, 4))
+
+    def test_eof_is_handed_out_again(self):
+        stream = lexer.TokenStream('x')
+        self.assertEqual([stream.get_next_token().type for _ in range(4)],
+                         [lexer.ID, lexer.EOF, lexer.EOF, lexer.EOF])
+
+    def test_parsed_like_the_lexer(self):
+        for name, text in programs.corpus():
+            with self.subTest(name):
+                self.assertEqual(programs.tree_shape(parser.Parser(lexer.TokenStream(text)).parse()),
+                                 programs.tree_shape(parser.Parser(lexer.Lexer(text)).parse()))
+
+
+class LexParallelTest(unittest.TestCase):
+    def setUp(self):
+        # threads stand in for the worker processes
+        self.executor = concurrent.futures.ThreadPoolExecutor(4)
+        self.addCleanup(self.executor.shutdown)
+
+    def assertSameAsTokenStream(self, text, workers=range(2, 7)):
+        try:
+            expected = lexer.TokenStream(text)
+        except lexer.LexerError as e:
+            expected = e.message
+        for count in workers:
+            with self.subTest(workers=count):
+                try:
+                    stream = lexer.lex_parallel(text, count, self.executor)
+                except lexer.LexerError as e:
+                    self.assertEqual(e.message, expected)
+                else:
+                    self.assertEqual((list(stream.kinds), list(stream.starts), list(stream.ends)),
+                                     (list(expected.kinds), list(expected.starts), list(expected.ends)))
+
+    def assertCutInside(self, text, start, stop, workers):
+        """Some cut of text into workers pieces lands in text[start:stop]."""
+        self.assertTrue(any(start < point < stop for point in lexer.split_points(text, workers)))
+
+    def test_split_points(self):
+        text = programs.generate_program(20)
+        points = lexer.split_points(text, 4)
+        self.assertEqual(len(points), 4)
+        self.assertEqual(points, sorted(set(points)))
+        self.assertTrue(all(text[point - 1] in ';}' for point in points[1:]))
+        # nowhere to cut
+        self.assertEqual(lexer.split_points('fn main() {', 4), [0])
+
+    def test_cut_inside_a_string(self):
+        text = 'fn main() {\n let mut s = "' + 'a; } ' * 100 + '";\n let mut x = 1;\n}\n'
+        self.assertCutInside(text, text.index('"'), text.rindex('"'), 4)
+        self.assertSameAsTokenStream(text)
+
+    def test_cut_inside_a_comment(self):
+        text = 'fn main() {\n // ' + 'b; "} ' * 100 + '\n let mut x = 1;\n}\n'
+        self.assertCutInside(text, text.index('//'), text.index('\n let'), 4)
+        self.assertSameAsTokenStream(text)
+
+    def test_programs(self):
+        for name, text in programs.corpus() + [('straddling', STRADDLING * 20),
+                                               ('program', programs.generate_program(30))]:
+            with self.subTest(name):
+                self.assertSameAsTokenStream(text)
+
+    def test_errors(self):
+        text = programs.generate_program(10)
+        middle = text.index(';', len(text) // 2) + 1
+        for bad in (text[:middle] + ' @' + text[middle:], text + '#', '"' + text):
+            self.assertSameAsTokenStream(bad)
+
+    def test_worker_processes(self):
+        text = programs.generate_program(30)
+        stream = lexer.lex_parallel(text, 2)
+        self.assertEqual(list(stream.kinds), list(lexer.TokenStream(text).kinds))
+
+
+if __name__ == '__main__':
+    unittest.main()
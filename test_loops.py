@@ -0,0 +1,99 @@
+"""
+Tests of counting loops run in one step against running them
+
+    python -m pytest test_loops.py
+
+"""
+
+import itertools
+import operator
+import unittest
+
+import interpreter
+import lexer
+import loops
+import parser
+import programs
+
+COMPARE = {parser.LT: operator.lt, parser.LE: operator.le, parser.GT: operator.gt,
+           parser.GE: operator.ge, parser.EQ: operator.eq, parser.NE: operator.ne}
+
+
+def counted(op, start, bound, step, limit=100):
+    """How often `while i op bound { i = i + step; }` runs its body, or
+    None if that is more than limit."""
+    count = 0
+    while COMPARE[op](start, bound):
+        if count == limit:
+            return None
+        start += step
+        count += 1
+    return count
+
+
+def counting_loop(condition, body):
+    return ('fn main() {\n let mut i = 0;\n let mut n = 0;\n let mut t = 0;\n let mut u = 0;\n'
+            + condition + ' {\n' + body + '\n }\n}\n')
+
+
+class LoopTest(unittest.TestCase):
+    def assertSkipped(self, text, skipped=True):
+        """Runs text with LoopInterpreter; the variables must be the
+        Interpreter's, and the loop skipped or not."""
+        expected = programs.outcome(interpreter.Interpreter, text)
+        programs.clear_variables(loops.LoopInterpreter)
+        inptr = loops.LoopInterpreter(parser.Parser(lexer.Lexer(text)))
+        inptr.interpret()
+        self.assertEqual((dict(inptr.variables), None), expected)
+        self.assertEqual(inptr.skipped, int(skipped))
+        return expected[0]
+
+    def test_trip_count(self):
+        for op, step in itertools.product(COMPARE, (-3, -2, -1, 1, 2, 3)):
+            loop = loops.CountingLoop('i', step, op, (loops.CONSTANT, 0), [])
+            for start, bound in itertools.product(range(-7, 8), repeat=2):
+                self.assertEqual(loop.trip_count(start, bound), counted(op, start, bound, step),
+                                 'i = {}; while i {} {} {{ i = i + {}; }}'.format(start, op, bound, step))
+
+    def test_every_comparison(self):
+        for condition in ('while i < 10', 'while i <= 10', 'while 10 > i', 'while i != 10',
+                          'while i == 0', 'while i < n'):
+            with self.subTest(condition):
+                variables = self.assertSkipped(counting_loop(
+                    ' n = 7;\n' + condition,
+                    '  t = t + i;\n  i = i + 2;\n  u = u + i;'))
+                self.assertGreater(variables['i'], 0)
+
+    def test_counting_down(self):
+        self.assertSkipped(counting_loop(' i = 20;\n while i >= 3',
+                                         '  i = i - 3;\n  t = t + i;\n  u = u - 2;'))
+
+    def test_not_ending(self):
+        loop = loops.CountingLoop('i', 2, parser.NE, (loops.CONSTANT, 7), [])
+        self.assertIsNone(loop.trip_count(0, 7))
+        loop = loops.CountingLoop('i', -1, parser.LT, (loops.CONSTANT, 7), [])
+        self.assertIsNone(loop.trip_count(0, 7))
+
+    def test_floats_run_as_usual(self):
+        for setup, condition, body in (
+                ('', 'while i < 10.5', '  i = i + 1;\n  t = t + i;'),
+                (' i = 0.5;\n', 'while i < 10', '  i = i + 1;\n  t = t + i;'),
+                (' t = 0.5;\n', 'while i < 10', '  i = i + 1;\n  t = t + i;'),
+                (' t = 0.5;\n', 'while i < 10', '  i = i + 1;\n  u = u + t;')):
+            with self.subTest(setup=setup, condition=condition, body=body):
+                self.assertSkipped(counting_loop(setup + condition, body), skipped=False)
+
+    def test_bound_changed_by_the_loop(self):
+        self.assertIsNone(loops.analyze(parser.Parser(lexer.Lexer(counting_loop(
+            ' n = 10;\n while i < n', '  i = i + 1;\n  n = n - 1;'))).parse().children[-1]))
+
+    def test_not_counting_loops(self):
+        for body in ('  i = i * 2;', '  i = i + 1;\n  t = t * 2;', '  i = i + 1;\n  t = i + t + 1;',
+                     '  i = i + 1;\n  i = i + 1;', '  if t > 1 {\n   t = 0;\n  }\n  i = i + 1;'):
+            with self.subTest(body):
+                tree = parser.Parser(lexer.Lexer(counting_loop(' i = 1;\n while i < 10', body))).parse()
+                self.assertIsNone(loops.analyze(tree.children[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
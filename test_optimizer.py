@@ -0,0 +1,76 @@
+"""
+Tests of the optimizer
+
+    python -m pytest test_optimizer.py
+
+"""
+
+import tracemalloc
+import unittest
+
+import interpreter
+import lexer
+import optimizer
+import parser
+import programs
+
+
+def parse(text):
+    return parser.Parser(lexer.Lexer(text)).parse()
+
+
+def run_optimized(text):
+    """(variables, error) of running text after optimizing it."""
+    interpreter.Interpreter.variables.clear()
+    error = None
+    try:
+        interpreter.Interpreter(None).visit(optimizer.optimize(parse(text)))
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    return dict(interpreter.Interpreter.variables), error
+
+
+class OptimizerTest(unittest.TestCase):
+    def test_folding(self):
+        tree = optimizer.optimize(parse('fn main() {\n x = (6+7)*3 - 10 % 4;\n}\n'))
+        self.assertIsInstance(tree.children[0].right, parser.Num)
+        self.assertEqual(tree.children[0].right.value, 37)
+
+    def test_errors_left_for_the_run(self):
+        text = 'fn main() {\n let mut a = 1;\n a = 1 / 0;\n}\n'
+        self.assertEqual(run_optimized(text), ({'a': 1}, ('ZeroDivisionError', 'division by zero')))
+
+    def test_huge_values_are_not_built(self):
+        text = ('fn main() {\n let mut a = 1;\n if a > 5 {\n  s = "x" * 1000000000;\n'
+                '  n = 99999999999999999999 * 99999999999999999999 * 99999999999999999999;\n }\n}\n')
+        tree = parse(text)
+        tracemalloc.start()
+        try:
+            optimizer.optimize(tree)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
+        self.assertEqual(run_optimized(text), ({'a': 1}, None))
+
+    def test_unchanged_tree_is_shared(self):
+        tree = parse(programs.generate_ladder(programs.LADDER_ARMS, 3))
+        self.assertIs(optimizer.optimize(tree), tree)
+        tree = parse('fn main() {\n let mut a = 1;\n while a < 3 {\n  a = a + 1;\n }\n b = 2 * 3;\n}\n')
+        optimized = optimizer.optimize(tree)
+        self.assertIsNot(optimized, tree)
+        self.assertIs(optimized.children[1], tree.children[1])
+
+    def test_constant_arms(self):
+        text = ('fn main() {\n let mut a = 1;\n if 2 < 1 {\n  a = 2;\n }\n'
+                ' else if a == 1 {\n  a = 3;\n }\n else if 1 < 2 {\n  a = 4;\n }\n else {\n  a = 5;\n }\n}\n')
+        counts = optimizer.Optimizer()
+        tree = counts.optimize(parse(text))
+        self.assertEqual(counts.counts()[optimizer.IF_FALSE], 1)
+        self.assertEqual(counts.counts()[optimizer.IF_TRUE], 1)
+        self.assertEqual(run_optimized(text), ({'a': 3}, None))
+        self.assertEqual(len(tree.children), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
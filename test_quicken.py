@@ -0,0 +1,128 @@
+"""
+Tests of the quickening interpreter against the Interpreter
+
+    python -m pytest test_quicken.py
+
+"""
+
+import random
+import threading
+import unittest
+
+import interpreter
+import lexer
+import parser
+import programs
+import quicken
+
+
+def parse(text):
+    return parser.Parser(lexer.Lexer(text)).parse()
+
+
+def node_classes(tree):
+    """The classes of every node in tree, in order."""
+    classes = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        classes.append(type(node))
+        for name in getattr(type(node), '__slots__', ()):
+            child = getattr(node, name, None)
+            if isinstance(child, (parser.AST, list)):
+                stack.append(child)
+    return classes
+
+
+def run_alone(tree):
+    """(variables, error) of a QuickeningInterpreter with variables of its
+    own running tree."""
+    inptr = quicken.QuickeningInterpreter(None)
+    inptr.variables = {}
+    error = None
+    try:
+        inptr.run(tree)
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    return inptr.variables, error
+
+
+# x changes from int to float and back every ten runs
+FLIPPING = """fn main() {
+ let mut i = 0;
+ let mut x = 0;
+ while i < 400 {
+  x = x + 1;
+  if i % 20 == 10 {
+   x = 0.5;
+  }
+  if i % 20 == 0 {
+   x = 0;
+  }
+  i = i + 1;
+ }
+}
+"""
+
+
+class QuickenTest(unittest.TestCase):
+    def test_specializations(self):
+        inptr = quicken.QuickeningInterpreter(None)
+        inptr.run(parse(programs.generate_loop(100)))
+        for kind in (quicken.INT_ADD, quicken.COMPARE_CONST, quicken.INCREMENT):
+            self.assertGreater(inptr.counts['{} {}'.format(quicken.QUICKENED, kind)], 0)
+        self.assertNotIn(quicken.DEOPTIMIZED, inptr.counts)
+
+    def test_deoptimized_and_given_up(self):
+        inptr = quicken.QuickeningInterpreter(None)
+        inptr.variables = {}
+        inptr.run(parse(FLIPPING))
+        self.assertEqual(inptr.variables, programs.outcome(interpreter.Interpreter, FLIPPING)[0])
+        counts = inptr.counts
+        # x = x + 1 stops being specialized after MAX_QUICKENINGS times;
+        # i = i + 1 is specialized once
+        self.assertEqual(counts['deoptimized Increment'], quicken.MAX_QUICKENINGS)
+        self.assertEqual(counts['quickened Increment'], quicken.MAX_QUICKENINGS + 1)
+
+    def test_changing_types(self):
+        rng = random.Random(0)
+        for _ in range(30):
+            text = programs.generate_changing_types(rng)
+            self.assertEqual(programs.outcome(quicken.QuickeningInterpreter, text),
+                             programs.outcome(interpreter.Interpreter, text))
+
+    def test_tree_is_not_changed(self):
+        tree = parse(programs.generate_loop(100))
+        before = node_classes(tree)
+        inptr = quicken.QuickeningInterpreter(None)
+        inptr.run(tree)
+        self.assertGreater(inptr.counts[quicken.QUICKENED], 0)
+        self.assertEqual(node_classes(tree), before)
+
+    def test_threads_sharing_trees(self):
+        rng = random.Random(1)
+        trees = [parse(programs.generate_changing_types(rng)) for _ in range(40)]
+        expected = [run_alone(tree) for tree in trees]
+        before = [node_classes(tree) for tree in trees]
+        results = [[] for _ in range(4)]
+
+        def work(results):
+            for _ in range(5):
+                for tree in trees:
+                    results.append(run_alone(tree))
+
+        threads = [threading.Thread(target=work, args=(result,)) for result in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for result in results:
+            self.assertEqual(result, expected * 5)
+        self.assertEqual([node_classes(tree) for tree in trees], before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests of the Resolver: slots, the frame of every run, and what is left
+after an error
+
+    python -m pytest test_resolver.py
+
+"""
+
+import unittest
+
+import interpreter
+import lexer
+import parser
+import programs
+import resolver
+
+
+def parse(text):
+    return parser.Parser(lexer.Lexer(text)).parse()
+
+
+def nodes(node):
+    """Every node of a tree."""
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, parser.AST):
+            found.append(node)
+            for cls in type(node).__mro__:
+                # the target of an Assign is kept as it was
+                skip = ('token', 'left') if isinstance(node, parser.Assign) else ('token',)
+                stack.extend(getattr(node, name) for name in getattr(cls, '__slots__', ()) if name not in skip)
+    return found
+
+
+class ResolverTest(unittest.TestCase):
+    def test_slots(self):
+        tree, names = resolver.resolve(parse(
+            'fn main() {\n let mut b = 1;\n a = b + 2;\n if a > b {\n  c = a;\n }\n b = c;\n}\n'))
+        # numbered in the order they are first seen; the right side of an
+        # Assign is resolved before its target
+        self.assertEqual(names, ['b', 'a', 'c'])
+        slots = {}
+        for node in nodes(tree):
+            self.assertNotIn(type(node), (parser.Var, parser.Assign))
+            if isinstance(node, (resolver.LocalVar, resolver.LocalAssign)):
+                name = node.value if isinstance(node, resolver.LocalVar) else node.left.value
+                self.assertEqual(slots.setdefault(name, node.slot), node.slot)
+                self.assertEqual(names[node.slot], name)
+        self.assertEqual(sorted(slots), ['a', 'b', 'c'])
+
+    def test_tree_is_not_changed(self):
+        for name, text in programs.corpus():
+            with self.subTest(name):
+                tree = parse(text)
+                shape = programs.tree_shape(tree)
+                resolver.resolve(tree)
+                self.assertEqual(programs.tree_shape(tree), shape)
+
+    def test_else_if_chain(self):
+        tree, names = resolver.resolve(parse(programs.generate_ladder(programs.LADDER_ARMS, 1)))
+        # the If in the body of the while
+        arm = tree.children[-1].body[1]
+        arms = 0
+        while isinstance(arm, parser.If):
+            self.assertIsInstance(arm.condition.left, resolver.LocalVar)
+            arm = arm.control_body
+            arms += 1
+        self.assertEqual(arms, programs.LADDER_ARMS)
+
+    def test_new_frame_every_run(self):
+        inptr = resolver.ResolvedInterpreter(None)
+        self.assertEqual(inptr.run(*resolver.resolve(parse('fn main() {\n x = 1;\n}\n'))), {'x': 1})
+        # x is not carried over from the run before
+        tree, names = resolver.resolve(parse('fn main() {\n x = x + 1;\n}\n'))
+        with self.assertRaises(NameError):
+            inptr.run(tree, names)
+        self.assertEqual(inptr.variables, {})
+
+    def test_interpreters_do_not_share_variables(self):
+        text = 'fn main() {\n let mut a = 5;\n}\n'
+        one = resolver.ResolvedInterpreter(parser.Parser(lexer.Lexer(text)))
+        other = resolver.ResolvedInterpreter(None)
+        one.interpret()
+        self.assertEqual(one.variables, {'a': 5})
+        self.assertEqual(other.variables, {})
+        self.assertIsNot(one.variables, interpreter.Interpreter.variables)
+
+    def test_variables_kept_on_error(self):
+        for name, (text, error) in programs.ERRORS.items():
+            with self.subTest(name):
+                variables, raised = programs.outcome(resolver.ResolvedInterpreter, text)
+                self.assertEqual(raised[0], error)
+                self.assertEqual((variables, raised), programs.outcome(interpreter.Interpreter, text))
+
+
+if __name__ == '__main__':
+    unittest.main()
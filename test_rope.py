@@ -0,0 +1,96 @@
+"""
+Tests of Ropes: appending to shared parts, when a Rope is joined, and
+RopeInterpreter against the Interpreter
+
+    python -m pytest test_rope.py
+
+"""
+
+import unittest
+
+import interpreter
+import programs
+import rope
+
+LONG = 'x' * rope.MIN_ROPE_LENGTH
+
+
+def program(body):
+    return 'fn main() {\n let mut i = 0;\n let mut s = "";\n' + body + '\n}\n'
+
+
+class RopeTest(unittest.TestCase):
+    def test_append(self):
+        start = rope.concat(LONG, 'a')
+        self.assertIs(type(start), rope.Rope)
+        longer = start.append('b').append('c')
+        self.assertEqual((longer.text(), len(longer)), (LONG + 'abc', len(LONG) + 3))
+        self.assertEqual(start.text(), LONG + 'a')
+
+    def test_two_appends_to_one_rope(self):
+        start = rope.concat(LONG, 'a')
+        first = start.append('b')
+        # first took the parts list over, so second needs a copy of it
+        second = start.append('c')
+        self.assertIs(first.parts, start.parts)
+        self.assertIsNot(second.parts, start.parts)
+        self.assertEqual([start.text(), first.text(), second.text()],
+                         [LONG + 'a', LONG + 'ab', LONG + 'ac'])
+        self.assertEqual(first.append('d').text(), LONG + 'abd')
+
+    def test_append_after_text(self):
+        start = rope.concat(LONG, 'a')
+        self.assertEqual(start.text(), LONG + 'a')
+        joined = start.append('b')
+        self.assertEqual(joined.parts, [LONG + 'a', 'b'])
+        self.assertEqual(joined.text(), LONG + 'ab')
+
+    def test_concat(self):
+        # short strings are cheaper to copy
+        self.assertEqual(rope.concat('a', 'b'), 'ab')
+        self.assertIs(type(rope.concat(LONG[1:], 'b')), rope.Rope)
+        self.assertEqual(rope.flatten(rope.concat('b', rope.concat(LONG, 'a'))), 'b' + LONG + 'a')
+        self.assertEqual(rope.concat(2, 3), 5)
+        for left, right in ((rope.concat(LONG, 'a'), 1), (1, rope.concat(LONG, 'a'))):
+            with self.assertRaises(TypeError) as raised:
+                rope.concat(left, right)
+            with self.assertRaises(TypeError) as expected:
+                rope.flatten(left) + rope.flatten(right)
+            self.assertEqual(str(raised.exception), str(expected.exception))
+
+
+class RopeInterpreterTest(unittest.TestCase):
+    def assertSameAsInterpreter(self, text):
+        expected = programs.outcome(interpreter.Interpreter, text)
+        variables, error = programs.outcome(rope.RopeInterpreter, text)
+        self.assertEqual((variables, error), expected)
+        # no Rope is left behind
+        self.assertNotIn(rope.Rope, {type(value) for value in variables.values()})
+        return expected
+
+    def test_built_in_a_loop(self):
+        variables, error = self.assertSameAsInterpreter(program(
+            ' while i < 500 {\n  s = s + "ab";\n  i = i + 1;\n }'))
+        self.assertEqual(variables['s'], 'ab' * 500)
+
+    def test_copied_then_appended(self):
+        variables, error = self.assertSameAsInterpreter(program(
+            ' while i < 100 {\n  s = s + "ab";\n  i = i + 1;\n }\n let mut t = s;\n'
+            ' t = t + "t";\n s = s + "s";\n let mut u = t + s;'))
+        self.assertEqual((variables['t'][-3:], variables['s'][-3:]), ('abt', 'abs'))
+
+    def test_compared_and_used_with_other_operators(self):
+        variables, error = self.assertSameAsInterpreter(program(
+            ' while i < 100 {\n  s = s + "ab";\n  i = i + 1;\n }\n let mut t = "ab" + s;\n'
+            ' let mut same = s + "ab" == t;\n let mut less = s < t;\n let mut r = s * 2;'))
+        self.assertEqual((variables['same'], variables['less']), (True, True))
+
+    def test_error_while_building(self):
+        variables, error = self.assertSameAsInterpreter(program(
+            ' while i < 100 {\n  s = s + "ab";\n  i = i + 1;\n }\n s = s + i;'))
+        self.assertEqual(error[0], 'TypeError')
+        self.assertEqual(variables['s'], 'ab' * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
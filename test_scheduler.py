@@ -0,0 +1,113 @@
+"""
+Tests of the Scheduler: programs taking turns, cancelling, and what each
+program leaves
+
+    python -m pytest test_scheduler.py
+
+"""
+
+import asyncio
+import unittest
+
+import interpreter
+import lexer
+import parser
+import programs
+import scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_run_program(self):
+        text = programs.generate_loop(30)
+        variables = asyncio.run(scheduler.run_program(text, slice_steps=7))
+        self.assertEqual(variables, programs.outcome(interpreter.Interpreter, text)[0])
+        self.assertIsNot(variables, interpreter.Interpreter.variables)
+
+    def test_slices(self):
+        inptr = scheduler.SlicedInterpreter(None)
+        tree = parser.Parser(lexer.Lexer(programs.generate_loop(30))).parse()
+        asyncio.run(inptr.run_sliced(tree, 100))
+        many = inptr.slices
+        inptr = scheduler.SlicedInterpreter(None)
+        asyncio.run(inptr.run_sliced(tree, 10 ** 9))
+        self.assertEqual(inptr.slices, 1)
+        self.assertGreater(many, 10)
+
+    def test_short_program_is_not_held_up(self):
+        async def run():
+            sched = scheduler.Scheduler(slice_steps=50)
+            long = sched.submit(programs.generate_loop(2000), 'long')
+            short = sched.submit(programs.generate_loop(5), 'short')
+            self.assertIsNone(short.latency())
+            results = await sched.wait()
+            return long, short, results
+        long, short, results = asyncio.run(run())
+        self.assertLess(short.finished, long.finished)
+        self.assertEqual(results['short'], programs.outcome(interpreter.Interpreter,
+                                                            programs.generate_loop(5))[0])
+        self.assertEqual(results['long']['i'], 2000)
+
+    def test_turns(self):
+        # each program runs one slice and gives way, round-robin
+        order = []
+
+        class Recording(scheduler.SlicedInterpreter):
+            def step(self, work, values, steps):
+                order.append(self.name)
+                return super().step(work, values, steps)
+
+        async def run_one(name, text):
+            inptr = Recording(None)
+            inptr.name = name
+            return await inptr.run_sliced(parser.Parser(lexer.Lexer(text)).parse(), 20)
+
+        async def run():
+            return await asyncio.gather(run_one('a', programs.generate_loop(20)),
+                                        run_one('b', programs.generate_loop(20)))
+        asyncio.run(run())
+        turns = order[:2 * order.count('b')]
+        self.assertEqual(turns, ['a', 'b'] * (len(turns) // 2))
+        self.assertGreater(len(turns), 10)
+
+    def test_cancel(self):
+        async def run():
+            sched = scheduler.Scheduler(slice_steps=50)
+            sched.submit('fn main() {\n let mut i = 0;\n while i < 1 {\n  i = 0;\n }\n}\n', 'forever')
+            sched.submit(programs.generate_loop(5), 'short')
+            await asyncio.sleep(0)
+            self.assertTrue(sched.cancel('forever'))
+            results = await sched.wait()
+            # ended already
+            self.assertFalse(sched.cancel('short'))
+            return sched, results
+        sched, results = asyncio.run(run())
+        self.assertIsInstance(results['forever'], asyncio.CancelledError)
+        self.assertIsInstance(results['short'], dict)
+        self.assertIsNotNone(sched.programs['forever'].latency())
+
+    def test_errors(self):
+        async def run():
+            sched = scheduler.Scheduler(slice_steps=3)
+            for name, (text, error) in programs.ERRORS.items():
+                sched.submit(text, name)
+            sched.submit('fn main() {\n x = (1;\n}\n', 'syntax')
+            return await sched.wait()
+        results = asyncio.run(run())
+        for name, (text, error) in programs.ERRORS.items():
+            self.assertEqual(type(results[name]).__name__, error, name)
+        self.assertIsInstance(results['syntax'], parser.ParserError)
+
+    def test_names(self):
+        async def run():
+            sched = scheduler.Scheduler()
+            first = sched.submit(programs.generate_loop(1))
+            second = sched.submit(programs.generate_loop(2))
+            with self.assertRaises(ValueError):
+                sched.submit(programs.generate_loop(3), 0)
+            await sched.wait()
+            return first.name, second.name, sorted(sched.programs)
+        self.assertEqual(asyncio.run(run()), (0, 1, [0, 1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests of the transpiler: the Python it writes, programs Python cannot
+compile, and the cache of compiled programs
+
+    python -m pytest test_transpile.py
+
+"""
+
+import unittest
+
+import cache
+import interpreter
+import lexer
+import parser
+import programs
+import transpile
+
+
+def source(text):
+    return transpile.Transpiler().source(parser.Parser(lexer.Lexer(text)).parse())
+
+
+class TranspileTest(unittest.TestCase):
+    def assertSameAsInterpreter(self, text):
+        """Runs text with both; returns the (variables, error) of both."""
+        expected = programs.outcome(interpreter.Interpreter, text)
+        self.assertEqual(programs.outcome(transpile.TranspileInterpreter, text), expected)
+        return expected
+
+    def test_unset_checks(self):
+        # only reads that may come before an assignment are checked
+        text = ('fn main() {\n let mut a = 1;\n b = a + c;\n if a < b {\n  d = 1;\n }\n'
+                ' else {\n  d = 2;\n }\n if a > 0 {\n  e = 1;\n }\n f = d + e;\n}\n')
+        written = source(text)
+        self.assertIn("undefined('c')", written)
+        self.assertIn("undefined('e')", written)
+        self.assertNotIn("undefined('a')", written)
+        self.assertNotIn("undefined('d')", written)
+        self.assertEqual(self.assertSameAsInterpreter(text)[1], ('NameError', "'c'"))
+
+    def test_variables_written_back_on_error(self):
+        text, error = programs.ERRORS['in a loop']
+        variables, raised = self.assertSameAsInterpreter(text)
+        self.assertEqual(raised[0], error)
+        self.assertEqual(variables['i'], 0)
+
+    def test_comparisons_are_not_chained(self):
+        # (3 > 2) > 1, where Python would read 3 > 2 and 2 > 1
+        self.assertEqual(self.assertSameAsInterpreter('fn main() {\n x = 3 > 2 > 1;\n}\n'),
+                         ({'x': False}, None))
+
+    def test_long_else_if_chain(self):
+        short = source(programs.generate_ladder(transpile.MAX_ELIFS, 1))
+        self.assertIn('elif', short)
+        self.assertNotIn('while True', short)
+        long = source(programs.generate_ladder(transpile.MAX_ELIFS + 1, 1))
+        self.assertNotIn('elif', long)
+        self.assertIn('while True', long)
+        text = programs.generate_ladder(programs.LADDER_ARMS, 50)
+        transpile.compile_source(text)
+        self.assertIsNone(self.assertSameAsInterpreter(text)[1])
+
+    def test_too_deep_for_python(self):
+        # Python allows 100 levels of indentation and 200 nested brackets;
+        # deeper programs are run by the Interpreter
+        for name, text, expected in (programs.generate_deep_programs(150)[3],
+                                     programs.generate_deep_programs(300)[2]):
+            with self.subTest(name):
+                with self.assertRaises(SyntaxError):
+                    transpile.compile_source(text)
+                self.assertEqual(self.assertSameAsInterpreter(text), (expected, None))
+
+    def test_program_is_cached(self):
+        text = programs.generate_loop(10)
+        self.assertIs(transpile.compile_source(text), transpile.compile_source(text))
+
+    def test_least_recently_used_is_dropped(self):
+        saved = transpile.MAX_PROGRAMS, transpile.PROGRAMS.copy()
+        transpile.MAX_PROGRAMS = 2
+        transpile.PROGRAMS.clear()
+        try:
+            first, second, third = (programs.generate_loop(n) for n in (1, 2, 3))
+            kept = transpile.compile_source(first)
+            transpile.compile_source(second)
+            transpile.compile_source(first)
+            transpile.compile_source(third)
+            self.assertIs(transpile.compile_source(first), kept)
+            self.assertEqual(len(transpile.PROGRAMS), 2)
+            # second was used least recently
+            self.assertNotIn(cache.source_key(second), transpile.PROGRAMS)
+        finally:
+            transpile.MAX_PROGRAMS = saved[0]
+            transpile.PROGRAMS.clear()
+            transpile.PROGRAMS.update(saved[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Tests of the bytecode VM and its disassembler
+
+    python -m pytest test_vm.py
+
+"""
+
+import unittest
+
+import lexer
+import parser
+import programs
+import vm
+
+
+def compile_text(text):
+    return vm.compile_tree(parser.Parser(lexer.Lexer(text)).parse())
+
+
+def instructions(code):
+    """(opcode name, argument) of every instruction of code."""
+    return [(vm.OPCODE_NAMES[code.code[at]], code.code[at + 1]) for at in range(0, len(code.code), 2)]
+
+
+class VMTest(unittest.TestCase):
+    def test_else_if_chain(self):
+        code = compile_text('fn main() {\n let mut a = 1;\n if a == 1 {\n  a = 2;\n }\n'
+                            ' else if a == 2 {\n  a = 3;\n }\n}\n')
+        listing = instructions(code)
+        end = len(code.code)
+        first_test, second_test = [arg for name, arg in listing if name == 'JUMP_IF_FALSE']
+        # a false condition jumps to the next arm, which starts by loading a
+        self.assertEqual(listing[first_test // 2], ('LOAD_VAR', 0))
+        self.assertEqual(second_test, end)
+        # the first arm jumps past the rest; the last one falls through
+        self.assertEqual(listing[first_test // 2 - 1], ('JUMP', end))
+        self.assertEqual(listing[-1], ('STORE_VAR', 0))
+
+    def test_while_loop(self):
+        code = compile_text('fn main() {\n let mut i = 0;\n while i < 3 {\n  i = i + 1;\n }\n}\n')
+        listing = instructions(code)
+        start = listing.index(('LOAD_VAR', 0)) * 2
+        self.assertEqual(listing[-1], ('JUMP', start))
+        self.assertIn(('JUMP_IF_FALSE', len(code.code)), listing)
+        variables = {}
+        vm.execute(code, variables)
+        self.assertEqual(variables, {'i': 3})
+
+    def test_constants_are_kept_apart_by_type(self):
+        code = compile_text('fn main() {\n a = 1;\n b = 1.0;\n c = 1;\n d = 1.0 + 1;\n}\n')
+        self.assertEqual([(type(value), value) for value in code.constants], [(int, 1), (float, 1.0)])
+        variables = {}
+        vm.execute(code, variables)
+        self.assertIs(type(variables['c']), int)
+        self.assertIs(type(variables['b']), float)
+
+    def test_disassemble_corpus(self):
+        for name, text in programs.corpus():
+            with self.subTest(name):
+                code = compile_text(text)
+                lines = vm.disassemble(code).splitlines()
+                self.assertEqual(len(lines), len(code.code) // 2)
+
+    def test_disassemble(self):
+        text = 'fn main() {\n let mut i = 0;\n while i < 3 {\n  i = i + 1;\n }\n}\n'
+        listing = vm.disassemble(compile_text(text))
+        for expected in ('LOAD_CONST', '(0)', 'STORE_VAR', '(i)', 'COMPARE', '(<)',
+                         'BINARY_OP', '(+)', 'JUMP_IF_FALSE', '>>'):
+            self.assertIn(expected, listing)
+
+
+if __name__ == '__main__':
+    unittest.main()
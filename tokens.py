@@ -0,0 +1,152 @@
+import array
+import bisect
+import re
+from enum import Enum
+
+
+class ErrorCode(Enum):
+    UNEXPECTED_TOKEN = 'Unexpected token'
+    ID_NOT_FOUND = 'Identifier not found'
+    DUPLICATE_ID = 'Duplicate id found'
+
+
+class Error(Exception):
+    def __init__(self, error_code=None, token=None, message=None):
+        self.error_code = error_code
+        self.token = token
+        # add exception class name before the message
+        self.message = f'{self.__class__.__name__}: {message}'
+
+
+class LexerError(Error):
+    pass
+
+
+class ParserError(Error):
+    pass
+
+
+class SemanticError(Error):
+    pass
+
+
+INTEGER = 'INTEGER'
+NUMBER = 'NUMBER'
+STR = 'STR'
+TRUE = 'true'
+FALSE = 'false'
+
+PLUS = 'PLUS'
+MINUS = 'MINUS'
+MULTIPLY = 'MULTIPLY'
+DIVIDE = 'DIVIDE'
+MODULO = 'MODULO'
+
+EQ = '=='
+NE = '!='
+GT = '>'
+LT = '<'
+GE = '>='
+LE = '<='
+
+LPAREN = '('
+RPAREN = ')'
+LCURL = '{'
+RCURL = '}'
+
+ASSIGN = '='
+SEMI = ';'
+ID = 'ID'
+COMMA = ','
+DOT = '.'
+QUO = '"'
+SLASH = '/'
+DSLASH = '//'
+
+FOR = 'for'
+IF = 'if'
+ELSEIF = 'else if'
+ELSE = 'else'
+LETMUT = 'let mut'
+WHILE = 'while'
+
+FN = 'fn'
+MAIN = 'main'
+EOF = 'EOF'
+
+
+NEWLINE = re.compile('\n')
+
+
+class LineIndex(object):
+    """Offsets at which the lines of a text start.
+
+    Nothing is worked out until a position is first asked for, so lexing
+    never pays for line and column bookkeeping. Lookups are a bisect.
+    """
+
+    def __init__(self, text=''):
+        self.text = text
+        self.starts = None
+
+    def build(self):
+        self.starts = array.array('Q', [0])
+        self.feed(self.text, 0)
+
+    def feed(self, text, offset):
+        """Adds the lines of `text`, which starts at `offset` in the source."""
+        if self.starts is None:
+            self.build()
+        self.starts.extend(m.end() + offset for m in NEWLINE.finditer(text))
+
+    def line_column(self, offset):
+        """Returns the (line, column) of `offset`, both counted from 1."""
+        if self.starts is None:
+            self.build()
+        line = bisect.bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+
+class Token(object):
+    __slots__ = ('type', 'value', 'offset', 'positions')
+
+    def __init__(self, type, value, offset=None, positions=None):
+        # token type: INTEGER, PLUS, MINUS, MULTIPLY, DIVIDE, LPAREN, RPAREN, MODULO, EOF
+        self.type = type
+        # value: +, -, *, /, %, None
+        self.value = value
+        # offset of the token in the source and the LineIndex of the source
+        self.offset = offset
+        self.positions = positions
+
+    def position(self):
+        """(line, column) of the token, or (None, None) if it is not known."""
+        if self.offset is None or self.positions is None:
+            return None, None
+        return self.positions.line_column(self.offset)
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def column(self):
+        return self.position()[1]
+
+    def __str__(self):
+        """String representation of the class instance.
+
+        Examples:
+            Token(INTEGER, 3)
+            Token(PLUS, '+')
+        """
+        line, column = self.position()
+        return 'Token({type}, {value} , position={line}:{column})'.format(
+            type=self.type,
+            value=repr(self.value),
+            line=line,
+            column=column
+        )
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,270 @@
+"""
+Transpiler
+
+Turns the AST of a program into the source of a Python function, compiles
+that with compile() and runs it. Each Rust variable becomes a local of the
+function, read from the variables dict when the function starts and
+written back when it returns (or raises), so the variables end up as the
+Interpreter would leave them.
+
+    program = compile_source(text)
+    program.run(Interpreter.variables)
+
+Compiled programs are cached by their source text.
+
+"""
+
+import collections
+import math
+
+import cache
+import interpreter
+import lexer
+import parser
+
+PYTHON_OPERATORS = {
+    parser.PLUS: '+',
+    parser.MINUS: '-',
+    parser.MULTIPLY: '*',
+    parser.DIVIDE: '/',
+    parser.MODULO: '%',
+    parser.EQ: '==',
+    parser.NE: '!=',
+    parser.GT: '>',
+    parser.LT: '<',
+    parser.GE: '>=',
+    parser.LE: '<=',
+}
+
+INDENT = '    '
+
+# Python's compiler recurses once per elif; longer else if chains are
+# written as ifs in a loop that runs once
+MAX_ELIFS = 100
+
+# compiled programs by source_key of their source text, least recently
+# used first
+PROGRAMS = collections.OrderedDict()
+MAX_PROGRAMS = 256
+
+
+def undefined(var_name):
+    raise NameError(repr(var_name))
+
+
+class Transpiler(object):
+    """Writes the Python source of a tree.
+
+    A variable is checked for being unset (None, as in the Interpreter)
+    only where it is read before it is surely assigned: reads after an
+    assignment on every path there are plain local reads.
+    """
+
+    def __init__(self):
+        # Rust name -> Python local; the locals are numbered, so no Rust
+        # name can clash with a Python keyword or builtin
+        self.locals = {}
+        self.lines = []
+        self.depth = 1
+
+    def local(self, var_name):
+        name = self.locals.get(var_name)
+        if name is None:
+            name = self.locals[var_name] = 'v{}'.format(len(self.locals))
+        return name
+
+    def emit(self, line):
+        self.lines.append(INDENT * self.depth + line)
+
+    def source(self, tree):
+        """The source of `def program(variables, undefined)`."""
+        self.depth = 2
+        self.statements(self.children(tree), set())
+        body = self.lines or [INDENT * 2 + 'pass']
+
+        lines = ['def program(variables, undefined):']
+        for var_name, name in self.locals.items():
+            lines.append('{}{} = variables.get({!r})'.format(INDENT, name, var_name))
+        lines.append(INDENT + 'try:')
+        lines.extend(body)
+        lines.append(INDENT + 'finally:')
+        if not self.locals:
+            lines.append(INDENT * 2 + 'pass')
+        for var_name, name in self.locals.items():
+            lines.append('{}if {} is not None:'.format(INDENT * 2, name))
+            lines.append('{}variables[{!r}] = {}'.format(INDENT * 3, var_name, name))
+        return '\n'.join(lines) + '\n'
+
+    def children(self, node):
+        if isinstance(node, parser.Compound):
+            return node.children
+        if isinstance(node, list):
+            return node
+        return [node]
+
+    def statements(self, nodes, assigned):
+        """Writes nodes; `assigned` holds the names surely set before them
+        and is updated with the ones surely set after them."""
+        for node in nodes:
+            self.statement(node, assigned)
+
+    def statement(self, node, assigned):
+        if isinstance(node, parser.Assign):
+            value = self.expr(node.right, assigned)
+            self.emit('{} = {}'.format(self.local(node.left.value), value))
+            assigned.add(node.left.value)
+        elif isinstance(node, parser.If):
+            self.if_statement(node, assigned)
+        elif isinstance(node, parser.While):
+            self.emit('while {}:'.format(self.expr(node.condition, assigned)))
+            # the body may not run at all, so what it assigns is not
+            # surely set after the loop
+            self.block(node.body, set(assigned))
+        elif isinstance(node, (parser.Compound, list)):
+            self.statements(self.children(node), assigned)
+        elif isinstance(node, (parser.NoOp, parser.Compare)):
+            pass
+        else:
+            # an expression on its own, which the parser makes of a stray
+            # token; it is evaluated for its errors
+            self.emit(self.expr(node, assigned))
+
+    def if_statement(self, node, assigned):
+        length = 0
+        arm = node
+        while isinstance(arm, parser.If):
+            length += 1
+            arm = arm.control_body
+        if length > MAX_ELIFS:
+            self.ladder(node, assigned)
+            return
+        keyword = 'if'
+        # names set by every arm so far; None until an arm has been seen
+        after = None
+        while isinstance(node, parser.If):
+            self.emit('{} {}:'.format(keyword, self.expr(node.condition, assigned)))
+            arm = set(assigned)
+            self.block(node.body, arm)
+            after = arm if after is None else after & arm
+            keyword = 'elif'
+            node = node.control_body
+        if isinstance(node, parser.NoOp):
+            return
+        self.emit('else:')
+        arm = set(assigned)
+        self.block(node, arm)
+        assigned |= after & arm
+
+    def ladder(self, node, assigned):
+        """Writes a long else if chain as
+
+            while True:
+                if a:
+                    ...
+                    break
+                if b:
+                    ...
+                    break
+                else part
+                break
+
+        which Python compiles without recursing once per arm."""
+        self.emit('while True:')
+        self.depth += 1
+        after = None
+        while isinstance(node, parser.If):
+            self.emit('if {}:'.format(self.expr(node.condition, assigned)))
+            arm = set(assigned)
+            self.block(node.body, arm, 'break')
+            after = arm if after is None else after & arm
+            node = node.control_body
+        if isinstance(node, parser.NoOp):
+            self.emit('break')
+        else:
+            arm = set(assigned)
+            self.statements(self.children(node), arm)
+            self.emit('break')
+            assigned |= after & arm
+        self.depth -= 1
+
+    def block(self, nodes, assigned, end=None):
+        """Writes nodes one level deeper, followed by the line `end` if
+        given."""
+        self.depth += 1
+        start = len(self.lines)
+        self.statements(self.children(nodes), assigned)
+        if end is not None:
+            self.emit(end)
+        elif len(self.lines) == start:
+            self.emit('pass')
+        self.depth -= 1
+
+    def expr(self, node, assigned):
+        if isinstance(node, parser.Num):
+            if isinstance(node.value, float) and not math.isfinite(node.value):
+                return 'float({!r})'.format(repr(node.value))
+            return repr(node.value)
+        if isinstance(node, parser.Var):
+            name = self.local(node.value)
+            if node.value in assigned:
+                return name
+            return '({0} if {0} is not None else undefined({1!r}))'.format(name, node.value)
+        if isinstance(node, parser.BinOP):
+            # fully bracketed, so `a < b < c` is not a Python chained compare
+            return '({} {} {})'.format(
+                self.expr(node.left, assigned), PYTHON_OPERATORS[node.op.type],
+                self.expr(node.right, assigned))
+        raise TypeError('Cannot transpile {}'.format(type(node).__name__))
+
+
+class Program(object):
+    def __init__(self, source):
+        self.source = source
+        namespace = {}
+        exec(compile(source, '<transpiled>', 'exec'), namespace)
+        self.function = namespace['program']
+
+    def run(self, variables):
+        """Runs the program, reading and writing `variables`."""
+        self.function(variables, undefined)
+
+
+def compile_tree(tree):
+    return Program(Transpiler().source(tree))
+
+
+def compile_source(text):
+    """The Program of a source text, from the cache if it is there."""
+    key = cache.source_key(text)
+    program = PROGRAMS.get(key)
+    if program is not None:
+        PROGRAMS.move_to_end(key)
+        return program
+    program = compile_tree(parser.Parser(lexer.Lexer(text)).parse())
+    PROGRAMS[key] = program
+    while len(PROGRAMS) > MAX_PROGRAMS:
+        PROGRAMS.popitem(last=False)
+    return program
+
+
+class TranspileInterpreter(interpreter.Interpreter):
+    """Interpreter that runs programs as compiled Python. Variables end up
+    in self.variables, as with the Interpreter. Programs nested deeper than
+    Python's compiler allows are run by the Interpreter instead."""
+
+    def interpret(self):
+        lex = getattr(self.parser, 'lexer', None)
+        if type(lex) is lexer.Lexer and lex.offset == 0:
+            try:
+                program = compile_source(lex.text)
+            except (SyntaxError, RecursionError, MemoryError):
+                return self.visit(self.parser.parse())
+            return program.run(self.variables)
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        try:
+            program = compile_tree(tree)
+        except (SyntaxError, RecursionError, MemoryError):
+            return self.visit(tree)
+        return program.run(self.variables)
@@ -0,0 +1,269 @@
+"""
+Bytecode VM
+
+Compiles the AST into a flat list of instructions for a stack machine and
+runs them in one loop. If and While become jumps, so running a program
+makes no recursive calls at all.
+
+Each instruction is two ints in an array('i'), an opcode and its
+argument:
+
+    LOAD_CONST     k       push constants[k]
+    LOAD_VAR       n       push the variable names[n]
+    STORE_VAR      n       pop into the variable names[n]
+    BINARY_OP      op      pop b, pop a, push a op b    (+ - * / %)
+    COMPARE        op      pop b, pop a, push a op b    (== != > < >= <=)
+    JUMP_IF_FALSE  target  pop, and go to target if it is false
+    JUMP           target  go to target
+    POP            -       pop an expression statement's value
+
+Targets are offsets in the array.
+
+    python vm.py program.rs
+
+prints the bytecode of a program and the variables it leaves.
+
+"""
+
+import array
+import operator
+
+import interpreter
+import lexer
+import parser
+
+LOAD_CONST = 0
+LOAD_VAR = 1
+STORE_VAR = 2
+BINARY_OP = 3
+COMPARE = 4
+JUMP_IF_FALSE = 5
+JUMP = 6
+POP = 7
+
+OPCODE_NAMES = ('LOAD_CONST', 'LOAD_VAR', 'STORE_VAR', 'BINARY_OP', 'COMPARE',
+                'JUMP_IF_FALSE', 'JUMP', 'POP')
+
+BINARY_OPERATORS = (parser.PLUS, parser.MINUS, parser.MULTIPLY, parser.DIVIDE, parser.MODULO)
+BINARY_FUNCTIONS = (operator.add, operator.sub, operator.mul, operator.truediv, operator.mod)
+COMPARE_OPERATORS = (parser.EQ, parser.NE, parser.GT, parser.LT, parser.GE, parser.LE)
+COMPARE_FUNCTIONS = (operator.eq, operator.ne, operator.gt, operator.lt, operator.ge, operator.le)
+
+SYMBOLS = {
+    parser.PLUS: '+', parser.MINUS: '-', parser.MULTIPLY: '*', parser.DIVIDE: '/',
+    parser.MODULO: '%',
+}
+
+
+class Code(object):
+    def __init__(self):
+        self.code = array.array('i')
+        self.constants = []
+        self.names = []
+        # (type, value) -> index in constants, name -> index in names
+        self._constant_index = {}
+        self._name_index = {}
+
+    def __len__(self):
+        return len(self.code) // 2
+
+    def constant(self, value):
+        key = (type(value), value)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def name(self, var_name):
+        index = self._name_index.get(var_name)
+        if index is None:
+            index = self._name_index[var_name] = len(self.names)
+            self.names.append(var_name)
+        return index
+
+    def emit(self, opcode, arg=0):
+        """Appends an instruction; returns its offset."""
+        self.code.append(opcode)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def offset(self):
+        """The offset the next instruction will have."""
+        return len(self.code)
+
+    def patch(self, at, target):
+        self.code[at + 1] = target
+
+
+class Compiler(interpreter.NodeVisitor):
+    """visit(node) appends the instructions of node to self.code."""
+
+    def __init__(self):
+        self.code = Code()
+
+    def visit_Num(self, node):
+        self.code.emit(LOAD_CONST, self.code.constant(node.value))
+
+    def visit_Var(self, node):
+        self.code.emit(LOAD_VAR, self.code.name(node.value))
+
+    def visit_BinOP(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+        op = node.op.type
+        if op in COMPARE_OPERATORS:
+            self.code.emit(COMPARE, COMPARE_OPERATORS.index(op))
+        else:
+            self.code.emit(BINARY_OP, BINARY_OPERATORS.index(op))
+
+    def visit_Assign(self, node):
+        self.visit(node.right)
+        self.code.emit(STORE_VAR, self.code.name(node.left.value))
+
+    def visit_If(self, node):
+        # each arm but the last jumps over the rest of the chain when it is
+        # done
+        ends = []
+        while isinstance(node, parser.If):
+            self.visit(node.condition)
+            skip = self.code.emit(JUMP_IF_FALSE)
+            self.visit(node.body)
+            node = node.control_body
+            if not isinstance(node, parser.NoOp):
+                ends.append(self.code.emit(JUMP))
+            self.code.patch(skip, self.code.offset())
+        self.visit(node)
+        for at in ends:
+            self.code.patch(at, self.code.offset())
+
+    def visit_While(self, node):
+        start = self.code.offset()
+        self.visit(node.condition)
+        exit = self.code.emit(JUMP_IF_FALSE)
+        self.visit(node.body)
+        self.code.emit(JUMP, start)
+        self.code.patch(exit, self.code.offset())
+
+    def visit_list(self, node):
+        for child in node:
+            self.statement(child)
+
+    def visit_Compound(self, node):
+        self.visit_list(node.children)
+
+    def visit_NoOp(self, node):
+        pass
+
+    def visit_Compare(self, node):
+        pass
+
+    def statement(self, node):
+        self.visit(node)
+        if isinstance(node, (parser.Num, parser.Var, parser.BinOP)):
+            # an expression on its own, which the parser makes of a stray
+            # token; it is evaluated for its errors
+            self.code.emit(POP)
+
+
+def compile_tree(tree):
+    compiler = Compiler()
+    compiler.statement(tree)
+    return compiler.code
+
+
+def disassemble(code):
+    """The instructions of code as text, one per line."""
+    lines = []
+    targets = set(code.code[at + 1] for at in range(0, len(code.code), 2)
+                  if code.code[at] in (JUMP, JUMP_IF_FALSE))
+    for at in range(0, len(code.code), 2):
+        opcode, arg = code.code[at], code.code[at + 1]
+        if opcode == LOAD_CONST:
+            detail = '{} ({!r})'.format(arg, code.constants[arg])
+        elif opcode in (LOAD_VAR, STORE_VAR):
+            detail = '{} ({})'.format(arg, code.names[arg])
+        elif opcode == BINARY_OP:
+            detail = '{} ({})'.format(arg, SYMBOLS[BINARY_OPERATORS[arg]])
+        elif opcode == COMPARE:
+            detail = '{} ({})'.format(arg, COMPARE_OPERATORS[arg])
+        elif opcode in (JUMP, JUMP_IF_FALSE):
+            detail = 'to {}'.format(arg)
+        else:
+            detail = ''
+        lines.append('{} {:5}  {:<14} {}'.format(
+            '>>' if at in targets else '  ', at, OPCODE_NAMES[opcode], detail).rstrip())
+    return '\n'.join(lines)
+
+
+def execute(code, variables):
+    """Runs code, reading and writing `variables`."""
+    instructions = code.code
+    constants = code.constants
+    names = code.names
+    binary_functions = BINARY_FUNCTIONS
+    compare_functions = COMPARE_FUNCTIONS
+    get = variables.get
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    end = len(instructions)
+    # opcodes as locals, which Python compares faster than globals
+    load_var, load_const, binary_op, compare, store_var, jump_if_false, jump, pop_top = (
+        LOAD_VAR, LOAD_CONST, BINARY_OP, COMPARE, STORE_VAR, JUMP_IF_FALSE, JUMP, POP)
+    pc = 0
+    while pc < end:
+        opcode = instructions[pc]
+        arg = instructions[pc + 1]
+        pc += 2
+        if opcode == load_var:
+            val = get(names[arg])
+            if val is None:
+                raise NameError(repr(names[arg]))
+            push(val)
+        elif opcode == load_const:
+            push(constants[arg])
+        elif opcode == binary_op:
+            right = pop()
+            stack[-1] = binary_functions[arg](stack[-1], right)
+        elif opcode == compare:
+            right = pop()
+            stack[-1] = compare_functions[arg](stack[-1], right)
+        elif opcode == store_var:
+            variables[names[arg]] = pop()
+        elif opcode == jump_if_false:
+            if not pop():
+                pc = arg
+        elif opcode == jump:
+            pc = arg
+        elif opcode == pop_top:
+            pop()
+        else:
+            raise RuntimeError('Bad opcode {} at {}'.format(opcode, pc - 2))
+
+
+class VMInterpreter(interpreter.Interpreter):
+    """Interpreter that compiles the tree to bytecode and runs that.
+    Variables end up in self.variables, as with the Interpreter."""
+
+    def interpret(self):
+        return self.run(self.parser.parse())
+
+    def run(self, tree):
+        execute(compile_tree(tree), self.variables)
+
+
+def main():
+    import sys
+
+    with open(sys.argv[1]) as f:
+        text = f.read()
+    code = compile_tree(parser.Parser(lexer.Lexer(text)).parse())
+    print(disassemble(code))
+    variables = {}
+    execute(code, variables)
+    print(variables)
+
+
+if __name__ == '__main__':
+    main()